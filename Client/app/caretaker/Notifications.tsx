@@ -49,9 +49,11 @@ export default function CaretakerNotifications() {
     };
 
     socketService.on('notification_created', refreshFromRealtime);
+    socketService.on('notification_updated', refreshFromRealtime);
 
     return () => {
       socketService.off('notification_created');
+      socketService.off('notification_updated');
     };
   }, [fetchNotifications]);
 
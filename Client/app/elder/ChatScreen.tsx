@@ -13,7 +13,7 @@ import { useLocalSearchParams } from "expo-router";
 import { Audio } from "expo-audio";
 import * as FileSystem from "expo-file-system/legacy";
 import BackButton from "../components/BackButton";
-import { API_BASE_URL } from "../../services/api";
+import { API_BASE_URL, chatbotAPI } from "../../services/api";
 
 const API_URL = API_BASE_URL;
 
@@ -61,19 +61,8 @@ export default function ChatScreen() {
     
     try {
       // Get chatbot response
-      const response = await fetch(`${API_URL}/chat`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ message: userInput }),
-      });
-      
-      if (!response.ok) {
-        throw new Error(`HTTP error! status: ${response.status}`);
-      }
-      
-      const data = await response.json();
+      // Sends the user's token: the server keeps chat history per user
+      const data = await chatbotAPI.chat(userInput);
       
       // Add bot response to UI
       const botMessage = { id: Date.now() + 1, sender: "peer", text: data.response };
@@ -5,7 +5,7 @@ import { useAudioRecorder, AudioModule } from "expo-audio";
 import { Audio } from "expo-av";
 import * as FileSystem from "expo-file-system/legacy";
 import BackButton from "../components/BackButton";
-import { API_BASE_URL } from "../../services/api";
+import { API_BASE_URL, chatbotAPI } from "../../services/api";
 
 const API_URL = API_BASE_URL;
 
@@ -146,15 +146,8 @@ export default function ChatbotVoice() {
         throw new Error("Transcription returned empty text");
       }
 
-      const chatRes = await fetch(`${API_URL}/chat`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ message: userMessage }),
-      });
-      const chatData = await chatRes.json();
-      if (!chatRes.ok) {
-        throw new Error(chatData.error || "Chat request failed");
-      }
+      // Sends the user's token: the server keeps chat history per user
+      const chatData = await chatbotAPI.chat(userMessage);
 
       const botReply = chatData.response;
       if (!botReply) {
@@ -63,6 +63,7 @@ export default function Notifications() {
     };
 
     socketService.on('notification_created', refreshFromRealtime);
+    socketService.on('notification_updated', refreshFromRealtime);
     socketService.on('medication_logged', refreshFromRealtime);
     
     // Refresh every 30 seconds to show new smart notifications
@@ -70,6 +71,7 @@ export default function Notifications() {
     return () => {
       clearInterval(interval);
       socketService.off('notification_created');
+      socketService.off('notification_updated');
       socketService.off('medication_logged');
     };
   }, [fetchNotifications]);
@@ -50,8 +50,14 @@ export const storage = {
 // API Request Helper
 // ===========================
 
+// Last ETag and body per GET endpoint: polled screens get a 304 (no body)
+// from the server when nothing changed and reuse the cached response.
+const etagCache = new Map<string, { etag: string; body: any }>();
+
 async function apiRequest(endpoint: string, options: any = {}) {
   const token = await storage.getToken();
+  const isGet = !options.method || options.method.toUpperCase() === 'GET';
+  const cached = isGet ? etagCache.get(endpoint) : undefined;
   
   console.log('API Request:', endpoint);
   console.log('Token:', token ? `${token.substring(0, 20)}...` : 'No token');
@@ -64,6 +70,9 @@ async function apiRequest(endpoint: string, options: any = {}) {
   if (token) {
     headers['Authorization'] = `Bearer ${token}`;
   }
+  if (cached) {
+    headers['If-None-Match'] = cached.etag;
+  }
   
   try {
     const response = await fetch(`${API_BASE_URL}${endpoint}`, {
@@ -71,6 +80,10 @@ async function apiRequest(endpoint: string, options: any = {}) {
       headers,
     });
     
+    if (response.status === 304 && cached) {
+      return cached.body;
+    }
+    
     if (!response.ok) {
       let errorMsg = `Request failed with status ${response.status}`;
       try {
@@ -83,7 +96,12 @@ async function apiRequest(endpoint: string, options: any = {}) {
       throw new Error(errorMsg);
     }
     
-    return response.json();
+    const body = await response.json();
+    const etag = response.headers.get('ETag');
+    if (isGet && etag) {
+      etagCache.set(endpoint, { etag, body });
+    }
+    return body;
   } catch (error: any) {
     if (error.message) {
       throw error;
@@ -250,8 +268,20 @@ export const medicationAPI = {
 // Health Records API
 // ===========================
 
+// Keyset pagination/projection for list endpoints: pass the previous
+// response's next_cursor to fetch the following page.
+export type PageParams = { limit?: number; cursor?: string; fields?: string };
+
+const pageQuery = (page?: PageParams) => {
+  const params: any = {};
+  if (page?.limit) params.limit = page.limit;
+  if (page?.cursor) params.cursor = page.cursor;
+  if (page?.fields) params.fields = page.fields;
+  return params;
+};
+
 export const healthAPI = {
-  async getRecords(params?: { elder_id?: number; type?: string; days?: number }) {
+  async getRecords(params?: { elder_id?: number; type?: string; days?: number; resolution?: 'hour' | 'day' } & PageParams) {
     const query = new URLSearchParams(params as any).toString();
     return await apiRequest(`/health-records${query ? `?${query}` : ''}`);
   },
@@ -269,6 +299,24 @@ export const healthAPI = {
     });
   },
 
+  async addBulk(records: Array<{
+    type: string;
+    value: string;
+    unit?: string;
+    notes?: string;
+    recorded_at?: string | number;
+  }>, elderId?: number) {
+    return await apiRequest('/health-records/bulk', {
+      method: 'POST',
+      body: JSON.stringify({ records, elder_id: elderId }),
+    });
+  },
+
+  async getAnomalies(params?: { elder_id?: number; type?: string; days?: number }) {
+    const query = new URLSearchParams(params as any).toString();
+    return await apiRequest(`/health-records/anomalies${query ? `?${query}` : ''}`);
+  },
+
   async delete(recordId: number) {
     return await apiRequest(`/health-records/${recordId}`, {
       method: 'DELETE',
@@ -281,8 +329,8 @@ export const healthAPI = {
 // ===========================
 
 export const mealAPI = {
-  async getMeals(date?: string, elderId?: number) {
-    const params: any = {};
+  async getMeals(date?: string, elderId?: number, page?: PageParams) {
+    const params: any = pageQuery(page);
     if (date) params.date = date;
     if (elderId) params.elder_id = elderId;
     const query = new URLSearchParams(params).toString();
@@ -318,8 +366,9 @@ export const mealAPI = {
 // ===========================
 
 export const appointmentAPI = {
-  async getAll() {
-    return await apiRequest('/appointments');
+  async getAll(page?: PageParams) {
+    const query = new URLSearchParams(pageQuery(page)).toString();
+    return await apiRequest(`/appointments${query ? `?${query}` : ''}`);
   },
   
   async add(data: {
@@ -371,14 +420,49 @@ export const appointmentAPI = {
 // ===========================
 
 export const notificationAPI = {
-  async getAll() {
-    return await apiRequest('/notifications');
+  async getAll(page?: PageParams) {
+    const query = new URLSearchParams(pageQuery(page)).toString();
+    return await apiRequest(`/notifications${query ? `?${query}` : ''}`);
   },
   
   async markRead(notificationId: number) {
     return await apiRequest(`/notifications/${notificationId}/read`, {
       method: 'POST',
     });
+  },
+
+  async getUnreadCount() {
+    return await apiRequest('/notifications/unread-count');
+  },
+
+  // One request for many: pass ids, a `before` timestamp, or { all: true }
+  async markManyRead(data: { ids?: number[]; before?: string; all?: boolean }) {
+    return await apiRequest('/notifications/read', {
+      method: 'POST',
+      body: JSON.stringify(data),
+    });
+  }
+};
+
+// ===========================
+// Dashboard API
+// ===========================
+
+export const dashboardAPI = {
+  async get() {
+    return await apiRequest('/dashboard');
+  }
+};
+
+// ===========================
+// Sync API
+// ===========================
+
+export const syncAPI = {
+  // Without a cursor the response has reset: true and the starting cursor;
+  // reload full lists whenever reset is true.
+  async getChanges(since?: string) {
+    return await apiRequest(`/sync${since ? `?since=${encodeURIComponent(since)}` : ''}`);
   }
 };
 
@@ -394,19 +478,68 @@ export const locationAPI = {
     });
   },
   
+  async updateBatch(fixes: { latitude: number; longitude: number; accuracy?: number; timestamp: number | string }[]) {
+    return await apiRequest('/location/batch', {
+      method: 'POST',
+      body: JSON.stringify({ fixes }),
+    });
+  },
+  
   async getLocation(elderId: number) {
     return await apiRequest(`/location/${elderId}`);
+  },
+  
+  async getHistory(elderId: number, params: { from?: string; to?: string; tolerance?: number; format?: 'json' | 'polyline' } = {}) {
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined) query.append(key, String(value));
+    });
+    const suffix = query.toString() ? `?${query.toString()}` : '';
+    return await apiRequest(`/location/${elderId}/history${suffix}`);
   }
 };
 
 // ===========================
-// Emergency Contacts API
+// Geofence (Safe Zone) API
 // ===========================
 
-export const emergencyContactAPI = {
+export const geofenceAPI = {
   async getAll(elderId?: number) {
     const query = elderId ? `?elder_id=${elderId}` : '';
-    return await apiRequest(`/emergency-contacts${query}`);
+    return await apiRequest(`/geofences${query}`);
+  },
+  
+  async add(zone: { elder_id?: number; name: string; latitude: number; longitude: number; radius_m?: number }) {
+    return await apiRequest('/geofences', {
+      method: 'POST',
+      body: JSON.stringify(zone),
+    });
+  },
+  
+  async update(zoneId: number, zone: { name?: string; latitude?: number; longitude?: number; radius_m?: number; is_active?: boolean }) {
+    return await apiRequest(`/geofences/${zoneId}`, {
+      method: 'PUT',
+      body: JSON.stringify(zone),
+    });
+  },
+  
+  async delete(zoneId: number) {
+    return await apiRequest(`/geofences/${zoneId}`, {
+      method: 'DELETE',
+    });
+  }
+};
+
+// ===========================
+// Emergency Contacts API
+// ===========================
+
+export const emergencyContactAPI = {
+  async getAll(elderId?: number, page?: PageParams) {
+    const params: any = pageQuery(page);
+    if (elderId) params.elder_id = elderId;
+    const query = new URLSearchParams(params).toString();
+    return await apiRequest(`/emergency-contacts${query ? `?${query}` : ''}`);
   },
   
   async add(data: {
@@ -497,9 +630,11 @@ export const chatbotAPI = {
 // ===========================
 
 export const prescriptionAPI = {
-  async getAll(elderId?: number) {
-    const query = elderId ? `?elder_id=${elderId}` : '';
-    return await apiRequest(`/prescriptions${query}`);
+  async getAll(elderId?: number, page?: PageParams) {
+    const params: any = pageQuery(page);
+    if (elderId) params.elder_id = elderId;
+    const query = new URLSearchParams(params).toString();
+    return await apiRequest(`/prescriptions${query ? `?${query}` : ''}`);
   },
   
   async add(data: {
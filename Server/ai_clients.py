@@ -0,0 +1,79 @@
+"""
+Process-wide registry of Google AI clients (Speech, Text-to-Speech, Gemini).
+
+Clients are created lazily once per process and then shared by every request
+thread; gRPC channels and loaded credentials are reused instead of being
+rebuilt per request. Creation can also be triggered up front with warm().
+"""
+import threading
+import time
+
+
+class ClientRegistry:
+    """Create-once, thread-safe holder for long-lived API clients"""
+
+    def __init__(self):
+        self._factories = {}
+        self._clients = {}
+        self._errors = {}
+        self._init_seconds = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, factory):
+        """Register a zero-argument factory that builds the client"""
+        with self._lock:
+            self._factories[name] = factory
+
+    def is_registered(self, name):
+        return name in self._factories
+
+    def get(self, name):
+        """Return the shared client, creating it on first use"""
+        client = self._clients.get(name)
+        if client is not None:
+            return client
+
+        with self._lock:
+            client = self._clients.get(name)
+            if client is not None:
+                return client
+            factory = self._factories.get(name)
+            if factory is None:
+                raise KeyError(f"AI client '{name}' is not configured")
+
+            started = time.perf_counter()
+            try:
+                client = factory()
+            except Exception as e:
+                # Keep the error for status(); the next get() retries creation
+                self._errors[name] = str(e)
+                raise
+            self._clients[name] = client
+            self._errors.pop(name, None)
+            self._init_seconds[name] = round(time.perf_counter() - started, 3)
+            return client
+
+    def warm(self, names=None):
+        """Create clients ahead of the first request, recording any failures"""
+        for name in list(names or self._factories):
+            try:
+                self.get(name)
+                print(f"✓ AI client '{name}' initialized")
+            except Exception as e:
+                print(f"Warning: could not initialize AI client '{name}': {e}")
+
+    def warm_in_background(self, names=None):
+        thread = threading.Thread(target=self.warm, args=(names,), name='ai-client-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def status(self):
+        with self._lock:
+            return {
+                name: {
+                    "initialized": name in self._clients,
+                    "init_seconds": self._init_seconds.get(name),
+                    "error": self._errors.get(name),
+                }
+                for name in self._factories
+            }
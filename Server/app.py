@@ -13,6 +13,7 @@ except Exception:
     _has_pyngrok = False
 from google.cloud import speech, texttospeech
 import google.generativeai as genai
+from chat_memory import ConversationStore
 import os
 import io
 import wave
@@ -33,23 +34,33 @@ model = None
 if API_KEY:
     genai.configure(api_key=API_KEY)
     model = genai.GenerativeModel("gemini-1.5-pro-latest")
-conversation_history = []
+# Keep a bounded history per client instead of one shared, ever-growing list
+conversation_store = ConversationStore()
 
 @app.route("/chat", methods=["POST"])
 def chat():
     if model is None:
         return jsonify({"error": "Chatbot is not configured on the server"}), 503
 
-    user_input = request.get_json().get("message", "")
-    conversation_history.append(f"User: {user_input}")
+    data = request.get_json()
+    user_input = data.get("message", "")
+    # This server has no logins: history is only kept for callers that send their
+    # own session_id (never keyed by address, which proxies share between users)
+    session_key = data.get("session_id")
+    if session_key:
+        conversation_store.append(session_key, f"User: {user_input}")
+        history = conversation_store.history(session_key)
+    else:
+        history = [f"User: {user_input}"]
     prompt = (
         "You're a gentle, supportive chatbot for elderly users. "
         "Respond warmly, kindly, and clearly in 1–2 short sentences.\n\n"
-        "Conversation so far:\n" + "\n".join(conversation_history) + "\nAI:"
+        "Conversation so far:\n" + "\n".join(history) + "\nAI:"
     )
     response = model.generate_content(prompt)
     reply_text = response.text.strip()
-    conversation_history.append(f"AI: {reply_text}")
+    if session_key:
+        conversation_store.append(session_key, f"AI: {reply_text}")
     return jsonify({"response": reply_text})
 
 @app.route("/transcribe", methods=["POST"])
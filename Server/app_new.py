@@ -7,7 +7,28 @@ from flask_cors import CORS
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 from flask_bcrypt import Bcrypt
 from flask_socketio import SocketIO, emit, join_room, leave_room
-from models import db, User, ElderProfile, CaretakerProfile, Medication, MedicationLog, HealthRecord, Meal, Appointment, EmergencyContact, Notification, LocationLog, Prescription
+from models import db, ensure_indexes, ensure_columns, User, ElderProfile, CaretakerProfile, Medication, MedicationLog, HealthRecord, Meal, Appointment, EmergencyContact, Notification, NotificationCounter, LocationLog, Prescription, SafeZone, HealthRollup, OutboxTask
+from chat_memory import ConversationStore
+from tts_cache import TTSCache
+from ai_clients import ClientRegistry
+from geo import downsample_fixes, parse_fix_time, simplify_track, encode_polyline
+from location_cache import LatestLocationCache
+from geofence import GeofenceEngine, DatabaseZoneState
+import user_context
+from user_context import current_user, elder_summary, elder_summaries
+import vitals
+import vitals_analytics
+from pagination import parse_page_args, paginate
+import serializers
+import sync_log
+import dashboard
+import versions
+import notifications
+import message_queue
+import outbox
+from sqlite_tuning import SQLiteTuning, write_transaction
+import database
+from sqlalchemy.engine import make_url
 from datetime import datetime, timedelta
 import os
 import io
@@ -31,26 +52,125 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-me')
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'dev-jwt-secret-key-change-me')
 app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(days=30)
 app.config['JWT_IDENTITY_CLAIM'] = 'sub'  # Allow integer user IDs
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv(
+app.config['SQLALCHEMY_DATABASE_URI'] = database.normalize_url(os.getenv(
     'DATABASE_URL',
     f"sqlite:///{os.path.join(INSTANCE_DIR, 'gentlecare.db')}"
-)
+))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Connection pool sized for this process: one connection per request thread plus the outbox workers and sweeper
+WEB_THREADS = int(os.getenv('WEB_THREADS', '8'))
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', '1'))
+DB_BACKGROUND_THREADS = int(os.getenv('OUTBOX_WORKERS', '2')) + 1
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = database.engine_options(
+    app.config['SQLALCHEMY_DATABASE_URI'], WEB_THREADS, WEB_CONCURRENCY, DB_BACKGROUND_THREADS
+)
+
+# Optional read replica for GET requests
+REPLICA_DATABASE_URL = database.normalize_url(os.getenv('REPLICA_DATABASE_URL'))
+if REPLICA_DATABASE_URL:
+    app.config['SQLALCHEMY_BINDS'] = {database.REPLICA_BIND: {
+        'url': REPLICA_DATABASE_URL,
+        **database.engine_options(REPLICA_DATABASE_URL, WEB_THREADS, WEB_CONCURRENCY),
+    }}
+
+# orjson-backed jsonify() when installed (JSON_ENCODER=stdlib to opt out)
+app.json = serializers.FastJSONProvider(app, os.getenv('JSON_ENCODER', 'auto'))
+
 CORS(app)
 jwt = JWTManager(app)
 bcrypt = Bcrypt(app)
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
+# Optional message queue so emits reach clients connected to other worker processes
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading",
+                    **message_queue.socketio_options(os.getenv('SOCKETIO_MESSAGE_QUEUE')))
 db.init_app(app)
 
+# SQLite: WAL, busy timeout and cache pragmas on every connection; locked writes are retried
+sqlite_tuning = SQLiteTuning(
+    busy_timeout_ms=int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+    cache_size_kib=int(os.getenv('SQLITE_CACHE_SIZE_KIB', '16384')),
+    mmap_bytes=int(os.getenv('SQLITE_MMAP_BYTES', str(256 * 1024 * 1024))),
+    retries=int(os.getenv('SQLITE_LOCK_RETRIES', '3')),
+)
+sqlite_tuned = False
+if os.getenv('SQLITE_TUNING', 'true').lower() == 'true':
+    with app.app_context():
+        sqlite_tuned = sqlite_tuning.install(db.engine, db.session)
+
 # Create database tables immediately on app initialization
 with app.app_context():
     try:
         db.create_all()
+        added_columns = ensure_columns(db.engine)
+        if added_columns:
+            print(f"✓ Added missing columns: {', '.join(added_columns)}")
+        if 'health_records.value_primary' in added_columns:
+            print(f"✓ Backfilled {vitals.backfill()} numeric health records")
+        elif 'health_rollups.count_secondary' in added_columns:
+            print(f"✓ Rebuilt {vitals.rebuild_rollups()} health rollups")
+        if not NotificationCounter.query.first() and Notification.query.filter_by(is_read=False).first():
+            print(f"✓ Rebuilt unread counters for {notifications.rebuild_counters()} users")
+        db.session.rollback()  # end the session's transaction: it holds the write lock DDL below needs
+        created_indexes = ensure_indexes(db.engine)
+        if created_indexes:
+            print(f"✓ Created missing indexes: {', '.join(created_indexes)}")
         print("✓ Database tables initialized")
     except Exception as e:
         print(f"Warning: Could not initialize database tables: {e}")
 
+# Local stand-in replica: when both databases are SQLite files, copy the primary periodically
+local_replica = None
+if REPLICA_DATABASE_URL:
+    primary_url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    replica_url = make_url(REPLICA_DATABASE_URL)
+    if primary_url.get_backend_name() == 'sqlite' and replica_url.get_backend_name() == 'sqlite':
+        local_replica = database.LocalReplica(
+            primary_url.database, replica_url.database,
+            interval_seconds=float(os.getenv('DB_REPLICA_SYNC_SECONDS', '1')),
+        ).start()
+database.install_read_routing(app, db)
+
+# Change log for GET /sync (installed after the backfill so migrations aren't logged)
+SYNC_RETENTION_DAYS = int(os.getenv('SYNC_RETENTION_DAYS', '30'))
+SYNC_MAX_CHANGES = int(os.getenv('SYNC_MAX_CHANGES', '1000'))
+sync_log.install(db.session)
+versions.install(app, db.session)
+notifications.install(db.session)
+
+# Post-commit side effects (socket fan-out, caretaker notifications) drained by background workers;
+# deferred ones are also written to outbox_tasks with the triggering write and retried until delivered
+side_effects = outbox.Outbox(
+    workers=int(os.getenv('OUTBOX_WORKERS', '2')),
+    batch_size=int(os.getenv('OUTBOX_BATCH_SIZE', '100')),
+    app=app,
+    table=OutboxTask.__table__,
+    lease_seconds=int(os.getenv('OUTBOX_LEASE_SECONDS', '60')),
+    retry_seconds=int(os.getenv('OUTBOX_RETRY_SECONDS', '5')),
+    max_attempts=int(os.getenv('OUTBOX_MAX_ATTEMPTS', '5')),
+    sweep_seconds=int(os.getenv('OUTBOX_SWEEP_SECONDS', '30')),
+).start()
+side_effects.install(db.session)
+
+# Notification pipeline: same (recipient, elder, type) within the window -> one digest row and push
+notifications.pipeline.configure(
+    window_seconds=int(os.getenv('NOTIFICATION_COALESCE_SECONDS', '120')),
+    critical_types=[t.strip() for t in os.getenv('NOTIFICATION_CRITICAL_TYPES', 'emergency').split(',') if t.strip()],
+    emit=lambda event_name, payload, room: socketio.emit(event_name, payload, room=room),
+)
+
+# Per-elder dashboard summaries, dropped when sync_log sees that elder's data change
+dashboard_cache = dashboard.DashboardCache(
+    ttl_seconds=int(os.getenv('DASHBOARD_CACHE_TTL_SECONDS', '30')),
+    vitals_days=int(os.getenv('DASHBOARD_VITALS_DAYS', '30')),
+)
+sync_log.subscribe(dashboard_cache.invalidate)
+
+# Trim the change log to the retention window now and every SYNC_PRUNE_INTERVAL_SECONDS
+sync_pruner = sync_log.Pruner(
+    app, SYNC_RETENTION_DAYS,
+    interval_seconds=int(os.getenv('SYNC_PRUNE_INTERVAL_SECONDS', '3600')),
+).start()
+
 # Google Cloud credentials
 google_creds_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
 google_creds_json = os.getenv('GOOGLE_CREDENTIALS_JSON', '').strip()
@@ -70,44 +190,222 @@ if not os.getenv('GOOGLE_APPLICATION_CREDENTIALS'):
     if os.path.exists(default_creds):
         os.environ["GOOGLE_APPLICATION_CREDENTIALS"] = default_creds
 
+# Shared AI clients: created once per process and reused by every request thread
+ai_clients = ClientRegistry()
+ai_clients.register('speech_to_text', speech.SpeechClient)
+ai_clients.register('text_to_speech', texttospeech.TextToSpeechClient)
+
 # Gemini AI setup
 API_KEY = os.getenv("GEMINI_API_KEY", "")
 model = None
 if API_KEY:
     genai.configure(api_key=API_KEY)
-    model = genai.GenerativeModel("gemini-1.5-pro-latest")
-conversation_history = []
+    ai_clients.register('gemini', lambda: genai.GenerativeModel("gemini-1.5-pro-latest"))
+    model = ai_clients.get('gemini')
+
+# Open gRPC channels/credentials at boot instead of on the first voice request
+if os.getenv('AI_CLIENT_WARMUP', 'true').lower() == 'true' and os.getenv("GOOGLE_APPLICATION_CREDENTIALS"):
+    ai_clients.warm_in_background(['speech_to_text', 'text_to_speech'])
+
+# Bulk health record uploads (wearable/device sync)
+HEALTH_BULK_MAX_RECORDS = int(os.getenv('HEALTH_BULK_MAX_RECORDS', '1000'))
+
+# Ingest-time vitals anomaly detection (rolling baseline per elder and record type)
+anomaly_tracker = vitals_analytics.BaselineTracker(
+    max_series=int(os.getenv('VITALS_BASELINE_MAX_SERIES', '5000')),
+)
+
+# Request-scoped user/elder resolution with a short cross-request cache
+user_context.configure(
+    int(os.getenv('USER_CONTEXT_CACHE_TTL_SECONDS', '30')),
+    rooms_ttl_seconds=int(os.getenv('CARE_TEAM_ROOMS_TTL_SECONDS', '300')),
+)
+
+# Per-user chat memory: bounded history per session, idle sessions evicted
+conversation_store = ConversationStore(
+    max_lines=int(os.getenv('CHAT_HISTORY_LINES', '10')),
+    max_sessions=int(os.getenv('CHAT_MAX_SESSIONS', '1000')),
+    idle_ttl=int(os.getenv('CHAT_SESSION_TTL_SECONDS', '1800')),
+    max_bytes=int(os.getenv('CHAT_MEMORY_MAX_BYTES', str(8 * 1024 * 1024))),
+)
+
+# Synthesized speech cache (memory + instance/tts_cache on disk)
+tts_cache = TTSCache(
+    cache_dir=os.path.join(INSTANCE_DIR, 'tts_cache'),
+    max_memory_bytes=int(os.getenv('TTS_CACHE_MEMORY_BYTES', str(32 * 1024 * 1024))),
+    max_disk_bytes=int(os.getenv('TTS_CACHE_DISK_BYTES', str(512 * 1024 * 1024))),
+)
+TTS_LANGUAGE = "en-US"
+TTS_VOICE_GENDER = "FEMALE"
+TTS_ENCODING = "LINEAR16"
+
+# Batched location uploads
+LOCATION_BATCH_MAX_FIXES = int(os.getenv('LOCATION_BATCH_MAX_FIXES', '1000'))
+LOCATION_MIN_DISTANCE_M = float(os.getenv('LOCATION_MIN_DISTANCE_M', '10'))
+LOCATION_HISTORY_MAX_DAYS = int(os.getenv('LOCATION_HISTORY_MAX_DAYS', '7'))
+
+# Latest fix per elder, written through by the location handlers
+location_cache = LatestLocationCache(
+    ttl_seconds=int(os.getenv('LOCATION_CACHE_TTL_SECONDS', '60')),
+    redis_url=os.getenv('REDIS_URL'),
+)
+
+def location_fix(location):
+    """LocationLog row -> cache entry"""
+    return {
+        'latitude': location.latitude,
+        'longitude': location.longitude,
+        'accuracy': location.accuracy,
+        'recorded_at': location.recorded_at,
+    }
+
+def location_version(elder_id):
+    """Version stamp of an elder's location_logs; inside a write transaction it includes that write"""
+    return versions.stamp([versions.elder(elder_id, 'location_logs')])
+
+def cached_location(elder_id, version):
+    """Latest fix for an elder from the location cache, reloaded if the cached
+    entry predates version (e.g. written through by another worker process)"""
+    fix = location_cache.get(elder_id, version)
+    if fix is not None:
+        return fix
+    location = LocationLog.query.filter_by(elder_id=elder_id).order_by(LocationLog.recorded_at.desc()).first()
+    if not location:
+        return None
+    fix = dict(location_fix(location), version=version)
+    location_cache.set(elder_id, fix)
+    return fix
+
+def load_safe_zones(elder_id):
+    """Active safe zones for an elder, as plain dicts for the geofence engine"""
+    zones = SafeZone.query.filter_by(elder_id=elder_id, is_active=True).all()
+    return [{
+        'id': z.id,
+        'name': z.name,
+        'latitude': z.latitude,
+        'longitude': z.longitude,
+        'radius_m': z.radius_m,
+    } for z in zones]
+
+# Inside/outside state lives in geofence_states, so restarts and other worker processes share it;
+# cached zones are reloaded when the elder's safe_zones version moves
+geofence_states = DatabaseZoneState()
+geofence_engine = GeofenceEngine(
+    load_safe_zones,
+    hysteresis_m=float(os.getenv('GEOFENCE_HYSTERESIS_M', '25')),
+    state=geofence_states,
+    zones_version=lambda elder_id: versions.stamp([versions.elder(elder_id, 'safe_zones')]),
+)
 
 def resolve_elder_id_for_user(user, explicit_elder_id=None):
     """Resolve target elder profile id for current user context."""
     if user.user_type == 'elder':
-        elder_profile = ElderProfile.query.filter_by(user_id=user.id).first()
-        return elder_profile.id if elder_profile else None
+        return user.elder_profile_id
 
     if explicit_elder_id:
         return explicit_elder_id
 
-    elders = ElderProfile.query.filter_by(caretaker_id=user.id).all()
-    return elders[0].id if elders else None
+    return user.elder_ids[0] if user.elder_ids else None
+
+def can_access_elder(user, elder_id):
+    """Whether user is the elder or the caretaker linked to them"""
+    if not elder_id:
+        return False
+    if user.user_type == 'elder':
+        return user.elder_profile_id == int(elder_id)
+    return int(elder_id) in user.elder_ids
 
 def emit_to_care_team(elder_id, event_name, payload):
     """Emit realtime events to both elder and caretaker user rooms."""
-    elder_profile = ElderProfile.query.get(elder_id)
-    if not elder_profile:
-        return
-
-    socketio.emit(event_name, payload, room=f'user_{elder_profile.user_id}')
-    if elder_profile.caretaker_id:
-        socketio.emit(event_name, payload, room=f'user_{elder_profile.caretaker_id}')
+    emit_many_to_care_team(elder_id, [(event_name, payload)])
+
+def emit_many_to_care_team(elder_id, events, defer=False, caretaker_only=False):
+    """Queue (event_name, payload) pairs for the elder's care team; an outbox worker sends them.
+
+    defer=True holds them until the current transaction commits;
+    caretaker_only=True skips the elder's own room.
+    """
+    if defer:
+        side_effects.defer(db.session, 'emit', elder_id, elder_id, events, caretaker_only)
+    else:
+        side_effects.submit('emit', elder_id, elder_id, events, caretaker_only)
+
+def alert_care_team(elder_id, notice, event_name, payload, defer=False):
+    """Queue a caretaker notification (notify() arguments, or None) and a care team
+    event that reports its id as payload['notification_id']."""
+    if defer:
+        side_effects.defer(db.session, 'alert', elder_id, elder_id, notice, event_name, payload)
+    else:
+        side_effects.submit('alert', elder_id, elder_id, notice, event_name, payload)
+
+def send_to_care_team(tasks):
+    """Outbox handler: emit queued events; rooms come from the in-memory map."""
+    for elder_id, events, caretaker_only in tasks:
+        if caretaker_only:
+            caretaker_id = elder_summary(elder_id).caretaker_id
+            rooms = [f'user_{caretaker_id}'] if caretaker_id else []
+        else:
+            rooms = list(user_context.care_team_rooms(elder_id))
+        if not rooms:
+            continue
+        for event_name, payload in events:
+            # One emit to both rooms: a single queue publish, and a client in both rooms gets one copy
+            socketio.emit(event_name, payload, to=rooms)
+
+def send_alerts(tasks):
+    """Outbox handler: create the alerts' notifications in one commit, then emit each alert with its id."""
+    notices = [notice for _, notice, _, _ in tasks if notice]
+    try:
+        notification_ids = iter(notifications.notify_many(notices))
+    except Exception as e:
+        print(f"Alert notifications failed: {e}")
+        notification_ids = iter([None] * len(notices))
+    send_to_care_team([
+        (elder_id, [(event_name, dict(payload, notification_id=next(notification_ids) if notice else None))], False)
+        for elder_id, notice, event_name, payload in tasks
+    ])
+
+side_effects.register('emit', send_to_care_team)
+side_effects.register('notify', notifications.notify_many)
+side_effects.register('alert', send_alerts)
+
+def process_geofences(elder_profile, elder_name, fixes):
+    """Check fixes being stored against the elder's safe zones and alert on transitions only.
+
+    Runs in the caller's write transaction: the zone state changes commit with
+    the fixes, and the alerts are sent once they have.
+    """
+    for fix, zone, transition in geofence_engine.evaluate_fixes(elder_profile.id, fixes):
+        left = transition == 'exit'
+        notice = None
+        if elder_profile.caretaker_id:
+            notice = (
+                elder_profile.caretaker_id, elder_profile.id,
+                "emergency" if left else "location",
+                "Left Safe Zone" if left else "Entered Safe Zone",
+                f"{elder_name} {'left' if left else 'entered'} {zone['name']}",
+            )
+        alert_care_team(elder_profile.id, notice, 'geofence_alert', {
+            'elder_id': elder_profile.id,
+            'elder_name': elder_name,
+            'zone_id': zone['id'],
+            'zone_name': zone['name'],
+            'transition': transition,
+            'latitude': fix['latitude'],
+            'longitude': fix['longitude'],
+            'timestamp': fix['recorded_at'].isoformat(),
+        }, defer=True)
 
 def get_ai_capabilities():
     creds_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "")
     creds_file_exists = bool(creds_path) and os.path.exists(creds_path)
     speech_ready = bool(creds_path and creds_file_exists)
+    clients = ai_clients.status()
     return {
         "chatbot": model is not None,
-        "speech_to_text": speech_ready,
-        "text_to_speech": speech_ready,
+        "speech_to_text": speech_ready and not clients.get('speech_to_text', {}).get('error'),
+        "text_to_speech": speech_ready and not clients.get('text_to_speech', {}).get('error'),
+        "clients": clients,
     }
 
 @app.route('/capabilities', methods=['GET'])
@@ -120,7 +418,14 @@ def capabilities():
 def health_check():
     ai = get_ai_capabilities()
     ready = ai["chatbot"] and ai["speech_to_text"] and ai["text_to_speech"]
-    return jsonify({"status": "ok", "ready": ready, "ai": ai}), 200
+    return jsonify({"status": "ok", "ready": ready, "ai": ai, "tts_cache": tts_cache.stats(),
+                    "notifications": notifications.pipeline.stats(), "outbox": side_effects.stats(),
+                    "sync_log": sync_pruner.stats(),
+                    "sqlite": sqlite_tuning.stats() if sqlite_tuned else None,
+                    "database": {
+                        "pool": db.engine.pool.status(),
+                        "replica": local_replica.stats() if local_replica else bool(REPLICA_DATABASE_URL),
+                    }}), 200
 
 # JWT error handlers
 @jwt.invalid_token_loader
@@ -143,6 +448,7 @@ def expired_token_callback(jwt_header, jwt_data):
 # ===========================
 
 @app.route('/auth/signup', methods=['POST'])
+@write_transaction
 def signup():
     """Register new user (elder or caretaker)"""
     try:
@@ -179,6 +485,7 @@ def signup():
             db.session.add(profile)
         
         db.session.commit()
+        user_context.invalidate_user(user.id)
         
         access_token = create_access_token(identity=str(user.id))
         return jsonify({
@@ -244,6 +551,7 @@ def login():
         return jsonify({"error": str(e)}), 500
 
 @app.route('/auth/link-caretaker', methods=['POST'])
+@write_transaction
 @jwt_required()
 def link_caretaker():
     """Link an elder to a caretaker"""
@@ -252,7 +560,7 @@ def link_caretaker():
         data = request.json
         caretaker_email = data.get('caretaker_email')
         
-        user = User.query.get(user_id)
+        user = current_user()
         if user.user_type != 'elder':
             return jsonify({"error": "Only elders can link to caretakers"}), 400
         
@@ -260,10 +568,17 @@ def link_caretaker():
         if not caretaker:
             return jsonify({"error": "Caretaker not found"}), 404
         
-        elder_profile = ElderProfile.query.filter_by(user_id=user_id).first()
+        elder_profile = ElderProfile.query.get(user.elder_profile_id)
+        previous_caretaker_id = elder_profile.caretaker_id
         elder_profile.caretaker_id = caretaker.id
         db.session.commit()
         
+        # Cached user/elder snapshots now have a stale caretaker link
+        user_context.invalidate_elder(elder_profile.id)
+        for affected_user_id in (user_id, caretaker.id, previous_caretaker_id):
+            if affected_user_id:
+                user_context.invalidate_user(affected_user_id)
+        
         # Notify caretaker via socket
         socketio.emit('elder_linked', {
             'elder_id': elder_profile.id,
@@ -293,57 +608,60 @@ def get_medications():
     """Get all medications for user"""
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = current_user()
         
         if not user:
             return jsonify({"error": "User not found"}), 404
         
+        elder_ids = [user.elder_profile_id] if user.user_type == 'elder' else user.elder_ids
+        not_modified = versions.conditional(
+            [versions.elder(e, r) for e in elder_ids if e for r in ('medications', 'medication_logs')], user.id
+        )
+        if not_modified:
+            return not_modified
+        
+        # Latest log per medication (highest id == last appended log), joined
+        # in a single query together with the elder's name so the number of
+        # queries doesn't grow with the number of medications or logs. The
+        # correlated subquery is one index seek per listed medication, not a
+        # GROUP BY over every elder's logs. Only the response's columns are
+        # selected: no ORM objects to build.
+        logs = db.aliased(MedicationLog)
+        latest_log_id = db.select(db.func.max(logs.id)) \
+            .where(logs.medication_id == Medication.id) \
+            .correlate(Medication) \
+            .scalar_subquery()
+
+        query = db.session.query(*serializers.MEDICATION_LIST.columns) \
+            .join(ElderProfile, Medication.elder_id == ElderProfile.id) \
+            .join(User, ElderProfile.user_id == User.id) \
+            .outerjoin(MedicationLog, MedicationLog.id == latest_log_id) \
+            .filter(Medication.is_active == True)
+
         if user.user_type == 'elder':
-            elder_profile = ElderProfile.query.filter_by(user_id=user_id).first()
-            if not elder_profile:
+            if not user.elder_profile_id:
                 return jsonify({"error": "Elder profile not found"}), 404
-            medications = Medication.query.filter_by(elder_id=elder_profile.id, is_active=True).all()
+            query = query.filter(Medication.elder_id == user.elder_profile_id)
         else:
             # Caretaker: get all medications for their elders
-            elder_ids = [e.id for e in ElderProfile.query.filter_by(caretaker_id=user_id).all()]
-            print(f"Caretaker {user_id} - Elder IDs: {elder_ids}")
-            if elder_ids:
-                medications = Medication.query.filter(Medication.elder_id.in_(elder_ids), Medication.is_active == True).all()
-                print(f"Found {len(medications)} medications")
-            else:
-                medications = []
-        
-        print(f"Returning {len(medications)} medications")
-        return jsonify({
-            "medications": [{
-                "id": m.id,
-                "elder_id": m.elder_id,
-                "elder_name": m.elder.user.full_name,
-                "name": m.name,
-                "dosage": m.dosage,
-                "frequency": m.frequency,
-                "time": m.time,
-                "instructions": m.instructions,
-                "is_active": m.is_active,
-                "status": m.logs[-1].status if m.logs else "pending",
-                "start_date": m.start_date.isoformat() if m.start_date else None,
-                "end_date": m.end_date.isoformat() if m.end_date else None,
-                "last_taken": m.logs[-1].taken_at.isoformat() if m.logs else None
-            } for m in medications]
-        }), 200
+            query = query.filter(ElderProfile.caretaker_id == user_id)
+
+        rows = query.order_by(Medication.id).yield_per(serializers.STREAM_BATCH_ROWS)
+        return serializers.stream_json({}, "medications", rows, serializers.MEDICATION_LIST)
         
     except Exception as e:
         print(f"Error in get_medications: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/medications', methods=['POST'])
+@write_transaction
 @jwt_required()
 def add_medication():
     """Add new medication"""
     try:
         user_id = int(get_jwt_identity())
         data = request.json
-        user = User.query.get(user_id)
+        user = current_user()
         
         elder_id = resolve_elder_id_for_user(user, data.get('elder_id'))
         if not elder_id:
@@ -378,6 +696,7 @@ def add_medication():
         return jsonify({"error": str(e)}), 500
 
 @app.route('/medications/<int:med_id>/log', methods=['POST'])
+@write_transaction
 @jwt_required()
 def log_medication(med_id):
     """Log medication taken"""
@@ -393,41 +712,30 @@ def log_medication(med_id):
             notes=data.get('notes')
         )
         db.session.add(log)
-        db.session.commit()
+        db.session.flush()
         
-        # Notify care team and create caretaker notification
-        elder_profile = ElderProfile.query.get(medication.elder_id)
+        # Caretaker notification and care team event go out after commit, off the request thread
+        elder_profile = elder_summary(medication.elder_id)
         if elder_profile.caretaker_id:
-            notification = Notification(
-                elder_id=medication.elder_id,
-                recipient_user_id=elder_profile.caretaker_id,
-                title="Medication Taken",
-                message=f"{elder_profile.user.full_name} took {medication.name}",
-                notification_type="medication"
+            side_effects.defer(
+                db.session, 'notify', medication.elder_id,
+                elder_profile.caretaker_id, medication.elder_id, "medication",
+                "Medication Taken", f"{elder_profile.full_name} took {medication.name}",
             )
-            db.session.add(notification)
-            db.session.commit()
-
-            socketio.emit('notification_created', {
-                'recipient_user_id': elder_profile.caretaker_id,
-                'title': notification.title,
-                'message': notification.message,
-                'type': notification.notification_type,
-                'created_at': notification.created_at.isoformat(),
-            }, room=f'user_{elder_profile.caretaker_id}')
-
-        emit_to_care_team(medication.elder_id, 'medication_logged', {
+        emit_many_to_care_team(medication.elder_id, [('medication_logged', {
             'medication_id': med_id,
             'elder_id': medication.elder_id,
-            'elder_name': elder_profile.user.full_name,
+            'elder_name': elder_profile.full_name,
             'medication_name': medication.name,
             'status': log.status,
             'time': log.taken_at.isoformat()
-        })
+        })], defer=True)
+        log_id = log.id
+        db.session.commit()
         
         return jsonify({
             "message": "Medication logged successfully",
-            "log_id": log.id
+            "log_id": log_id
         }), 201
         
     except Exception as e:
@@ -435,6 +743,7 @@ def log_medication(med_id):
         return jsonify({"error": str(e)}), 500
 
 @app.route('/medications/<int:med_id>', methods=['PUT'])
+@write_transaction
 @jwt_required()
 def update_medication(med_id):
     """Update medication details"""
@@ -488,6 +797,7 @@ def update_medication(med_id):
         return jsonify({"error": str(e)}), 500
 
 @app.route('/medications/<int:med_id>', methods=['DELETE'])
+@write_transaction
 @jwt_required()
 def delete_medication(med_id):
     """Delete (deactivate) medication"""
@@ -522,76 +832,258 @@ def get_health_records():
     """Get health records"""
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = current_user()
         elder_id = request.args.get('elder_id')
         record_type = request.args.get('type')
         days = int(request.args.get('days', 30))
+        try:
+            page = parse_page_args(request.args, serializers.HEALTH_RECORD.fields)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         if user.user_type == 'elder':
-            elder_profile = ElderProfile.query.filter_by(user_id=user_id).first()
-            elder_id = elder_profile.id
+            elder_id = user.elder_profile_id
         elif not elder_id:
             elder_id = resolve_elder_id_for_user(user)
 
         if not elder_id:
             return jsonify({"records": []}), 200
         
+        not_modified = versions.conditional([versions.elder(elder_id, 'health_records')], user.id)
+        if not_modified:
+            return not_modified
+        
+        cutoff_date = datetime.utcnow() - timedelta(days=days)
+        
+        resolution = request.args.get('resolution')
+        if resolution:
+            # Aggregated series from the hourly/daily rollup tables
+            if resolution not in vitals.RESOLUTIONS:
+                return jsonify({"error": "resolution must be 'hour' or 'day'"}), 400
+            query = HealthRollup.query.filter(
+                HealthRollup.elder_id == elder_id,
+                HealthRollup.resolution == resolution,
+                HealthRollup.bucket_start >= vitals.bucket_start(cutoff_date, resolution)
+            )
+            if record_type:
+                query = query.filter(HealthRollup.record_type == record_type)
+            rollups = query.order_by(HealthRollup.bucket_start.desc()).all()
+            return jsonify({"rollups": [vitals.serialize_rollup(r) for r in rollups]}), 200
+        
         query = HealthRecord.query.filter_by(elder_id=elder_id)
         if record_type:
             query = query.filter_by(record_type=record_type)
         
-        cutoff_date = datetime.utcnow() - timedelta(days=days)
-        records = query.filter(HealthRecord.recorded_at >= cutoff_date).order_by(HealthRecord.recorded_at.desc()).all()
+        query = query.filter(HealthRecord.recorded_at >= cutoff_date)
+        records, next_cursor = paginate(
+            query, HealthRecord, HealthRecord.recorded_at, page, descending=True,
+            field_map=serializers.HEALTH_RECORD.fields, lazy=True
+        )
+        if page.limit is None:
+            # Unpaginated history can run to thousands of rows: stream it
+            return serializers.stream_json({"next_cursor": None}, "records", records,
+                                           serializers.HEALTH_RECORD, page.fields)
         
         return jsonify({
-            "records": [{
-                "id": r.id,
-                "type": r.record_type,
-                "value": r.value,
-                "unit": r.unit,
-                "notes": r.notes,
-                "recorded_at": r.recorded_at.isoformat()
-            } for r in records]
+            "records": serializers.HEALTH_RECORD.many(records, page.fields),
+            "next_cursor": next_cursor
         }), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/health-records/anomalies', methods=['GET'])
+@jwt_required()
+def get_health_anomalies():
+    """Abnormal readings (range breaches and baseline outliers) over recent history"""
+    try:
+        user = current_user()
+        elder_id = resolve_elder_id_for_user(user, request.args.get('elder_id'))
+        if not elder_id:
+            return jsonify({"anomalies": []}), 200
+
+        days = int(request.args.get('days', 30))
+        since = datetime.utcnow() - timedelta(days=days)
+        anomalies = vitals_analytics.scan(
+            elder_ids=[int(elder_id)], since=since, record_type=request.args.get('type')
+        )
+        anomalies.sort(key=lambda a: a['recorded_at'], reverse=True)
+
+        return jsonify({
+            "anomalies": [dict(a, recorded_at=a['recorded_at'].isoformat()) for a in anomalies]
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/health-records', methods=['POST'])
+@write_transaction
 @jwt_required()
 def add_health_record():
     """Add health record"""
     try:
         user_id = int(get_jwt_identity())
         data = request.json
-        user = User.query.get(user_id)
+        user = current_user()
         
         elder_id = resolve_elder_id_for_user(user, data.get('elder_id'))
         if not elder_id:
             return jsonify({"error": "No elder profile found"}), 404
         
+        value_primary, value_secondary = vitals.parse_vital_value(data.get('value'))
         record = HealthRecord(
             elder_id=elder_id,
             record_type=data.get('type'),
             value=data.get('value'),
+            value_primary=value_primary,
+            value_secondary=value_secondary,
             unit=data.get('unit'),
-            notes=data.get('notes')
+            notes=data.get('notes'),
+            recorded_at=datetime.utcnow()
         )
         db.session.add(record)
-        db.session.commit()
+        vitals.apply_record(record)
+        db.session.flush()
+        anomalies = anomaly_tracker.observe(record)
         
-        elder_profile = ElderProfile.query.get(elder_id)
-        emit_to_care_team(elder_id, 'health_record_added', {
+        # Event, notifications and alerts are queued now and sent once the record commits
+        elder_profile = elder_summary(elder_id)
+        emit_many_to_care_team(elder_id, [('health_record_added', {
             'elder_id': elder_id,
-            'elder_name': elder_profile.user.full_name,
+            'elder_name': elder_profile.full_name,
             'type': record.record_type,
             'value': record.value,
             'unit': record.unit
-        })
+        })], defer=True)
+        for anomaly, notice in vitals_analytics.notification_args(anomalies):
+            alert_care_team(elder_id, notice, 'health_alert', {
+                'elder_id': elder_id,
+                'elder_name': elder_profile.full_name,
+                'record_id': record.id,
+                'type': record.record_type,
+                'component': anomaly['component'],
+                'value': anomaly['value'],
+                'reason': anomaly['reason'],
+                'message': notice[4]
+            }, defer=True)
+        record_id = record.id
+        db.session.commit()
         
         return jsonify({
             "message": "Health record added successfully",
-            "record_id": record.id
+            "record_id": record_id
+        }), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/health-records/bulk', methods=['POST'])
+@write_transaction
+@jwt_required()
+def add_health_records_bulk():
+    """Add many health records (e.g. a wearable sync) in one transaction"""
+    try:
+        user_id = int(get_jwt_identity())
+        data = request.json or {}
+        user = current_user()
+        
+        elder_id = resolve_elder_id_for_user(user, data.get('elder_id'))
+        if not elder_id:
+            return jsonify({"error": "No elder profile found"}), 404
+        elder_id = int(elder_id)
+        
+        items = data.get('records')
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "records must be a non-empty list"}), 400
+        if len(items) > HEALTH_BULK_MAX_RECORDS:
+            return jsonify({"error": f"At most {HEALTH_BULK_MAX_RECORDS} records per upload"}), 400
+        
+        rows = []
+        errors = []
+        for index, item in enumerate(items):
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError("record must be an object")
+                record_type = item.get('type')
+                value = item.get('value')
+                if not record_type or not isinstance(record_type, str):
+                    raise ValueError("type is required")
+                if value is None or str(value).strip() == '':
+                    raise ValueError("value is required")
+                value = str(value)
+                if len(record_type) > 50 or len(value) > 50:
+                    raise ValueError("type and value must be at most 50 characters")
+                value_primary, value_secondary = vitals.parse_vital_value(value)
+                rows.append(dict(
+                    elder_id=elder_id,
+                    record_type=record_type,
+                    value=value,
+                    value_primary=value_primary,
+                    value_secondary=value_secondary,
+                    unit=item.get('unit'),
+                    notes=item.get('notes'),
+                    recorded_at=parse_fix_time(item.get('recorded_at')),
+                ))
+            except (TypeError, ValueError, AttributeError, OverflowError, OSError) as e:
+                errors.append({"index": index, "error": str(e)})
+        
+        if not rows:
+            return jsonify({"error": "No valid records in upload", "errors": errors}), 400
+        
+        # One multi-row INSERT, rollups folded in bulk, one commit
+        inserted = db.session.execute(
+            HealthRecord.__table__.insert().returning(HealthRecord.__table__.c.id),
+            rows
+        )
+        record_ids = sorted(row.id for row in inserted)
+        sync_log.record(db.session, 'health_records', record_ids, elder_id=elder_id)
+        versions.bump(db.session, [versions.elder(elder_id, 'health_records')])
+        vitals.apply_readings(rows)
+        db.session.flush()
+        
+        new_ids = set(record_ids)
+        anomalies = [a for a in vitals_analytics.scan_upload(elder_id, rows) if a['record_id'] in new_ids]
+        
+        # Alerts are queued now and sent once the records commit
+        elder_profile = elder_summary(elder_id)
+        for anomaly, notice in vitals_analytics.notification_args(anomalies):
+            alert_care_team(elder_id, notice, 'health_alert', {
+                'elder_id': elder_id,
+                'elder_name': elder_profile.full_name,
+                'record_id': anomaly['record_id'],
+                'type': anomaly['record_type'],
+                'component': anomaly['component'],
+                'value': anomaly['value'],
+                'reason': anomaly['reason'],
+                'message': notice[4]
+            }, defer=True)
+        db.session.commit()
+        for record_type in {r['record_type'] for r in rows}:
+            anomaly_tracker.forget(elder_id, record_type)
+        
+        # One summarized event instead of one per reading
+        by_type = {}
+        for row in rows:
+            by_type[row['record_type']] = by_type.get(row['record_type'], 0) + 1
+        latest = max(rows, key=lambda r: r['recorded_at'])
+        emit_to_care_team(elder_id, 'health_records_bulk_added', {
+            'elder_id': elder_id,
+            'elder_name': elder_profile.full_name,
+            'count': len(rows),
+            'by_type': by_type,
+            'from': min(r['recorded_at'] for r in rows).isoformat(),
+            'to': latest['recorded_at'].isoformat(),
+            'anomalies': len(anomalies)
+        })
+        
+        return jsonify({
+            "message": "Health records added successfully",
+            "received": len(items),
+            "stored": len(rows),
+            "record_ids": record_ids,
+            "anomalies": len(anomalies),
+            "errors": errors
         }), 201
         
     except Exception as e:
@@ -599,6 +1091,7 @@ def add_health_record():
         return jsonify({"error": str(e)}), 500
 
 @app.route('/health-records/<int:record_id>', methods=['DELETE'])
+@write_transaction
 @jwt_required()
 def delete_health_record(record_id):
     """Delete health record"""
@@ -610,8 +1103,15 @@ def delete_health_record(record_id):
             return jsonify({"error": "Health record not found"}), 404
         
         elder_id = record.elder_id
+        record_type = record.record_type
+        recorded_at = record.recorded_at
+        had_value = record.value_primary is not None
         db.session.delete(record)
+        if had_value and record_type:
+            db.session.flush()
+            vitals.recompute_buckets(elder_id, record_type, recorded_at)
         db.session.commit()
+        anomaly_tracker.forget(elder_id, record_type)
 
         emit_to_care_team(elder_id, 'health_record_deleted', {
             'record_id': record_id,
@@ -634,12 +1134,15 @@ def get_meals():
     """Get meals"""
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = current_user()
         date_str = request.args.get('date')
+        try:
+            page = parse_page_args(request.args, serializers.MEAL.fields)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         if user.user_type == 'elder':
-            elder_profile = ElderProfile.query.filter_by(user_id=user_id).first()
-            elder_id = elder_profile.id
+            elder_id = user.elder_profile_id
         else:
             elder_id = request.args.get('elder_id', type=int)
             if not elder_id:
@@ -648,33 +1151,27 @@ def get_meals():
         if not elder_id:
             return jsonify({"meals": []}), 200
         
+        not_modified = versions.conditional([versions.elder(elder_id, 'meals')], user.id)
+        if not_modified:
+            return not_modified
+        
         query = Meal.query.filter_by(elder_id=elder_id)
         if date_str:
             date = datetime.fromisoformat(date_str).date()
             query = query.filter(db.func.date(Meal.created_at) == date)
         
-        meals = query.order_by(Meal.scheduled_time.desc()).all()
+        meals, next_cursor = paginate(query, Meal, Meal.scheduled_time, page, descending=True, field_map=serializers.MEAL.fields)
         
         return jsonify({
-            "meals": [{
-                "id": m.id,
-                "meal_type": m.meal_type,
-                "meal_name": m.meal_name,
-                "calories": m.calories,
-                "protein": m.protein,
-                "carbs": m.carbs,
-                "fats": m.fats,
-                "consumed": m.consumed,
-                "consumed_at": m.consumed_at.isoformat() if m.consumed_at else None,
-                "scheduled_time": m.scheduled_time.isoformat() if m.scheduled_time else None,
-                "notes": m.notes
-            } for m in meals]
+            "meals": serializers.MEAL.many(meals, page.fields),
+            "next_cursor": next_cursor
         }), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/meals/<int:meal_id>/consume', methods=['POST'])
+@write_transaction
 @jwt_required()
 def consume_meal(meal_id):
     """Mark meal as consumed"""
@@ -682,17 +1179,17 @@ def consume_meal(meal_id):
         meal = Meal.query.get_or_404(meal_id)
         meal.consumed = True
         meal.consumed_at = datetime.utcnow()
-        db.session.commit()
         
-        # Notify care team
-        elder_profile = ElderProfile.query.get(meal.elder_id)
-        emit_to_care_team(meal.elder_id, 'meal_consumed', {
+        # Notify care team once the change is committed
+        elder_profile = elder_summary(meal.elder_id)
+        emit_many_to_care_team(meal.elder_id, [('meal_consumed', {
             'meal_id': meal_id,
             'elder_id': meal.elder_id,
-            'elder_name': elder_profile.user.full_name,
+            'elder_name': elder_profile.full_name,
             'meal_type': meal.meal_type,
             'meal_name': meal.meal_name
-        })
+        })], defer=True)
+        db.session.commit()
         
         return jsonify({"message": "Meal marked as consumed"}), 200
         
@@ -701,13 +1198,14 @@ def consume_meal(meal_id):
         return jsonify({"error": str(e)}), 500
 
 @app.route('/meals', methods=['POST'])
+@write_transaction
 @jwt_required()
 def add_meal():
     """Add meal plan/entry"""
     try:
         user_id = int(get_jwt_identity())
         data = request.json
-        user = User.query.get(user_id)
+        user = current_user()
 
         elder_id = resolve_elder_id_for_user(user, data.get('elder_id'))
         if not elder_id:
@@ -734,11 +1232,11 @@ def add_meal():
         db.session.add(meal)
         db.session.commit()
 
-        elder_profile = ElderProfile.query.get(elder_id)
+        elder_profile = elder_summary(elder_id)
         emit_to_care_team(elder_id, 'meal_added', {
             'meal_id': meal.id,
             'elder_id': elder_id,
-            'elder_name': elder_profile.user.full_name,
+            'elder_name': elder_profile.full_name,
             'meal_type': meal.meal_type,
             'meal_name': meal.meal_name,
             'scheduled_time': meal.scheduled_time.isoformat() if meal.scheduled_time else None,
@@ -763,41 +1261,42 @@ def get_appointments():
     """Get appointments"""
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = current_user()
+        try:
+            page = parse_page_args(request.args, serializers.APPOINTMENT.fields)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        elder_ids = [user.elder_profile_id] if user.user_type == 'elder' else user.elder_ids
+        not_modified = versions.conditional([versions.elder(e, 'appointments') for e in elder_ids if e], user.id)
+        if not_modified:
+            return not_modified
         
         if user.user_type == 'elder':
-            elder_profile = ElderProfile.query.filter_by(user_id=user_id).first()
-            appointments = Appointment.query.filter_by(elder_id=elder_profile.id).order_by(Appointment.appointment_date).all()
+            query = Appointment.query.filter_by(elder_id=user.elder_profile_id)
         else:
-            elder_ids = [e.id for e in ElderProfile.query.filter_by(caretaker_id=user_id).all()]
-            appointments = Appointment.query.filter(Appointment.elder_id.in_(elder_ids)).order_by(Appointment.appointment_date).all()
+            query = Appointment.query.filter(Appointment.elder_id.in_(user.elder_ids))
+        appointments, next_cursor = paginate(
+            query, Appointment, Appointment.appointment_date, page, field_map=serializers.APPOINTMENT.fields
+        )
         
         return jsonify({
-            "appointments": [{
-                "id": a.id,
-                "elder_id": a.elder_id,
-                "elder_name": a.elder.user.full_name,
-                "title": a.title,
-                "doctor_name": a.doctor_name,
-                "location": a.location,
-                "appointment_date": a.appointment_date.isoformat(),
-                "duration_minutes": a.duration_minutes,
-                "status": a.status,
-                "notes": a.notes
-            } for a in appointments]
+            "appointments": serializers.APPOINTMENT.many(appointments, page.fields),
+            "next_cursor": next_cursor
         }), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/appointments', methods=['POST'])
+@write_transaction
 @jwt_required()
 def add_appointment():
     """Add appointment"""
     try:
         user_id = int(get_jwt_identity())
         data = request.json
-        user = User.query.get(user_id)
+        user = current_user()
         
         elder_id = resolve_elder_id_for_user(user, data.get('elder_id'))
         if not elder_id:
@@ -832,6 +1331,7 @@ def add_appointment():
         return jsonify({"error": str(e)}), 500
 
 @app.route('/appointments/<int:appointment_id>', methods=['PUT'])
+@write_transaction
 @jwt_required()
 def update_appointment(appointment_id):
     """Update appointment"""
@@ -887,6 +1387,7 @@ def update_appointment(appointment_id):
         return jsonify({"error": str(e)}), 500
 
 @app.route('/appointments/<int:appointment_id>', methods=['DELETE'])
+@write_transaction
 @jwt_required()
 def delete_appointment(appointment_id):
     """Delete appointment"""
@@ -922,23 +1423,31 @@ def get_notifications():
     """Get user notifications"""
     try:
         user_id = int(get_jwt_identity())
-        notifications = Notification.query.filter_by(recipient_user_id=user_id).order_by(Notification.created_at.desc()).limit(50).all()
+        try:
+            page = parse_page_args(request.args, serializers.NOTIFICATION.fields, default_limit=50)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        not_modified = versions.conditional([versions.user(user_id, 'notifications')], user_id)
+        if not_modified:
+            return not_modified
+        
+        rows, next_cursor = paginate(
+            Notification.query.filter_by(recipient_user_id=user_id),
+            Notification, Notification.created_at, page, descending=True, field_map=serializers.NOTIFICATION.fields
+        )
         
         return jsonify({
-            "notifications": [{
-                "id": n.id,
-                "title": n.title,
-                "message": n.message,
-                "type": n.notification_type,
-                "is_read": n.is_read,
-                "created_at": n.created_at.isoformat()
-            } for n in notifications]
+            "notifications": serializers.NOTIFICATION.many(rows, page.fields),
+            "unread_count": notifications.unread_count(user_id),
+            "next_cursor": next_cursor
         }), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/notifications/<int:notif_id>/read', methods=['POST'])
+@write_transaction
 @jwt_required()
 def mark_notification_read(notif_id):
     """Mark notification as read"""
@@ -953,23 +1462,78 @@ def mark_notification_read(notif_id):
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
+@app.route('/notifications/unread-count', methods=['GET'])
+@jwt_required()
+def get_unread_count():
+    """Unread notifications for the current user (maintained counter, no table scan)"""
+    try:
+        user_id = int(get_jwt_identity())
+        return jsonify({"unread_count": notifications.unread_count(user_id)}), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/notifications/read', methods=['POST'])
+@write_transaction
+@jwt_required()
+def mark_notifications_read():
+    """Mark many notifications read: {"ids": [...]}, {"before": timestamp} or {"all": true}"""
+    try:
+        user_id = int(get_jwt_identity())
+        data = request.json or {}
+        
+        ids = data.get('ids')
+        before = data.get('before')
+        if ids is None and before is None and not data.get('all'):
+            return jsonify({"error": "Provide ids, before or all"}), 400
+        try:
+            if ids is not None:
+                if not isinstance(ids, list):
+                    raise ValueError("ids must be a list")
+                ids = [int(notification_id) for notification_id in ids]
+            if before is not None:
+                before = parse_fix_time(before)
+        except (TypeError, ValueError, OverflowError, OSError) as e:
+            return jsonify({"error": str(e)}), 400
+        
+        changed = notifications.mark_read(user_id, ids=ids, before=before) if ids != [] else []
+        db.session.commit()
+        unread = notifications.unread_count(user_id)
+        
+        # Other devices of the same user update their badge
+        socketio.emit('notifications_read', {
+            'ids': changed,
+            'unread_count': unread
+        }, room=f'user_{user_id}')
+        
+        return jsonify({
+            "message": "Notifications marked as read",
+            "updated": len(changed),
+            "unread_count": unread
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
 # ===========================
 # LOCATION TRACKING ROUTES
 # ===========================
 
 @app.route('/location', methods=['POST'])
+@write_transaction
 @jwt_required()
 def update_location():
     """Update elder location"""
     try:
         user_id = int(get_jwt_identity())
         data = request.json
-        user = User.query.get(user_id)
+        user = current_user()
         
         if user.user_type != 'elder':
             return jsonify({"error": "Only elders can update location"}), 400
         
-        elder_profile = ElderProfile.query.filter_by(user_id=user_id).first()
+        elder_profile = elder_summary(user.elder_profile_id)
         
         location = LocationLog(
             elder_id=elder_profile.id,
@@ -978,20 +1542,127 @@ def update_location():
             accuracy=data.get('accuracy')
         )
         db.session.add(location)
+        db.session.flush()
+        # Stamped with the version this write bumped, so the next GET is served from the cache
+        fix = dict(location_fix(location), version=location_version(elder_profile.id))
+        process_geofences(elder_profile, user.full_name, [fix])
         db.session.commit()
+        location_cache.set(elder_profile.id, fix)
         
-        # Notify caretaker in real-time
-        if elder_profile.caretaker_id:
-            socketio.emit('location_updated', {
+        # Geofence alerts (queued above) and the caretaker's live position go out through the outbox
+        emit_many_to_care_team(elder_profile.id, [('location_updated', {
+            'elder_id': elder_profile.id,
+            'elder_name': user.full_name,
+            'latitude': fix['latitude'],
+            'longitude': fix['longitude'],
+            'accuracy': fix['accuracy'],
+            'timestamp': fix['recorded_at'].isoformat()
+        })], caretaker_only=True)
+        
+        return jsonify({"message": "Location updated successfully"}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/location/batch', methods=['POST'])
+@write_transaction
+@jwt_required()
+def update_location_batch():
+    """Store a batch of location fixes collected on the device"""
+    try:
+        user_id = int(get_jwt_identity())
+        data = request.json or {}
+        user = current_user()
+        
+        if user.user_type != 'elder':
+            return jsonify({"error": "Only elders can update location"}), 400
+        
+        raw_fixes = data.get('fixes')
+        if not isinstance(raw_fixes, list) or not raw_fixes:
+            return jsonify({"error": "fixes must be a non-empty list"}), 400
+        if len(raw_fixes) > LOCATION_BATCH_MAX_FIXES:
+            return jsonify({"error": f"At most {LOCATION_BATCH_MAX_FIXES} fixes per batch"}), 400
+        
+        fixes = []
+        rejected = 0
+        for item in raw_fixes:
+            try:
+                latitude = float(item['latitude'])
+                longitude = float(item['longitude'])
+                if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                    raise ValueError("coordinates out of range")
+                accuracy = item.get('accuracy')
+                fixes.append({
+                    'latitude': latitude,
+                    'longitude': longitude,
+                    'accuracy': float(accuracy) if accuracy is not None else None,
+                    'recorded_at': parse_fix_time(item.get('timestamp')),
+                })
+            except (KeyError, TypeError, ValueError, AttributeError, OverflowError, OSError):
+                rejected += 1
+        
+        if not fixes:
+            return jsonify({"error": "No valid fixes in batch", "rejected": rejected}), 400
+        
+        elder_profile = elder_summary(user.elder_profile_id)
+        fixes.sort(key=lambda f: f['recorded_at'])
+        
+        # A retried upload: fixes already stored (same timestamp) are not stored twice
+        stored_at = {row.recorded_at for row in db.session.query(LocationLog.recorded_at).filter(
+            LocationLog.elder_id == elder_profile.id,
+            LocationLog.recorded_at.between(fixes[0]['recorded_at'], fixes[-1]['recorded_at'])
+        )}
+        fixes = [fix for fix in fixes if fix['recorded_at'] not in stored_at]
+        if not fixes:
+            return jsonify({
+                "message": "Locations already stored",
+                "received": len(raw_fixes),
+                "stored": 0,
+                "rejected": rejected
+            }), 200
+        
+        previous_fix = location_cache.get(elder_profile.id, location_version(elder_profile.id))
+        if previous_fix is None:
+            previous = LocationLog.query.filter_by(elder_id=elder_profile.id).order_by(LocationLog.recorded_at.desc()).first()
+            previous_fix = location_fix(previous) if previous else None
+        
+        # Fixes recorded before the stored position (a late upload) are history only:
+        # they don't move the latest position or the geofence state
+        is_newer = lambda fix: previous_fix is None or fix['recorded_at'] > previous_fix['recorded_at']
+        kept = downsample_fixes(fixes, LOCATION_MIN_DISTANCE_M,
+                                previous=previous_fix if is_newer(fixes[0]) else None)
+        newer = [fix for fix in kept if is_newer(fix)]
+        
+        # One multi-row INSERT and one commit for the whole batch
+        db.session.execute(
+            LocationLog.__table__.insert(),
+            [dict(fix, elder_id=elder_profile.id) for fix in kept]
+        )
+        versions.bump(db.session, [versions.elder(elder_profile.id, 'location_logs')])
+        version = location_version(elder_profile.id)
+        process_geofences(elder_profile, user.full_name, newer)
+        db.session.commit()
+        
+        # Caretaker only needs the most recent point, and only if the batch moved it
+        latest = newer[-1] if newer else previous_fix
+        location_cache.set(elder_profile.id, dict(latest, version=version))
+        if newer:
+            emit_many_to_care_team(elder_profile.id, [('location_updated', {
                 'elder_id': elder_profile.id,
                 'elder_name': user.full_name,
-                'latitude': location.latitude,
-                'longitude': location.longitude,
-                'accuracy': location.accuracy,
-                'timestamp': location.recorded_at.isoformat()
-            }, room=f'user_{elder_profile.caretaker_id}')
+                'latitude': latest['latitude'],
+                'longitude': latest['longitude'],
+                'accuracy': latest['accuracy'],
+                'timestamp': latest['recorded_at'].isoformat()
+            })], caretaker_only=True)
         
-        return jsonify({"message": "Location updated successfully"}), 200
+        return jsonify({
+            "message": "Locations updated successfully",
+            "received": len(raw_fixes),
+            "stored": len(kept),
+            "rejected": rejected
+        }), 200
         
     except Exception as e:
         db.session.rollback()
@@ -1002,21 +1673,250 @@ def update_location():
 def get_location(elder_id):
     """Get elder's latest location"""
     try:
-        location = LocationLog.query.filter_by(elder_id=elder_id).order_by(LocationLog.recorded_at.desc()).first()
+        if not can_access_elder(current_user(), elder_id):
+            return jsonify({"error": "Access denied"}), 403
+        
+        location_key = versions.elder(elder_id, 'location_logs')
+        not_modified = versions.conditional([location_key])
+        if not_modified:
+            return not_modified
         
-        if not location:
+        fix = cached_location(elder_id, location_version(elder_id))
+        if fix is None:
             return jsonify({"error": "No location data found"}), 404
         
         return jsonify({
-            "latitude": location.latitude,
-            "longitude": location.longitude,
-            "accuracy": location.accuracy,
-            "recorded_at": location.recorded_at.isoformat()
+            "latitude": fix['latitude'],
+            "longitude": fix['longitude'],
+            "accuracy": fix['accuracy'],
+            "recorded_at": fix['recorded_at'].isoformat()
         }), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/location/<int:elder_id>/history', methods=['GET'])
+@jwt_required()
+def get_location_history(elder_id):
+    """Get elder's simplified trajectory over a time range"""
+    try:
+        if not can_access_elder(current_user(), elder_id):
+            return jsonify({"error": "Access denied"}), 403
+        
+        to_time = parse_fix_time(request.args.get('to')) if request.args.get('to') else datetime.utcnow()
+        from_time = parse_fix_time(request.args.get('from')) if request.args.get('from') else to_time - timedelta(days=1)
+        tolerance = float(request.args.get('tolerance', 10))
+        encoding = request.args.get('format', 'json')
+        
+        if from_time >= to_time:
+            return jsonify({"error": "'from' must be before 'to'"}), 400
+        if to_time - from_time > timedelta(days=LOCATION_HISTORY_MAX_DAYS):
+            return jsonify({"error": f"Range cannot exceed {LOCATION_HISTORY_MAX_DAYS} days"}), 400
+        if encoding not in ('json', 'polyline'):
+            return jsonify({"error": "format must be 'json' or 'polyline'"}), 400
+        
+        # Stream plain column tuples instead of materializing ORM objects
+        rows = db.session.query(LocationLog.latitude, LocationLog.longitude, LocationLog.recorded_at) \
+            .filter(LocationLog.elder_id == elder_id,
+                    LocationLog.recorded_at >= from_time,
+                    LocationLog.recorded_at < to_time) \
+            .order_by(LocationLog.recorded_at) \
+            .yield_per(1000)
+        
+        coords = []
+        times = []
+        for latitude, longitude, recorded_at in rows:
+            coords.append((latitude, longitude))
+            times.append(recorded_at)
+        
+        kept = simplify_track(coords, tolerance)
+        result = {
+            "elder_id": elder_id,
+            "from": from_time.isoformat(),
+            "to": to_time.isoformat(),
+            "tolerance": tolerance,
+            "raw_points": len(coords),
+            "point_count": len(kept),
+        }
+        
+        if encoding == 'polyline':
+            start = times[kept[0]] if kept else None
+            result.update({
+                "polyline": encode_polyline([coords[i] for i in kept]),
+                "start": start.isoformat() if start else None,
+                # Seconds since the previous kept point
+                "time_deltas": [
+                    int(round((times[i] - times[prev]).total_seconds()))
+                    for prev, i in zip([kept[0]] + kept[:-1], kept)
+                ] if kept else [],
+            })
+        else:
+            result["points"] = [{
+                "latitude": coords[i][0],
+                "longitude": coords[i][1],
+                "recorded_at": times[i].isoformat()
+            } for i in kept]
+        
+        return jsonify(result), 200
+        
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# ===========================
+# GEOFENCE ROUTES
+# ===========================
+
+@app.route('/geofences', methods=['GET'])
+@jwt_required()
+def get_geofences():
+    """Get safe zones for an elder"""
+    try:
+        user_id = int(get_jwt_identity())
+        user = current_user()
+        
+        elder_id = resolve_elder_id_for_user(user, request.args.get('elder_id', type=int))
+        if not elder_id:
+            return jsonify({"geofences": []}), 200
+        if not can_access_elder(user, elder_id):
+            return jsonify({"error": "Access denied"}), 403
+        
+        zones = SafeZone.query.filter_by(elder_id=elder_id, is_active=True).all()
+        
+        return jsonify({
+            "geofences": [{
+                "id": z.id,
+                "elder_id": z.elder_id,
+                "name": z.name,
+                "latitude": z.latitude,
+                "longitude": z.longitude,
+                "radius_m": z.radius_m,
+                "created_at": z.created_at.isoformat()
+            } for z in zones]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/geofences', methods=['POST'])
+@write_transaction
+@jwt_required()
+def add_geofence():
+    """Add a safe zone"""
+    try:
+        user_id = int(get_jwt_identity())
+        data = request.json
+        user = current_user()
+        
+        elder_id = resolve_elder_id_for_user(user, data.get('elder_id'))
+        if not elder_id:
+            return jsonify({"error": "No elder profile found"}), 404
+        if not can_access_elder(user, elder_id):
+            return jsonify({"error": "Access denied"}), 403
+        
+        if data.get('latitude') is None or data.get('longitude') is None or not data.get('name'):
+            return jsonify({"error": "name, latitude and longitude are required"}), 400
+        
+        zone = SafeZone(
+            elder_id=elder_id,
+            name=data.get('name'),
+            latitude=float(data.get('latitude')),
+            longitude=float(data.get('longitude')),
+            radius_m=float(data.get('radius_m', 200)),
+            created_by=user_id
+        )
+        db.session.add(zone)
+        db.session.commit()
+        geofence_engine.invalidate(elder_id)
+        
+        emit_to_care_team(elder_id, 'geofence_added', {
+            'geofence_id': zone.id,
+            'elder_id': elder_id,
+            'name': zone.name,
+        })
+        
+        return jsonify({
+            "message": "Safe zone added successfully",
+            "geofence_id": zone.id
+        }), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/geofences/<int:geofence_id>', methods=['PUT'])
+@write_transaction
+@jwt_required()
+def update_geofence(geofence_id):
+    """Update a safe zone"""
+    try:
+        user_id = int(get_jwt_identity())
+        data = request.json
+        zone = SafeZone.query.get(geofence_id)
+        
+        if not zone:
+            return jsonify({"error": "Safe zone not found"}), 404
+        if not can_access_elder(current_user(), zone.elder_id):
+            return jsonify({"error": "Access denied"}), 403
+        
+        if 'name' in data:
+            zone.name = data['name']
+        if 'latitude' in data:
+            zone.latitude = float(data['latitude'])
+        if 'longitude' in data:
+            zone.longitude = float(data['longitude'])
+        if 'radius_m' in data:
+            zone.radius_m = float(data['radius_m'])
+        if 'is_active' in data:
+            zone.is_active = data['is_active']
+        
+        db.session.commit()
+        geofence_engine.invalidate(zone.elder_id)
+        
+        emit_to_care_team(zone.elder_id, 'geofence_updated', {
+            'geofence_id': zone.id,
+            'elder_id': zone.elder_id,
+            'name': zone.name,
+        })
+        
+        return jsonify({"message": "Safe zone updated successfully"}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/geofences/<int:geofence_id>', methods=['DELETE'])
+@write_transaction
+@jwt_required()
+def delete_geofence(geofence_id):
+    """Delete a safe zone"""
+    try:
+        user_id = int(get_jwt_identity())
+        zone = SafeZone.query.get(geofence_id)
+        
+        if not zone:
+            return jsonify({"error": "Safe zone not found"}), 404
+        if not can_access_elder(current_user(), zone.elder_id):
+            return jsonify({"error": "Access denied"}), 403
+        
+        elder_id = zone.elder_id
+        geofence_states.forget_zone(geofence_id)
+        db.session.delete(zone)
+        db.session.commit()
+        geofence_engine.invalidate(elder_id)
+        
+        emit_to_care_team(elder_id, 'geofence_deleted', {
+            'geofence_id': geofence_id,
+            'elder_id': elder_id,
+        })
+        
+        return jsonify({"message": "Safe zone deleted successfully"}), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
 # ===========================
 # EMERGENCY CONTACTS ROUTES
 # ===========================
@@ -1027,11 +1927,14 @@ def get_emergency_contacts():
     """Get emergency contacts"""
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = current_user()
+        try:
+            page = parse_page_args(request.args, serializers.EMERGENCY_CONTACT.fields)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         if user.user_type == 'elder':
-            elder_profile = ElderProfile.query.filter_by(user_id=user_id).first()
-            elder_id = elder_profile.id
+            elder_id = user.elder_profile_id
         else:
             elder_id = request.args.get('elder_id', type=int)
             if not elder_id:
@@ -1040,30 +1943,32 @@ def get_emergency_contacts():
         if not elder_id:
             return jsonify({"contacts": []}), 200
         
-        contacts = EmergencyContact.query.filter_by(elder_id=elder_id).all()
+        not_modified = versions.conditional([versions.elder(elder_id, 'emergency_contacts')], user.id)
+        if not_modified:
+            return not_modified
+        
+        contacts, next_cursor = paginate(
+            EmergencyContact.query.filter_by(elder_id=elder_id),
+            EmergencyContact, EmergencyContact.id, page, field_map=serializers.EMERGENCY_CONTACT.fields
+        )
         
         return jsonify({
-            "contacts": [{
-                "id": c.id,
-                "name": c.name,
-                "relationship": c.relationship,
-                "phone": c.phone,
-                "email": c.email,
-                "is_primary": c.is_primary
-            } for c in contacts]
+            "contacts": serializers.EMERGENCY_CONTACT.many(contacts, page.fields),
+            "next_cursor": next_cursor
         }), 200
         
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/emergency-contacts', methods=['POST'])
+@write_transaction
 @jwt_required()
 def add_emergency_contact():
     """Add emergency contact"""
     try:
         user_id = int(get_jwt_identity())
         data = request.json
-        user = User.query.get(user_id)
+        user = current_user()
         
         elder_id = resolve_elder_id_for_user(user, data.get('elder_id'))
         if not elder_id:
@@ -1097,6 +2002,7 @@ def add_emergency_contact():
         return jsonify({"error": str(e)}), 500
 
 @app.route('/emergency-contacts/<int:contact_id>', methods=['PUT'])
+@write_transaction
 @jwt_required()
 def update_emergency_contact(contact_id):
     """Update emergency contact"""
@@ -1145,6 +2051,7 @@ def update_emergency_contact(contact_id):
         return jsonify({"error": str(e)}), 500
 
 @app.route('/emergency-contacts/<int:contact_id>', methods=['DELETE'])
+@write_transaction
 @jwt_required()
 def delete_emergency_contact(contact_id):
     """Delete emergency contact"""
@@ -1187,7 +2094,7 @@ def transcribe():
         audio_file = request.files['file']
         audio_bytes = audio_file.read()
         
-        client = speech.SpeechClient()
+        client = ai_clients.get('speech_to_text')
         audio = speech.RecognitionAudio(content=audio_bytes)
         config = speech.RecognitionConfig(
             language_code="en-US",
@@ -1205,22 +2112,25 @@ def transcribe():
         return jsonify({"error": str(e)}), 500
 
 @app.route('/chat', methods=['POST'])
+@jwt_required()
 def chat():
-    """Chat with Gemini AI"""
+    """Chat with Gemini AI (history is kept per user)"""
     try:
         if model is None:
             return jsonify({"error": "Chatbot is not configured on the server"}), 503
 
         data = request.json
         user_message = data.get("message", "")
+        # Never key by client address: behind a proxy every user shares one
+        session_key = f"user:{get_jwt_identity()}"
         
-        conversation_history.append(f"User: {user_message}")
-        prompt = "\n".join(conversation_history[-10:]) + "\nAssistant:"
+        conversation_store.append(session_key, f"User: {user_message}")
+        prompt = "\n".join(conversation_store.history(session_key)) + "\nAssistant:"
         
         response = model.generate_content(prompt)
         bot_response = response.text
         
-        conversation_history.append(f"Assistant: {bot_response}")
+        conversation_store.append(session_key, f"Assistant: {bot_response}")
         
         return jsonify({"response": bot_response})
     except Exception as e:
@@ -1236,30 +2146,38 @@ def speak():
         data = request.json
         text = data.get("text", "")
         
-        client = texttospeech.TextToSpeechClient()
-        synthesis_input = texttospeech.SynthesisInput(text=text)
-        voice = texttospeech.VoiceSelectionParams(
-            language_code="en-US",
-            ssml_gender=texttospeech.SsmlVoiceGender.FEMALE
-        )
-        audio_config = texttospeech.AudioConfig(
-            audio_encoding=texttospeech.AudioEncoding.LINEAR16
-        )
-        
-        response = client.synthesize_speech(
-            input=synthesis_input,
-            voice=voice,
-            audio_config=audio_config
+        audio_content = tts_cache.get_or_synthesize(
+            text, f"{TTS_LANGUAGE}/{TTS_VOICE_GENDER}", TTS_ENCODING, synthesize_speech_audio
         )
         
         return send_file(
-            io.BytesIO(response.audio_content),
+            io.BytesIO(audio_content),
             mimetype="audio/wav",
             download_name="response.wav"
         )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def synthesize_speech_audio(text, voice, encoding):
+    """Call Google Text-to-Speech (used on TTS cache misses)"""
+    language_code, gender = voice.split('/')
+    client = ai_clients.get('text_to_speech')
+    synthesis_input = texttospeech.SynthesisInput(text=text)
+    voice_params = texttospeech.VoiceSelectionParams(
+        language_code=language_code,
+        ssml_gender=texttospeech.SsmlVoiceGender[gender]
+    )
+    audio_config = texttospeech.AudioConfig(
+        audio_encoding=texttospeech.AudioEncoding[encoding]
+    )
+    
+    response = client.synthesize_speech(
+        input=synthesis_input,
+        voice=voice_params,
+        audio_config=audio_config
+    )
+    return response.audio_content
+
 # ===========================
 # PRESCRIPTION ENDPOINTS
 # ===========================
@@ -1270,49 +2188,54 @@ def get_prescriptions():
     """Get all prescriptions for the authenticated user"""
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = current_user()
         
         if not user:
             return jsonify({"error": "User not found"}), 404
+        try:
+            page = parse_page_args(request.args, serializers.PRESCRIPTION.fields)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         # Get elder_id based on user type
         if user.user_type == 'elder':
-            elder_id = user.elder_profile.id
+            elder_id = user.elder_profile_id
         else:  # caretaker
             elder_id = request.args.get('elder_id', type=int)
             if not elder_id:
                 # Get all elders under this caretaker
-                elders = ElderProfile.query.filter_by(caretaker_id=user_id).all()
-                if not elders:
+                if not user.elder_ids:
                     return jsonify({"prescriptions": []}), 200
-                elder_id = elders[0].id
+                elder_id = user.elder_ids[0]
+        
+        if not elder_id:
+            return jsonify({"prescriptions": []}), 200
         
-        prescriptions = Prescription.query.filter_by(elder_id=elder_id).order_by(Prescription.date.desc()).all()
+        not_modified = versions.conditional([versions.elder(elder_id, 'prescriptions')], user.id)
+        if not_modified:
+            return not_modified
+        
+        prescriptions, next_cursor = paginate(
+            Prescription.query.filter_by(elder_id=elder_id),
+            Prescription, Prescription.date, page, descending=True, field_map=serializers.PRESCRIPTION.fields
+        )
         
         return jsonify({
-            "prescriptions": [{
-                "id": p.id,
-                "elder_id": p.elder_id,
-                "doctor_name": p.doctor_name,
-                "date": p.date.isoformat() if p.date else None,
-                "diagnosis": p.diagnosis,
-                "medicines": p.medicines,
-                "notes": p.notes,
-                "image_path": p.image_path,
-                "created_at": p.created_at.isoformat()
-            } for p in prescriptions]
+            "prescriptions": serializers.PRESCRIPTION.many(prescriptions, page.fields),
+            "next_cursor": next_cursor
         }), 200
     except Exception as e:
         print(f"Error fetching prescriptions: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/prescriptions', methods=['POST'])
+@write_transaction
 @jwt_required()
 def add_prescription():
     """Add a new prescription"""
     try:
         user_id = int(get_jwt_identity())
-        user = User.query.get(user_id)
+        user = current_user()
         
         if not user:
             return jsonify({"error": "User not found"}), 404
@@ -1321,14 +2244,13 @@ def add_prescription():
         
         # Get elder_id based on user type
         if user.user_type == 'elder':
-            elder_id = user.elder_profile.id
+            elder_id = user.elder_profile_id
         else:  # caretaker
             elder_id = data.get('elder_id')
             if not elder_id:
-                elders = ElderProfile.query.filter_by(caretaker_id=user_id).all()
-                if not elders:
+                if not user.elder_ids:
                     return jsonify({"error": "No elder profile found"}), 404
-                elder_id = elders[0].id
+                elder_id = user.elder_ids[0]
         
         prescription = Prescription(
             elder_id=elder_id,
@@ -1341,27 +2263,29 @@ def add_prescription():
         )
         
         db.session.add(prescription)
-        db.session.commit()
-
-        emit_to_care_team(elder_id, 'prescription_added', {
+        db.session.flush()
+        
+        body = {
+            "id": prescription.id,
+            "elder_id": prescription.elder_id,
+            "doctor_name": prescription.doctor_name,
+            "date": prescription.date.isoformat(),
+            "diagnosis": prescription.diagnosis,
+            "medicines": prescription.medicines,
+            "notes": prescription.notes,
+            "image_path": prescription.image_path
+        }
+        emit_many_to_care_team(elder_id, [('prescription_added', {
             'prescription_id': prescription.id,
             'elder_id': elder_id,
             'doctor_name': prescription.doctor_name,
             'date': prescription.date.isoformat(),
-        })
+        })], defer=True)
+        db.session.commit()
         
         return jsonify({
             "message": "Prescription added successfully",
-            "prescription": {
-                "id": prescription.id,
-                "elder_id": prescription.elder_id,
-                "doctor_name": prescription.doctor_name,
-                "date": prescription.date.isoformat(),
-                "diagnosis": prescription.diagnosis,
-                "medicines": prescription.medicines,
-                "notes": prescription.notes,
-                "image_path": prescription.image_path
-            }
+            "prescription": body
         }), 201
     except Exception as e:
         db.session.rollback()
@@ -1369,6 +2293,7 @@ def add_prescription():
         return jsonify({"error": str(e)}), 500
 
 @app.route('/prescriptions/<int:prescription_id>', methods=['PUT'])
+@write_transaction
 @jwt_required()
 def update_prescription(prescription_id):
     """Update an existing prescription"""
@@ -1422,6 +2347,7 @@ def update_prescription(prescription_id):
         return jsonify({"error": str(e)}), 500
 
 @app.route('/prescriptions/<int:prescription_id>', methods=['DELETE'])
+@write_transaction
 @jwt_required()
 def delete_prescription(prescription_id):
     """Delete a prescription"""
@@ -1447,6 +2373,127 @@ def delete_prescription(prescription_id):
         print(f"Error deleting prescription: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
+# ===========================
+# DASHBOARD ROUTES
+# ===========================
+
+# Elder resources the cached part of a dashboard summary is built from
+DASHBOARD_RESOURCES = ('medications', 'medication_logs', 'appointments', 'health_records')
+
+@app.route('/dashboard', methods=['GET'])
+@jwt_required()
+def get_dashboard():
+    """Per-elder summary for the dashboard in one round trip"""
+    try:
+        user = current_user()
+        elder_ids = [user.elder_profile_id] if user.user_type == 'elder' else list(user.elder_ids)
+        elder_ids = [elder_id for elder_id in elder_ids if elder_id]
+        if not elder_ids:
+            return jsonify({"elders": []}), 200
+        
+        not_modified = versions.conditional(
+            [versions.elder(e, r) for e in elder_ids for r in DASHBOARD_RESOURCES + ('location_logs',)]
+            + [versions.user(user.id, 'notifications')],
+            user.id
+        )
+        if not_modified:
+            return not_modified
+        
+        # Cached parts are checked against the versions behind the ETag (see versions.stamp)
+        summaries = dashboard_cache.summaries(elder_ids, {
+            e: versions.stamp([versions.elder(e, r) for r in DASHBOARD_RESOURCES]) for e in elder_ids
+        })
+        unread = dashboard.unread_counts(user.id, elder_ids)
+        profiles = elder_summaries(elder_ids)
+        
+        location_stamps = {e: versions.stamp([versions.elder(e, 'location_logs')]) for e in elder_ids}
+        locations = {}
+        missing = []
+        for elder_id in elder_ids:
+            fix = location_cache.get(elder_id, location_stamps[elder_id])
+            if fix is None:
+                missing.append(elder_id)
+            else:
+                locations[elder_id] = fix
+        if missing:
+            for elder_id, location in dashboard.latest_locations(missing).items():
+                locations[elder_id] = dict(location_fix(location), version=location_stamps[elder_id])
+                location_cache.set(elder_id, locations[elder_id])
+        
+        elders = []
+        for elder_id in elder_ids:
+            fix = locations.get(elder_id)
+            elders.append(dict(
+                summaries[elder_id],
+                elder_id=elder_id,
+                elder_name=profiles[elder_id].full_name if elder_id in profiles else None,
+                unread_notifications=unread.get(elder_id, 0),
+                last_location={
+                    "latitude": fix['latitude'],
+                    "longitude": fix['longitude'],
+                    "accuracy": fix['accuracy'],
+                    "recorded_at": fix['recorded_at'].isoformat()
+                } if fix else None
+            ))
+        
+        return jsonify({"elders": elders}), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+# ===========================
+# SYNC ROUTES
+# ===========================
+
+@app.route('/sync', methods=['GET'])
+@jwt_required()
+def sync_changes():
+    """Changes to the user's data since a cursor from a previous sync"""
+    try:
+        user = current_user()
+        elder_ids = [user.elder_profile_id] if user.user_type == 'elder' else list(user.elder_ids)
+        elder_ids = [elder_id for elder_id in elder_ids if elder_id]
+        
+        since = request.args.get('since')
+        if since in (None, ''):
+            # First sync: the client loads full lists, then syncs from here
+            return jsonify({"cursor": str(sync_log.current_cursor()), "reset": True, "changes": {}}), 200
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+        
+        oldest = sync_log.oldest_cursor()
+        if oldest is not None and since < oldest - 1:
+            # Entries after the cursor were pruned; the client must reload
+            return jsonify({"cursor": str(sync_log.current_cursor()), "reset": True, "changes": {}}), 200
+        
+        changes = sync_log.changes_since(since, elder_ids, user.id, SYNC_MAX_CHANGES)
+        has_more = len(changes) > SYNC_MAX_CHANGES
+        changes = changes[:SYNC_MAX_CHANGES]
+        cursor = changes[-1].id if changes else since
+        
+        payload = {}
+        for entity, ops in sync_log.collapse(changes).items():
+            upserted_ids = [entity_id for entity_id, op in ops.items() if op == 'upsert']
+            rows = sync_log.load_rows(entity, upserted_ids, elder_ids, user.id) if upserted_ids else []
+            found = {row.id for row in rows}
+            payload[entity] = {
+                "upserted": serializers.SYNC[entity].many(rows),
+                # Upserts whose row is gone (deleted later, or moved out of scope) count as deletes
+                "deleted": [entity_id for entity_id, op in ops.items() if op == 'delete' or entity_id not in found]
+            }
+        
+        return jsonify({
+            "cursor": str(cursor),
+            "reset": False,
+            "has_more": has_more,
+            "changes": payload
+        }), 200
+        
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # ===========================
 # WEBSOCKET EVENTS
 # ===========================
@@ -1475,6 +2522,10 @@ def handle_leave(data):
     leave_room(f'user_{user_id}')
     print(f'User {user_id} left their room')
 
+# Re-run views that hit "database is locked" before committing (all routes are registered by now)
+if sqlite_tuned:
+    sqlite_tuning.wrap_views(app, db.session)
+
 # ===========================
 # MAIN
 # ===========================
@@ -0,0 +1,86 @@
+"""
+Benchmark: health record ingestion, one request per reading vs. bulk upload.
+
+Drives the real endpoints through Flask's test client against a throwaway
+SQLite database: N readings posted one at a time to POST /health-records,
+then the same N readings in chunks to POST /health-records/bulk. Both paths
+include rollup maintenance, anomaly checks and socket emits.
+
+Usage:
+    python benchmarks/bench_health_ingest.py [readings ...]
+    python benchmarks/bench_health_ingest.py 500 2000 --chunk 500
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+START = datetime(2025, 1, 1)
+
+
+def readings(count):
+    """Heart rate, SpO2 and blood pressure samples one minute apart"""
+    result = []
+    for i in range(count):
+        kind = i % 3
+        if kind == 0:
+            item = {"type": "heart_rate", "value": str(random.randint(60, 90)), "unit": "bpm"}
+        elif kind == 1:
+            item = {"type": "oxygen_saturation", "value": str(random.randint(94, 99)), "unit": "%"}
+        else:
+            item = {"type": "blood_pressure", "value": f"{random.randint(110, 130)}/{random.randint(70, 85)}", "unit": "mmHg"}
+        item["recorded_at"] = (START + timedelta(minutes=i)).isoformat()
+        result.append(item)
+    return result
+
+
+def signup(client, email):
+    response = client.post('/auth/signup', json={
+        'email': email, 'password': 'bench', 'full_name': 'Bench Elder', 'user_type': 'elder'
+    })
+    return {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('sizes', nargs='*', type=int, default=[200, 1000])
+    parser.add_argument('--chunk', type=int, default=500, help="readings per bulk request")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ.setdefault('AI_CLIENT_WARMUP', 'false')
+    from app_new import app
+
+    client = app.test_client()
+    print(f"{'readings':>9} | {'single (rows/s)':>15} | {'bulk (rows/s)':>13} | {'speedup':>7}")
+    print("-" * 54)
+    for run, size in enumerate(args.sizes):
+        data = readings(size)
+
+        headers = signup(client, f"single{run}@bench.local")
+        started = time.perf_counter()
+        for item in data:
+            client.post('/health-records', json=item, headers=headers)
+        single = size / (time.perf_counter() - started)
+
+        headers = signup(client, f"bulk{run}@bench.local")
+        started = time.perf_counter()
+        for offset in range(0, size, args.chunk):
+            client.post('/health-records/bulk', json={'records': data[offset:offset + args.chunk]}, headers=headers)
+        bulk = size / (time.perf_counter() - started)
+
+        print(f"{size:>9} | {single:>15.0f} | {bulk:>13.0f} | {bulk / single:>6.1f}x")
+
+    shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark: latest-location and time-range queries as location_logs grows.
+
+Runs the same queries the API issues (GET /location/<elder_id> and a one-hour
+range for one elder) against a throwaway SQLite database, first without the
+composite index on (elder_id, recorded_at) and then after ensure_indexes().
+
+Usage:
+    python benchmarks/bench_location_index.py [rows ...]
+    python benchmarks/bench_location_index.py 10000 100000 1000000 3000000
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from models import db, ensure_indexes, LocationLog
+
+ELDERS = 200
+REPEAT = 200
+START = datetime(2025, 1, 1)
+
+
+def build_app(db_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def fill(rows):
+    """Insert rows spread across ELDERS elders, one fix every ~10s"""
+    batch = []
+    for i in range(rows):
+        batch.append(dict(
+            elder_id=random.randint(1, ELDERS),
+            latitude=12.9 + random.random() / 100,
+            longitude=77.5 + random.random() / 100,
+            accuracy=10.0,
+            recorded_at=START + timedelta(seconds=i * 10 // ELDERS),
+        ))
+        if len(batch) == 50000:
+            insert(batch)
+            batch = []
+    if batch:
+        insert(batch)
+
+
+def insert(batch):
+    db.session.execute(LocationLog.__table__.insert(), batch)
+    db.session.commit()
+
+
+def time_queries(rows):
+    span_seconds = max(rows * 10 // ELDERS - 3600, 1)
+    latest = []
+    hour_range = []
+    for _ in range(REPEAT):
+        elder_id = random.randint(1, ELDERS)
+
+        started = time.perf_counter()
+        LocationLog.query.filter_by(elder_id=elder_id).order_by(LocationLog.recorded_at.desc()).first()
+        latest.append(time.perf_counter() - started)
+
+        window_start = START + timedelta(seconds=random.randint(0, span_seconds))
+        started = time.perf_counter()
+        LocationLog.query.filter(
+            LocationLog.elder_id == elder_id,
+            LocationLog.recorded_at >= window_start,
+            LocationLog.recorded_at < window_start + timedelta(hours=1),
+        ).order_by(LocationLog.recorded_at).all()
+        hour_range.append(time.perf_counter() - started)
+
+    latest.sort()
+    hour_range.sort()
+    return latest[len(latest) // 2] * 1000, hour_range[len(hour_range) // 2] * 1000
+
+
+def drop_indexes():
+    for index in LocationLog.__table__.indexes:
+        db.session.execute(db.text(f"DROP INDEX IF EXISTS {index.name}"))
+    db.session.commit()
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000]
+    print(f"{'rows':>10} | {'latest (no idx)':>15} | {'latest (idx)':>12} | {'1h range (no idx)':>17} | {'1h range (idx)':>14}")
+    print("-" * 82)
+    for rows in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            app = build_app(os.path.join(tmp, 'bench.db'))
+            with app.app_context():
+                db.create_all()
+                drop_indexes()
+                fill(rows)
+
+                latest_plain, range_plain = time_queries(rows)
+                ensure_indexes(db.engine)
+                db.session.execute(db.text("ANALYZE"))
+                latest_idx, range_idx = time_queries(rows)
+                db.session.remove()
+                db.engine.dispose()
+
+        print(f"{rows:>10} | {latest_plain:>12.3f} ms | {latest_idx:>9.3f} ms | "
+              f"{range_plain:>14.3f} ms | {range_idx:>11.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark: CPU time and peak memory of large list responses.
+
+Seeds a throwaway SQLite database with one elder owning N health records and
+N active medications (each with a log), then fetches GET /health-records and
+GET /medications without a page limit through Flask's test client, reading
+the whole body. Each endpoint is measured twice: CPU time (process time,
+best of --repeat) in a plain pass, and peak Python heap (tracemalloc) in a
+separate pass, since tracing slows everything down.
+
+Run it with JSON_ENCODER=stdlib and without (orjson, if installed) to compare
+encoders, or against an older checkout to compare the whole response path.
+
+Usage:
+    python benchmarks/bench_serialization.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+
+def seed(db, elder_id, rows):
+    from sqlalchemy import insert
+    from models import HealthRecord, Medication, MedicationLog
+
+    now = datetime.utcnow()
+    db.session.execute(insert(HealthRecord), [{
+        'elder_id': elder_id, 'record_type': 'heart_rate', 'value': str(60 + i % 30), 'value_primary': 60 + i % 30,
+        'unit': 'bpm', 'notes': 'resting' if i % 7 == 0 else None,
+        'recorded_at': now - timedelta(minutes=i),
+    } for i in range(rows)])
+    db.session.execute(insert(Medication), [{
+        'elder_id': elder_id, 'name': f'Medication {i}', 'dosage': '10mg', 'frequency': 'Daily',
+        'time': '8:00 AM', 'instructions': 'Take with water', 'is_active': True,
+        'start_date': now.date() - timedelta(days=30), 'end_date': None,
+    } for i in range(rows)])
+    db.session.execute(insert(MedicationLog), [{
+        'medication_id': i + 1, 'taken_at': now - timedelta(hours=i % 24), 'status': 'taken',
+    } for i in range(rows)])
+    db.session.commit()
+
+
+def fetch(client, path, headers):
+    response = client.get(path, headers=headers)
+    body = response.get_data()
+    assert response.status_code == 200, (path, response.status_code, body[:200])
+    return body
+
+
+def measure(client, path, headers, repeat):
+    cpu = []
+    for _ in range(repeat):
+        started = time.process_time()
+        body = fetch(client, path, headers)
+        cpu.append(time.process_time() - started)
+
+    tracemalloc.start()
+    fetch(client, path, headers)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(cpu), peak, len(body)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    os.environ.setdefault('AI_CLIENT_WARMUP', 'false')
+    try:
+        from app_new import app, db
+
+        client = app.test_client()
+        response = client.post('/auth/signup', json={
+            'email': 'elder@bench.local', 'password': 'bench', 'full_name': 'Bench Elder', 'user_type': 'elder'
+        }).get_json()
+        headers = {'Authorization': f"Bearer {response['access_token']}"}
+        with app.app_context():
+            seed(db, 1, args.rows)  # first profile in a fresh database
+
+        encoder = getattr(app.json, 'backend', 'flask')
+        print(f"{args.rows} rows, JSON encoder: {encoder}")
+        print(f"{'endpoint':>16} | {'cpu (best)':>10} | {'peak heap':>10} | {'body':>9}")
+        print("-" * 56)
+        for path in ('/health-records', '/medications'):
+            cpu, peak, size = measure(client, path, headers, args.repeat)
+            print(f"{path:>16} | {cpu * 1000:>8.1f}ms | {peak / 2 ** 20:>8.1f}MB | {size / 1024:>7.0f}KB")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,219 @@
+"""
+Benchmark: read latency while location and health writes run concurrently.
+
+Writers and readers run in separate processes, like gunicorn workers, so
+SQLite's locking rather than the GIL decides who waits. Each workload runs
+twice against a throwaway SQLite file: with pysqlite defaults (rollback
+journal) and with the WAL/busy_timeout settings from sqlite_tuning.py.
+
+- storage: writers insert location fixes and a heart-rate reading per
+  transaction through a SQLAlchemy engine; readers fetch the latest fix and
+  recent readings. Isolates the database from request handling.
+- api: writers post to POST /location and POST /health-records, readers poll
+  GET /medications and GET /location/<id> (no ETags, so every read hits the
+  database) through the Flask test client with SQLITE_TUNING on or off.
+
+Usage:
+    python benchmarks/bench_sqlite_concurrency.py [--layer storage|api|both]
+        [--seconds 10] [--writers 4] [--readers 4]
+"""
+import argparse
+from datetime import datetime
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def summarize(latencies, errors):
+    reads, writes = latencies['read'], latencies['write']
+    return {
+        'reads': len(reads),
+        'read_p50_ms': percentile(reads, 0.5) * 1000,
+        'read_p99_ms': percentile(reads, 0.99) * 1000,
+        'read_max_ms': max(reads, default=0) * 1000,
+        'writes': len(writes),
+        'write_p99_ms': percentile(writes, 0.99) * 1000,
+        'errors': errors['read'] + errors['write'],
+    }
+
+
+def run_processes(target, writers, readers, *args):
+    """Fork writer and reader processes that start together; collect their latencies"""
+    context = multiprocessing.get_context('fork')
+    barrier = context.Barrier(writers + readers)
+    results = context.Queue()
+    processes = [context.Process(target=target, args=('write', i, barrier, results) + args) for i in range(writers)]
+    processes += [context.Process(target=target, args=('read', i, barrier, results) + args) for i in range(readers)]
+    for process in processes:
+        process.start()
+    latencies = {'read': [], 'write': []}
+    errors = {'read': 0, 'write': 0}
+    for _ in processes:
+        role, values, failed = results.get()
+        latencies[role].extend(values)
+        errors[role] += failed
+    for process in processes:
+        process.join()
+    return summarize(latencies, errors)
+
+
+def storage_worker(role, index, barrier, results, url, tuned, seconds):
+    from sqlalchemy import create_engine, func, insert, select
+    from models import LocationLog, HealthRecord
+    from sqlite_tuning import SQLiteTuning
+
+    engine = create_engine(url)
+    if tuned:
+        SQLiteTuning().install(engine)
+    locations, records = LocationLog.__table__, HealthRecord.__table__
+    latencies, errors = [], 0
+    barrier.wait()
+    stop = time.perf_counter() + seconds
+    i = 0
+    while time.perf_counter() < stop:
+        started = time.perf_counter()
+        try:
+            with engine.connect().execution_options(sqlite_deferred=role == 'read') as connection, \
+                    connection.begin():
+                if role == 'write':
+                    now = datetime.utcnow()
+                    connection.execute(insert(locations), [
+                        {'elder_id': 1, 'latitude': 12.97 + index * 1e-4, 'longitude': 77.59 + (i * 10 + k) * 1e-6,
+                         'accuracy': 5.0, 'recorded_at': now}
+                        for k in range(10)
+                    ])
+                    connection.execute(insert(records).values(
+                        elder_id=1, record_type='heart_rate', value=str(60 + i % 30), value_primary=60 + i % 30,
+                        unit='bpm', recorded_at=now))
+                else:
+                    connection.execute(select(locations).where(locations.c.elder_id == 1)
+                                       .order_by(locations.c.recorded_at.desc()).limit(1)).first()
+                    connection.execute(select(func.count()).select_from(records)
+                                       .where(records.c.elder_id == 1, records.c.record_type == 'heart_rate')).scalar()
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - started)
+        i += 1
+    results.put((role, latencies, errors))
+
+
+def run_storage(seconds, writers, readers, tuned):
+    from sqlalchemy import create_engine
+    from models import LocationLog, HealthRecord
+
+    tmp = tempfile.mkdtemp()
+    url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    engine = create_engine(url)
+    LocationLog.__table__.create(engine)
+    HealthRecord.__table__.create(engine)
+    engine.dispose()
+    try:
+        return run_processes(storage_worker, writers, readers, url, tuned, seconds)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def api_worker(role, index, barrier, results, headers, elder_id, seconds):
+    from app_new import app
+
+    client = app.test_client()
+    latencies, errors = [], 0
+    barrier.wait()
+    stop = time.perf_counter() + seconds
+    i = 0
+    while time.perf_counter() < stop:
+        started = time.perf_counter()
+        if role == 'write':
+            if i % 2:
+                body = {'latitude': 12.97 + index * 1e-4, 'longitude': 77.59 + i * 1e-5, 'accuracy': 5}
+                status = client.post('/location', json=body, headers=headers).status_code
+            else:
+                body = {'type': 'heart_rate', 'value': str(60 + i % 30), 'unit': 'bpm'}
+                status = client.post('/health-records', json=body, headers=headers).status_code
+        else:
+            path = '/medications' if i % 2 else f'/location/{elder_id}'
+            status = client.get(path, headers=headers).status_code
+        latencies.append(time.perf_counter() - started)
+        if status >= 300 and status != 404:
+            errors += 1
+        i += 1
+    results.put((role, latencies, errors))
+
+
+def run_api(seconds, writers, readers):
+    """Runs in a fresh interpreter (app_new reads SQLITE_TUNING at import)"""
+    from app_new import app, db
+
+    client = app.test_client()
+    response = client.post('/auth/signup', json={
+        'email': 'elder@bench.local', 'password': 'bench', 'full_name': 'Bench Elder', 'user_type': 'elder'
+    }).get_json()
+    headers = {'Authorization': f"Bearer {response['access_token']}"}
+    elder_id = 1  # first profile in a fresh database
+    for i in range(20):
+        client.post('/medications', json={'name': f'Med {i}', 'dosage': '10mg'}, headers=headers)
+    with app.app_context():
+        db.engine.dispose()  # children open their own connections
+    return run_processes(api_worker, writers, readers, headers, elder_id, seconds)
+
+
+def api_in_subprocess(args, tuned):
+    tmp = tempfile.mkdtemp()
+    env = dict(os.environ, SQLITE_TUNING='true' if tuned else 'false', AI_CLIENT_WARMUP='false',
+               DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+    try:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--api-child', '--seconds', str(args.seconds),
+             '--writers', str(args.writers), '--readers', str(args.readers)],
+            env=env, cwd=SERVER_DIR, capture_output=True, text=True,
+        ).stdout
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--layer', choices=('storage', 'api', 'both'), default='both')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--api-child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.api_child:
+        print(json.dumps(run_api(args.seconds, args.writers, args.readers)))
+        return
+
+    print(f"{'layer':>7} | {'mode':>7} | {'reads/s':>8} | {'read p50':>9} | {'read p99':>9} | {'read max':>9} | "
+          f"{'writes/s':>8} | {'write p99':>9} | {'errors':>6}")
+    print("-" * 102)
+    layers = ('storage', 'api') if args.layer == 'both' else (args.layer,)
+    for layer in layers:
+        for mode, tuned in (('default', False), ('tuned', True)):
+            if layer == 'storage':
+                result = run_storage(args.seconds, args.writers, args.readers, tuned)
+            else:
+                result = api_in_subprocess(args, tuned)
+            print(f"{layer:>7} | {mode:>7} | {result['reads'] / args.seconds:>8.0f} | "
+                  f"{result['read_p50_ms']:>7.2f}ms | {result['read_p99_ms']:>7.2f}ms | {result['read_max_ms']:>7.1f}ms | "
+                  f"{result['writes'] / args.seconds:>8.0f} | {result['write_p99_ms']:>7.2f}ms | {result['errors']:>6}")
+
+
+if __name__ == '__main__':
+    main()
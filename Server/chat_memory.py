@@ -0,0 +1,115 @@
+"""
+Per-user conversation memory for the chatbot.
+
+Each session (keyed by the caller's identity) keeps a bounded ring buffer of
+recent lines. Idle sessions are evicted in LRU order, and a global byte cap
+keeps total memory bounded no matter how many users talk to the bot.
+"""
+from collections import OrderedDict, deque
+import threading
+import time
+
+
+class _Session:
+    __slots__ = ('lines', 'size', 'last_seen')
+
+    def __init__(self, max_lines):
+        self.lines = deque(maxlen=max_lines)
+        self.size = 0
+        self.last_seen = time.monotonic()
+
+
+class ConversationStore:
+    """Thread-safe, bounded, per-session conversation history"""
+
+    def __init__(self, max_lines=10, max_sessions=1000, idle_ttl=1800,
+                 max_bytes=8 * 1024 * 1024, max_line_chars=2000):
+        self.max_lines = max_lines
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self.max_line_chars = max_line_chars
+        self._sessions = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def append(self, key, line):
+        """Append a line to a session, evicting old lines/sessions as needed"""
+        line = line[:self.max_line_chars]
+        line_size = len(line.encode('utf-8'))
+        now = time.monotonic()
+
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is not None and now - session.last_seen > self.idle_ttl:
+                # Expired: start over instead of reviving the stale history
+                self._drop(key)
+                session = None
+            if session is None:
+                session = _Session(self.max_lines)
+                self._sessions[key] = session
+            else:
+                self._sessions.move_to_end(key)
+
+            if len(session.lines) == session.lines.maxlen:
+                dropped = session.lines[0]
+                dropped_size = len(dropped.encode('utf-8'))
+                session.size -= dropped_size
+                self._total_bytes -= dropped_size
+
+            session.lines.append(line)
+            session.size += line_size
+            session.last_seen = now
+            self._total_bytes += line_size
+
+            self._evict(now, keep=key)
+
+            # Still over the cap with only this session left: trim its oldest lines
+            while self._total_bytes > self.max_bytes and len(session.lines) > 1:
+                dropped_size = len(session.lines.popleft().encode('utf-8'))
+                session.size -= dropped_size
+                self._total_bytes -= dropped_size
+
+    def history(self, key):
+        """Return a snapshot of a session's lines (oldest first)"""
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                return []
+            if time.monotonic() - session.last_seen > self.idle_ttl:
+                self._drop(key)
+                return []
+            self._sessions.move_to_end(key)
+            return list(session.lines)
+
+    def clear(self, key):
+        with self._lock:
+            self._drop(key)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _drop(self, key):
+        session = self._sessions.pop(key, None)
+        if session is not None:
+            self._total_bytes -= session.size
+
+    def _evict(self, now, keep=None):
+        # Sessions are kept in LRU order, so idle ones sit at the front.
+        while self._sessions:
+            key, session = next(iter(self._sessions.items()))
+            if key == keep:
+                break
+            over_limit = (
+                len(self._sessions) > self.max_sessions
+                or self._total_bytes > self.max_bytes
+                or now - session.last_seen > self.idle_ttl
+            )
+            if not over_limit:
+                break
+            self._drop(key)
@@ -0,0 +1,147 @@
+"""
+Caretaker dashboard summaries.
+
+GET /dashboard returns one summary per elder: today's medication doses,
+the next appointment and the latest reading of each vital. These parts are
+computed for all requested elders at once with three grouped queries and
+cached per elder for a short TTL; sync_log notifies us after each commit
+that touches an elder's data, so cached entries are dropped as soon as they
+go stale. Writes in other worker processes aren't seen by that hook, so each
+entry also carries the resource versions it was built from and is rebuilt
+when they change. Per-user parts (unread notifications) and the last location
+(served by the location cache) are added on every request.
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case, exists
+
+from models import db, Medication, MedicationLog, Appointment, HealthRecord, Notification, LocationLog, ElderProfile
+from user_context import TTLCache
+
+
+class DashboardCache:
+    """elder_id -> cached summary parts (medications, next appointment, vitals)"""
+
+    def __init__(self, ttl_seconds=30, vitals_days=30):
+        self.cache = TTLCache(ttl_seconds)
+        self.vitals_days = vitals_days
+
+    def invalidate(self, elder_ids):
+        for elder_id in elder_ids:
+            self.cache.invalidate(elder_id)
+
+    def summaries(self, elder_ids, stamps=None):
+        """elder_id -> summary dict, computing cache misses in one batch.
+
+        stamps: elder_id -> versions.stamp() of the elder's resources; cached
+        entries built from other versions count as misses.
+        """
+        stamps = stamps or {}
+        result = {}
+        missing = []
+        for elder_id in elder_ids:
+            entry = self.cache.get(elder_id)
+            if entry is None or entry[0] != stamps.get(elder_id):
+                missing.append(elder_id)
+            else:
+                result[elder_id] = entry[1]
+        if missing:
+            for elder_id, summary in self._compute(missing).items():
+                self.cache.set(elder_id, (stamps.get(elder_id), summary))
+                result[elder_id] = summary
+        return result
+
+    def _compute(self, elder_ids):
+        now = datetime.utcnow()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        summaries = {
+            elder_id: {
+                "medications": {"active": 0, "taken_today": 0, "pending_today": 0},
+                "next_appointment": None,
+                "latest_vitals": {},
+            }
+            for elder_id in elder_ids
+        }
+
+        # 1. Active medications and how many were taken today
+        taken_today = exists().where(and_(
+            MedicationLog.medication_id == Medication.id,
+            MedicationLog.taken_at >= today,
+            MedicationLog.status == 'taken',
+        ))
+        medication_rows = db.session.query(
+            Medication.elder_id,
+            db.func.count(Medication.id),
+            db.func.sum(case((taken_today, 1), else_=0)),
+        ).filter(
+            Medication.elder_id.in_(elder_ids), Medication.is_active == True
+        ).group_by(Medication.elder_id)
+        for elder_id, active, taken in medication_rows:
+            taken = int(taken or 0)
+            summaries[elder_id]["medications"] = {
+                "active": active,
+                "taken_today": taken,
+                "pending_today": max(active - taken, 0),
+            }
+
+        # 2. Next scheduled appointment per elder
+        ranked = db.session.query(
+            Appointment.id, Appointment.elder_id, Appointment.title, Appointment.doctor_name,
+            Appointment.location, Appointment.appointment_date,
+            db.func.row_number().over(
+                partition_by=Appointment.elder_id,
+                order_by=(Appointment.appointment_date, Appointment.id)
+            ).label('rank')
+        ).filter(
+            Appointment.elder_id.in_(elder_ids),
+            Appointment.appointment_date >= now,
+            Appointment.status == 'scheduled',
+        ).subquery()
+        for row in db.session.query(ranked).filter(ranked.c.rank == 1):
+            summaries[row.elder_id]["next_appointment"] = {
+                "id": row.id,
+                "title": row.title,
+                "doctor_name": row.doctor_name,
+                "location": row.location,
+                "appointment_date": row.appointment_date.isoformat(),
+            }
+
+        # 3. Latest reading of each vital type
+        ranked = db.session.query(
+            HealthRecord.elder_id, HealthRecord.record_type, HealthRecord.value,
+            HealthRecord.unit, HealthRecord.recorded_at,
+            db.func.row_number().over(
+                partition_by=(HealthRecord.elder_id, HealthRecord.record_type),
+                order_by=(HealthRecord.recorded_at.desc(), HealthRecord.id.desc())
+            ).label('rank')
+        ).filter(
+            HealthRecord.elder_id.in_(elder_ids),
+            HealthRecord.recorded_at >= now - timedelta(days=self.vitals_days),
+        ).subquery()
+        for row in db.session.query(ranked).filter(ranked.c.rank == 1):
+            summaries[row.elder_id]["latest_vitals"][row.record_type] = {
+                "value": row.value,
+                "unit": row.unit,
+                "recorded_at": row.recorded_at.isoformat(),
+            }
+
+        return summaries
+
+
+def unread_counts(user_id, elder_ids):
+    """elder_id -> unread notifications for this user about that elder (one query)"""
+    rows = db.session.query(Notification.elder_id, db.func.count(Notification.id)).filter(
+        Notification.recipient_user_id == user_id,
+        Notification.is_read == False,
+        Notification.elder_id.in_(elder_ids),
+    ).group_by(Notification.elder_id)
+    return dict(rows.all())
+
+
+def latest_locations(elder_ids):
+    """elder_id -> latest LocationLog, one index seek per elder in a single query"""
+    latest_id = db.session.query(LocationLog.id).filter(
+        LocationLog.elder_id == ElderProfile.id
+    ).order_by(LocationLog.recorded_at.desc()).limit(1).correlate(ElderProfile).scalar_subquery()
+    ids = db.session.query(latest_id).filter(ElderProfile.id.in_(elder_ids))
+    return {location.elder_id: location for location in LocationLog.query.filter(LocationLog.id.in_(ids))}
@@ -0,0 +1,146 @@
+"""
+Engine configuration and read-replica routing.
+
+engine_options() sizes the connection pool from the serving model instead of
+SQLAlchemy's defaults (5 + 10 overflow): each gunicorn worker process needs
+one connection per request thread plus the background threads (outbox
+workers), and DB_MAX_CONNECTIONS, when set, caps the total across workers so
+the server's connection limit is never exceeded. Postgres connections also get
+pre-ping, recycling and a per-statement timeout.
+
+With REPLICA_DATABASE_URL set, GET/HEAD requests read from the replica:
+RoutingSession sends their queries to the 'replica' bind until the session
+writes anything, after which it sticks to the primary so a request always
+sees its own writes. Flushes and DML always go to the primary.
+
+For local testing against SQLite, LocalReplica copies the primary file into
+the replica file every DB_REPLICA_SYNC_SECONDS with the SQLite backup API,
+which behaves like an asynchronously replicated standby (reads may lag).
+"""
+import os
+import sqlite3
+import threading
+import time
+
+from flask import request
+from flask_sqlalchemy.session import Session
+from sqlalchemy.engine import make_url
+
+REPLICA_BIND = 'replica'
+READ_METHODS = ('GET', 'HEAD')
+
+
+def normalize_url(url):
+    """Accept Heroku/Render style postgres:// URLs, which SQLAlchemy rejects"""
+    if url and url.startswith('postgres://'):
+        return 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value not in (None, '') else default
+
+
+def pool_settings(threads, workers, background_threads=0):
+    """(pool_size, max_overflow) per process for this serving model"""
+    pool_size = _env_int('DB_POOL_SIZE', threads + background_threads)
+    max_overflow = _env_int('DB_MAX_OVERFLOW', max(threads // 2, 2))
+    max_connections = _env_int('DB_MAX_CONNECTIONS', 0)
+    if max_connections:
+        per_process = max(max_connections // max(workers, 1), 1)
+        pool_size = min(pool_size, per_process)
+        max_overflow = min(max_overflow, per_process - pool_size)
+    return pool_size, max_overflow
+
+
+def engine_options(url, threads, workers, background_threads=0):
+    """SQLALCHEMY_ENGINE_OPTIONS-style dict for url"""
+    url = make_url(url)
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        return {}  # in-memory SQLite uses a single-connection pool
+
+    pool_size, max_overflow = pool_settings(threads, workers, background_threads)
+    options = {
+        'pool_size': pool_size,
+        'max_overflow': max_overflow,
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT_SECONDS', 30),
+    }
+    if url.get_backend_name() == 'sqlite':
+        return options
+
+    options['pool_pre_ping'] = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    options['pool_recycle'] = _env_int('DB_POOL_RECYCLE_SECONDS', 1800)
+    statement_timeout_ms = _env_int('DB_STATEMENT_TIMEOUT_MS', 15000)
+    if url.get_backend_name() == 'postgresql' and statement_timeout_ms:
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout_ms}'}
+    return options
+
+
+class RoutingSession(Session):
+    """Session that reads from the replica bind while session.info['read_replica'] is set"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.info.get('read_replica'):
+            if self._flushing or getattr(clause, 'is_dml', False):
+                self.info['read_replica'] = False  # read your own writes from here on
+            else:
+                engine = self._db.engines.get(REPLICA_BIND)
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def install_read_routing(app, db):
+    """Route GET/HEAD requests to the replica bind, if one is configured"""
+    if REPLICA_BIND not in app.config.get('SQLALCHEMY_BINDS', {}):
+        return False
+
+    @app.before_request
+    def _use_replica_for_reads():
+        if request.method in READ_METHODS:
+            db.session.info['read_replica'] = True
+
+    return True
+
+
+class LocalReplica:
+    """Stand-in replica for SQLite: periodically copies the primary file with the backup API"""
+
+    def __init__(self, primary_path, replica_path, interval_seconds=1.0):
+        self.primary_path = primary_path
+        self.replica_path = replica_path
+        self.interval_seconds = interval_seconds
+        self.synced_at = None
+        self.syncs = 0
+
+    def sync(self):
+        source = sqlite3.connect(self.primary_path)
+        target = sqlite3.connect(self.replica_path)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+        self.synced_at = time.time()
+        self.syncs += 1
+
+    def start(self):
+        self.sync()
+        thread = threading.Thread(target=self._run, name='local-replica', daemon=True)
+        thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval_seconds)
+            try:
+                self.sync()
+            except sqlite3.Error as e:
+                print(f"Local replica sync failed: {e}")
+
+    def stats(self):
+        return {
+            "syncs": self.syncs,
+            "lag_seconds": round(time.time() - self.synced_at, 3) if self.synced_at else None,
+        }
@@ -0,0 +1,139 @@
+"""
+Geographic helpers for location tracking
+"""
+from datetime import datetime
+import math
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in meters"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = math.radians(lat2 - lat1)
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def parse_fix_time(value):
+    """Parse a device timestamp: ISO-8601 string or epoch milliseconds"""
+    if value is None:
+        return datetime.utcnow()
+    if isinstance(value, (int, float)):
+        return datetime.utcfromtimestamp(value / 1000.0)
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = datetime.utcfromtimestamp(parsed.timestamp())
+    return parsed
+
+
+def downsample_fixes(fixes, min_distance_m=10.0, previous=None):
+    """Drop fixes that haven't moved beyond their accuracy radius.
+
+    fixes: dicts with latitude, longitude, accuracy, recorded_at, sorted by
+    recorded_at. A fix is kept when it is farther from the last kept fix than
+    the larger of the two accuracy radii (and at least min_distance_m).
+    previous: optional last stored fix, so a batch that only repeats the
+    current position is dropped entirely. The latest fix is always kept so
+    the caller still learns how recent the position is.
+    """
+    kept = []
+    last = previous
+    last_seen_at = None
+    for fix in fixes:
+        if last_seen_at is not None and fix['recorded_at'] == last_seen_at:
+            continue
+        last_seen_at = fix['recorded_at']
+
+        if last is None:
+            kept.append(fix)
+            last = fix
+            continue
+
+        threshold = max(min_distance_m, fix.get('accuracy') or 0.0, last.get('accuracy') or 0.0)
+        moved = haversine_m(last['latitude'], last['longitude'], fix['latitude'], fix['longitude'])
+        if moved > threshold:
+            kept.append(fix)
+            last = fix
+
+    latest = fixes[-1] if fixes else None
+    if latest is not None and (not kept or kept[-1]['recorded_at'] != latest['recorded_at']):
+        kept.append(latest)
+    return kept
+
+
+def _to_local_xy(points, origin_lat):
+    """Project (lat, lon) to planar meters around origin_lat (equirectangular)"""
+    k = math.cos(math.radians(origin_lat))
+    meters_per_degree = math.pi * EARTH_RADIUS_M / 180.0
+    return [(lon * k * meters_per_degree, lat * meters_per_degree) for lat, lon in points]
+
+
+def _segment_distance(p, a, b):
+    ax, ay = a
+    bx, by = b
+    px, py = p
+    dx = bx - ax
+    dy = by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return math.hypot(px - ax, py - ay)
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length_sq))
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def simplify_track(points, tolerance_m):
+    """Douglas-Peucker simplification of a track.
+
+    points: sequence of (latitude, longitude). Returns the indexes of the
+    points to keep (always including first and last). Iterative, so long
+    tracks don't hit the recursion limit.
+    """
+    count = len(points)
+    if count <= 2 or tolerance_m <= 0:
+        return list(range(count))
+
+    xy = _to_local_xy(points, points[0][0])
+    keep = [False] * count
+    keep[0] = keep[-1] = True
+    stack = [(0, count - 1)]
+    while stack:
+        start, end = stack.pop()
+        max_dist = 0.0
+        index = None
+        for i in range(start + 1, end):
+            dist = _segment_distance(xy[i], xy[start], xy[end])
+            if dist > max_dist:
+                max_dist = dist
+                index = i
+        if index is not None and max_dist > tolerance_m:
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+    return [i for i in range(count) if keep[i]]
+
+
+def _encode_value(value):
+    value = ~(value << 1) if value < 0 else (value << 1)
+    chunks = []
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1f)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+    return ''.join(chunks)
+
+
+def encode_polyline(points, precision=5):
+    """Encode (latitude, longitude) pairs with the Google polyline algorithm"""
+    factor = 10 ** precision
+    encoded = []
+    prev_lat = prev_lon = 0
+    for lat, lon in points:
+        lat_i = int(round(lat * factor))
+        lon_i = int(round(lon * factor))
+        encoded.append(_encode_value(lat_i - prev_lat))
+        encoded.append(_encode_value(lon_i - prev_lon))
+        prev_lat, prev_lon = lat_i, lon_i
+    return ''.join(encoded)
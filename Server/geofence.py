@@ -0,0 +1,193 @@
+"""
+Geofence evaluation for elder safe zones.
+
+Zones are circles (center + radius in meters). Each elder's zones are placed
+in a uniform lat/lon grid, so a fix only checks the zones whose cells it
+falls in, plus the zones the elder is currently inside (to detect exits).
+Transitions use hysteresis: an exit needs the fix to be beyond
+radius + margin and an entry needs it within radius - margin, where margin
+is the larger of the configured hysteresis and the fix's accuracy, so GPS
+jitter at the boundary doesn't produce alert storms. The margin is capped at
+half the zone's radius, so a small zone (or a coarse fix) can still register
+an entry.
+
+The inside/outside state is kept by a state store: MemoryZoneState for a
+single process, DatabaseZoneState (geofence_states rows, read and written in
+the caller's transaction) when it must survive restarts and be shared by
+worker processes.
+"""
+from contextlib import nullcontext
+from datetime import datetime
+import math
+import threading
+
+from geo import haversine_m
+from models import db, upsert, GeofenceState
+
+METERS_PER_DEGREE_LAT = 111320.0
+
+
+class ZoneGrid:
+    """Uniform grid spatial index over circular zones"""
+
+    def __init__(self, zones, cell_degrees=0.01, padding_m=0.0):
+        self.cell_degrees = cell_degrees
+        self.cells = {}
+        self.zones = {zone['id']: zone for zone in zones}
+        for zone in zones:
+            reach = zone['radius_m'] + padding_m
+            d_lat = reach / METERS_PER_DEGREE_LAT
+            d_lon = reach / (METERS_PER_DEGREE_LAT * max(math.cos(math.radians(zone['latitude'])), 1e-6))
+            lat_lo, lat_hi = self._cell(zone['latitude'] - d_lat), self._cell(zone['latitude'] + d_lat)
+            lon_lo, lon_hi = self._cell(zone['longitude'] - d_lon), self._cell(zone['longitude'] + d_lon)
+            for i in range(lat_lo, lat_hi + 1):
+                for j in range(lon_lo, lon_hi + 1):
+                    self.cells.setdefault((i, j), []).append(zone)
+
+    def _cell(self, degrees):
+        return int(math.floor(degrees / self.cell_degrees))
+
+    def candidates(self, latitude, longitude):
+        return self.cells.get((self._cell(latitude), self._cell(longitude)), [])
+
+
+class MemoryZoneState:
+    """Process-local inside/outside state"""
+
+    def __init__(self):
+        self._inside = {}  # elder_id -> set of zone ids the elder is inside
+        self._lock = threading.Lock()
+
+    def locked(self, elder_id):
+        return self._lock
+
+    def load(self, elder_id):
+        """Zone ids the elder is inside, or None if no fix was evaluated yet"""
+        inside = self._inside.get(elder_id)
+        return set(inside) if inside is not None else None
+
+    def save(self, elder_id, changes):
+        """changes: zone_id -> inside"""
+        inside = self._inside.setdefault(elder_id, set())
+        for zone_id, is_inside in changes.items():
+            if is_inside:
+                inside.add(zone_id)
+            else:
+                inside.discard(zone_id)
+
+
+class DatabaseZoneState:
+    """Inside/outside state in geofence_states, in the current session's transaction.
+
+    Call from a write transaction: the rows are locked (FOR UPDATE where the
+    database supports it; SQLite write transactions are serialized anyway),
+    so two processes evaluating fixes for one elder see each other's state.
+    """
+
+    def locked(self, elder_id):
+        return nullcontext()
+
+    def load(self, elder_id):
+        rows = db.session.query(GeofenceState.zone_id, GeofenceState.inside) \
+            .filter(GeofenceState.elder_id == elder_id) \
+            .with_for_update() \
+            .all()
+        if not rows:
+            return None
+        return {zone_id for zone_id, inside in rows if inside}
+
+    def save(self, elder_id, changes):
+        connection = db.session.connection()
+        table = GeofenceState.__table__
+        now = datetime.utcnow()
+        for zone_id, inside in sorted(changes.items()):
+            upsert(connection, table, {'elder_id': elder_id, 'zone_id': zone_id}, {'inside': inside, 'changed_at': now},
+                   lambda excluded: {'inside': excluded['inside'], 'changed_at': excluded['changed_at']})
+
+    def forget_zone(self, zone_id):
+        """Drop a deleted zone's rows (no commit)"""
+        GeofenceState.query.filter_by(zone_id=zone_id).delete(synchronize_session=False)
+
+
+class GeofenceEngine:
+    """Reports transitions per (elder, zone) against the inside/outside state in `state`"""
+
+    def __init__(self, load_zones, hysteresis_m=25.0, cell_degrees=0.01, state=None, zones_version=None):
+        self.load_zones = load_zones  # elder_id -> list of zone dicts
+        self.zones_version = zones_version  # elder_id -> token that changes when the zones do (optional)
+        self.hysteresis_m = hysteresis_m
+        self.cell_degrees = cell_degrees
+        self.state = state if state is not None else MemoryZoneState()
+        self._grids = {}  # elder_id -> (zones version, ZoneGrid)
+        self._lock = threading.Lock()
+
+    def invalidate(self, elder_id):
+        """Drop cached zones for an elder (call after zone changes)"""
+        with self._lock:
+            self._grids.pop(elder_id, None)
+
+    def _grid(self, elder_id):
+        version = self.zones_version(elder_id) if self.zones_version else None
+        with self._lock:
+            cached = self._grids.get(elder_id)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        grid = ZoneGrid(self.load_zones(elder_id), self.cell_degrees, padding_m=self.hysteresis_m)
+        with self._lock:
+            self._grids[elder_id] = (version, grid)
+        return grid
+
+    def evaluate(self, elder_id, latitude, longitude, accuracy=None):
+        """Return [(zone, 'enter'|'exit')] transitions caused by this fix"""
+        fix = {'latitude': latitude, 'longitude': longitude, 'accuracy': accuracy}
+        return [(zone, transition) for _, zone, transition in self.evaluate_fixes(elder_id, [fix])]
+
+    def evaluate_fixes(self, elder_id, fixes):
+        """Return [(fix, zone, 'enter'|'exit')] for fixes (dicts with latitude,
+        longitude and accuracy) in order; the state is loaded and saved once.
+
+        The first fix evaluated for an elder only establishes state, so a new
+        elder (or state lost with an in-memory store) doesn't raise a burst of
+        alerts.
+        """
+        grid = self._grid(elder_id)
+        if not grid.zones or not fixes:
+            return []
+
+        with self.state.locked(elder_id):
+            loaded = self.state.load(elder_id)
+            known = loaded is not None
+            inside = (loaded or set()) & set(grid.zones)
+
+            transitions = []
+            for fix in fixes:
+                latitude, longitude = fix['latitude'], fix['longitude']
+                margin = max(self.hysteresis_m, fix.get('accuracy') or 0.0)
+
+                to_check = {zone['id']: zone for zone in grid.candidates(latitude, longitude)}
+                for zone_id in inside:
+                    to_check[zone_id] = grid.zones[zone_id]
+
+                for zone_id, zone in to_check.items():
+                    distance = haversine_m(zone['latitude'], zone['longitude'], latitude, longitude)
+                    zone_margin = min(margin, zone['radius_m'] / 2)
+                    if not known:
+                        if distance <= zone['radius_m']:
+                            inside.add(zone_id)
+                    elif zone_id in inside and distance > zone['radius_m'] + zone_margin:
+                        inside.discard(zone_id)
+                        transitions.append((fix, zone, 'exit'))
+                    elif zone_id not in inside and distance < zone['radius_m'] - zone_margin:
+                        inside.add(zone_id)
+                        transitions.append((fix, zone, 'enter'))
+                known = True
+
+            if loaded is None:
+                # Every zone gets a row, so the elder's state is known from now on
+                changes = {zone_id: zone_id in inside for zone_id in grid.zones}
+            else:
+                changes = {zone_id: zone_id in inside for zone_id in loaded ^ inside}
+            if changes:
+                self.state.save(elder_id, changes)
+
+        return transitions
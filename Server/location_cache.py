@@ -0,0 +1,124 @@
+"""
+Latest-position cache for elder location tracking.
+
+update_location() writes through to this cache so GET /location/<elder_id>
+polls are answered without touching location_logs. Entries are process-local
+by default; when REDIS_URL is set and the redis package is installed, the
+cache is shared across worker processes instead. Each entry carries the
+location_logs version stamp it was written under; a read for a different
+version (another process wrote since), a miss or an expired entry falls back
+to the database.
+"""
+from datetime import datetime
+import json
+import threading
+import time
+
+# Optional redis: only needed to share the cache across worker processes.
+try:
+    import redis
+    _has_redis = True
+except Exception:
+    _has_redis = False
+
+
+class LatestLocationCache:
+    """elder_id -> most recent fix {latitude, longitude, accuracy, recorded_at}"""
+
+    def __init__(self, ttl_seconds=60, redis_url=None, key_prefix='gentlecare:location:'):
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self._local = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        self._redis = None
+        if redis_url and _has_redis:
+            try:
+                self._redis = redis.Redis.from_url(redis_url)
+                self._redis.ping()
+            except Exception as e:
+                print(f"Location cache: redis unavailable, using process-local cache ({e})")
+                self._redis = None
+
+    @property
+    def backend(self):
+        return 'redis' if self._redis is not None else 'local'
+
+    def get(self, elder_id, version=None):
+        """Cached fix, or None; with version, only an entry stored under that version"""
+        fix = self._get_shared(elder_id) if self._redis is not None else self._get_local(elder_id)
+        if fix is not None and version is not None and fix.get('version') != version:
+            fix = None
+        with self._lock:
+            if fix is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return fix
+
+    def set(self, elder_id, fix):
+        """Store fix unless a newer one is already cached"""
+        if self._redis is not None:
+            self._set_shared(elder_id, fix)
+            return
+        with self._lock:
+            current = self._local.get(elder_id)
+            if current is not None and current[0]['recorded_at'] > fix['recorded_at']:
+                return
+            self._local[elder_id] = (dict(fix), time.monotonic())
+
+    def invalidate(self, elder_id):
+        if self._redis is not None:
+            try:
+                self._redis.delete(f"{self.key_prefix}{elder_id}")
+            except Exception as e:
+                print(f"Location cache invalidate failed: {e}")
+        with self._lock:
+            self._local.pop(elder_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "entries": len(self._local),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _get_local(self, elder_id):
+        with self._lock:
+            entry = self._local.get(elder_id)
+            if entry is None:
+                return None
+            fix, stored_at = entry
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._local[elder_id]
+                return None
+            return dict(fix)
+
+    def _get_shared(self, elder_id):
+        try:
+            raw = self._redis.get(f"{self.key_prefix}{elder_id}")
+        except Exception as e:
+            print(f"Location cache read failed: {e}")
+            return None
+        if raw is None:
+            return None
+        fix = json.loads(raw)
+        fix['recorded_at'] = datetime.fromisoformat(fix['recorded_at'])
+        return fix
+
+    def _set_shared(self, elder_id, fix):
+        key = f"{self.key_prefix}{elder_id}"
+        payload = json.dumps(dict(fix, recorded_at=fix['recorded_at'].isoformat()))
+        try:
+            current = self._redis.get(key)
+            if current is not None:
+                current_at = datetime.fromisoformat(json.loads(current)['recorded_at'])
+                if current_at > fix['recorded_at']:
+                    return
+            self._redis.set(key, payload, ex=self.ttl_seconds or None)
+        except Exception as e:
+            print(f"Location cache write failed: {e}")
@@ -0,0 +1,227 @@
+"""
+Socket.IO message queue selection, plus a local broker for single-host deployments.
+
+With more than one worker process each process only knows its own socket
+connections, so an emit to a `user_<id>` room has to be relayed through a
+message queue for the other processes to deliver it. SOCKETIO_MESSAGE_QUEUE
+picks the backend:
+
+- unset                        no queue (single process, the default)
+- redis://, rediss://, amqp://, kafka://, zmq+tcp://
+                               handed to Flask-SocketIO's own managers
+- local:///path/to/broker.sock LocalSocketManager below: processes on one
+                               host relay through a Unix socket broker
+
+The local broker needs no extra service: the first process that finds no
+broker running starts one in a background thread (a lock file decides the
+race), the others connect to it. If that process exits, the survivors
+reconnect and one of them takes over. Events published during the handover
+are lost, as they would be with a restarting Redis. It can also be run on
+its own:
+
+    python message_queue.py /tmp/gentlecare-socketio.sock
+"""
+import fcntl
+import os
+import socket
+import struct
+import threading
+import time
+
+from socketio import PubSubManager
+
+_HEADER = struct.Struct('!I')
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+RECONNECT_DELAYS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0)
+
+
+def _send_frame(sock, payload):
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("broker connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _recv_frame(sock):
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    if size > MAX_FRAME_BYTES:
+        raise ConnectionError(f"frame of {size} bytes exceeds MAX_FRAME_BYTES")
+    return _recv_exact(sock, size)
+
+
+class LocalBroker:
+    """Fan-out relay on a Unix socket: every frame received goes to every connection"""
+
+    def __init__(self, path):
+        self.path = path
+        self._server = None
+        self._connections = {}  # socket -> send lock
+        self._lock = threading.Lock()
+
+    def bind(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)  # stale socket from a process that died
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.path)
+        server.listen(64)
+        self._server = server
+
+    def serve_forever(self):
+        while True:
+            try:
+                connection, _ = self._server.accept()
+            except OSError:
+                return  # closed
+            with self._lock:
+                self._connections[connection] = threading.Lock()
+            threading.Thread(target=self._relay, args=(connection,), daemon=True).start()
+
+    def start(self):
+        """Bind and serve from a daemon thread"""
+        self.bind()
+        threading.Thread(target=self.serve_forever, name='socketio-broker', daemon=True).start()
+        return self
+
+    def close(self):
+        if self._server is not None:
+            self._server.close()
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+        for connection in connections:
+            connection.close()
+
+    def _relay(self, connection):
+        try:
+            while True:
+                frame = _recv_frame(connection)
+                with self._lock:
+                    targets = list(self._connections.items())
+                for target, send_lock in targets:
+                    try:
+                        with send_lock:
+                            _send_frame(target, frame)
+                    except OSError:
+                        self._drop(target)
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self._drop(connection)
+
+    def _drop(self, connection):
+        with self._lock:
+            self._connections.pop(connection, None)
+        connection.close()
+
+
+def _connect(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def connect_or_start_broker(path):
+    """Connect to the broker at path, starting one in this process if none is running"""
+    try:
+        return _connect(path)
+    except OSError:
+        pass
+    with open(path + '.lock', 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            return _connect(path)  # another process won the race
+        except OSError:
+            LocalBroker(path).start()
+            print(f"✓ Socket.IO message broker listening on {path}")
+            return _connect(path)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class LocalSocketManager(PubSubManager):
+    """Socket.IO client manager that relays through a LocalBroker"""
+
+    name = 'local'
+
+    def __init__(self, url='local:///tmp/gentlecare-socketio.sock', channel='flask-socketio',
+                 write_only=False, logger=None, json=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.path = url[len('local://'):]
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        with self._lock:
+            if self._sock is None:
+                for delay in RECONNECT_DELAYS + (None,):
+                    try:
+                        self._sock = connect_or_start_broker(self.path)
+                        break
+                    except OSError:
+                        if delay is None:
+                            raise
+                        time.sleep(delay)
+            return self._sock
+
+    def _reset(self, sock):
+        with self._lock:
+            if self._sock is sock:
+                self._sock = None
+        sock.close()
+
+    def _publish(self, data):
+        payload = self.json.dumps({'channel': self.channel, 'data': data}).encode()
+        for attempt in range(2):
+            sock = self._connection()
+            try:
+                with self._lock:
+                    _send_frame(sock, payload)
+                return
+            except OSError:
+                self._reset(sock)
+        self._get_logger().error('Socket.IO broker unavailable; message dropped')
+
+    def _listen(self):
+        while True:
+            sock = self._connection()
+            try:
+                while True:
+                    message = self.json.loads(_recv_frame(sock))
+                    if message.get('channel') == self.channel:
+                        yield message['data']
+            except (ConnectionError, OSError):
+                self._reset(sock)
+
+
+def socketio_options(url):
+    """Keyword arguments for SocketIO() selecting the message queue for url (may be empty)"""
+    if not url:
+        return {}
+    if url.startswith('local://'):
+        return {'client_manager': LocalSocketManager(url)}
+    return {'message_queue': url}
+
+
+if __name__ == '__main__':
+    import sys
+
+    path = sys.argv[1] if len(sys.argv) > 1 else '/tmp/gentlecare-socketio.sock'
+    broker = LocalBroker(path)
+    broker.bind()
+    print(f"Socket.IO message broker listening on {path}")
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        broker.close()
@@ -4,7 +4,9 @@ Database models for GentleCare application
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 
-db = SQLAlchemy()
+from database import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(db.Model):
     """User model for authentication"""
@@ -29,12 +31,12 @@ class ElderProfile(db.Model):
     __tablename__ = 'elder_profiles'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     date_of_birth = db.Column(db.Date)
     address = db.Column(db.String(255))
     emergency_contact = db.Column(db.String(20))
     medical_conditions = db.Column(db.Text)
-    caretaker_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    caretaker_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
     
     # Relationships
     medications = db.relationship('Medication', backref='elder', cascade='all, delete-orphan')
@@ -43,13 +45,14 @@ class ElderProfile(db.Model):
     appointments = db.relationship('Appointment', backref='elder', cascade='all, delete-orphan')
     prescriptions = db.relationship('Prescription', backref='elder', cascade='all, delete-orphan')
     notifications = db.relationship('Notification', backref='elder', cascade='all, delete-orphan')
+    safe_zones = db.relationship('SafeZone', backref='elder', cascade='all, delete-orphan')
 
 class CaretakerProfile(db.Model):
     """Caretaker-specific profile information"""
     __tablename__ = 'caretaker_profiles'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)
     specialization = db.Column(db.String(100))
     experience_years = db.Column(db.Integer)
     certification = db.Column(db.String(100))
@@ -57,6 +60,9 @@ class CaretakerProfile(db.Model):
 class Medication(db.Model):
     """Medication tracking"""
     __tablename__ = 'medications'
+    __table_args__ = (
+        db.Index('ix_medications_elder_active', 'elder_id', 'is_active'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     elder_id = db.Column(db.Integer, db.ForeignKey('elder_profiles.id'), nullable=False)
@@ -78,7 +84,7 @@ class MedicationLog(db.Model):
     __tablename__ = 'medication_logs'
     
     id = db.Column(db.Integer, primary_key=True)
-    medication_id = db.Column(db.Integer, db.ForeignKey('medications.id'), nullable=False)
+    medication_id = db.Column(db.Integer, db.ForeignKey('medications.id'), nullable=False, index=True)
     taken_at = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(20))  # 'taken', 'missed', 'skipped'
     notes = db.Column(db.Text)
@@ -86,18 +92,49 @@ class MedicationLog(db.Model):
 class HealthRecord(db.Model):
     """Health vitals and records"""
     __tablename__ = 'health_records'
+    __table_args__ = (
+        db.Index('ix_health_records_elder_recorded', 'elder_id', 'recorded_at'),
+        db.Index('ix_health_records_elder_type_recorded', 'elder_id', 'record_type', 'recorded_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     elder_id = db.Column(db.Integer, db.ForeignKey('elder_profiles.id'), nullable=False)
     record_type = db.Column(db.String(50))  # 'blood_pressure', 'heart_rate', 'temperature', 'weight', etc.
     value = db.Column(db.String(50))
+    # Numeric components parsed from value: "120/80" -> (120, 80), "72" -> (72, None)
+    value_primary = db.Column(db.Float)
+    value_secondary = db.Column(db.Float)
     unit = db.Column(db.String(20))
     notes = db.Column(db.Text)
     recorded_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+class HealthRollup(db.Model):
+    """Hourly/daily aggregates of numeric vitals per elder and record type"""
+    __tablename__ = 'health_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('elder_id', 'record_type', 'resolution', 'bucket_start', name='uq_health_rollups_bucket'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    elder_id = db.Column(db.Integer, db.ForeignKey('elder_profiles.id'), nullable=False)
+    record_type = db.Column(db.String(50), nullable=False)
+    resolution = db.Column(db.String(10), nullable=False)  # 'hour' or 'day'
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    sum_primary = db.Column(db.Float, nullable=False, default=0)
+    min_primary = db.Column(db.Float)
+    max_primary = db.Column(db.Float)
+    sum_secondary = db.Column(db.Float, nullable=False, default=0)
+    count_secondary = db.Column(db.Integer, default=0)  # readings with a secondary value
+    min_secondary = db.Column(db.Float)
+    max_secondary = db.Column(db.Float)
+
 class Meal(db.Model):
     """Meal tracking"""
     __tablename__ = 'meals'
+    __table_args__ = (
+        db.Index('ix_meals_elder_scheduled', 'elder_id', 'scheduled_time'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     elder_id = db.Column(db.Integer, db.ForeignKey('elder_profiles.id'), nullable=False)
@@ -116,6 +153,9 @@ class Meal(db.Model):
 class Appointment(db.Model):
     """Medical appointments"""
     __tablename__ = 'appointments'
+    __table_args__ = (
+        db.Index('ix_appointments_elder_date', 'elder_id', 'appointment_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     elder_id = db.Column(db.Integer, db.ForeignKey('elder_profiles.id'), nullable=False)
@@ -133,7 +173,7 @@ class EmergencyContact(db.Model):
     __tablename__ = 'emergency_contacts'
     
     id = db.Column(db.Integer, primary_key=True)
-    elder_id = db.Column(db.Integer, db.ForeignKey('elder_profiles.id'), nullable=False)
+    elder_id = db.Column(db.Integer, db.ForeignKey('elder_profiles.id'), nullable=False, index=True)
     name = db.Column(db.String(100), nullable=False)
     relationship = db.Column(db.String(50))
     phone = db.Column(db.String(20), nullable=False)
@@ -143,6 +183,9 @@ class EmergencyContact(db.Model):
 class Notification(db.Model):
     """Notifications for both elders and caretakers"""
     __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('ix_notifications_recipient_created', 'recipient_user_id', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     elder_id = db.Column(db.Integer, db.ForeignKey('elder_profiles.id'))
@@ -152,10 +195,16 @@ class Notification(db.Model):
     notification_type = db.Column(db.String(50))  # 'medication', 'appointment', 'health', 'emergency'
     is_read = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Digest rows: how many events were coalesced into this notification and when the last arrived
+    event_count = db.Column(db.Integer, default=1)
+    last_event_at = db.Column(db.DateTime)
 
 class Prescription(db.Model):
     """Prescriptions and medical documents"""
     __tablename__ = 'prescriptions'
+    __table_args__ = (
+        db.Index('ix_prescriptions_elder_date', 'elder_id', 'date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     elder_id = db.Column(db.Integer, db.ForeignKey('elder_profiles.id'), nullable=False)
@@ -170,6 +219,9 @@ class Prescription(db.Model):
 class LocationLog(db.Model):
     """Track elder location for safety"""
     __tablename__ = 'location_logs'
+    __table_args__ = (
+        db.Index('ix_location_logs_elder_recorded', 'elder_id', 'recorded_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     elder_id = db.Column(db.Integer, db.ForeignKey('elder_profiles.id'), nullable=False)
@@ -177,3 +229,138 @@ class LocationLog(db.Model):
     longitude = db.Column(db.Float, nullable=False)
     accuracy = db.Column(db.Float)
     recorded_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class SafeZone(db.Model):
+    """Caretaker-defined geofence around a place the elder should stay in"""
+    __tablename__ = 'safe_zones'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    elder_id = db.Column(db.Integer, db.ForeignKey('elder_profiles.id'), nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    radius_m = db.Column(db.Float, nullable=False, default=200)
+    is_active = db.Column(db.Boolean, default=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class GeofenceState(db.Model):
+    """Whether an elder is inside a safe zone, as of the last evaluated fix"""
+    __tablename__ = 'geofence_states'
+    
+    elder_id = db.Column(db.Integer, db.ForeignKey('elder_profiles.id'), primary_key=True)
+    zone_id = db.Column(db.Integer, db.ForeignKey('safe_zones.id'), primary_key=True)
+    inside = db.Column(db.Boolean, nullable=False, default=False)
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class OutboxTask(db.Model):
+    """Deferred side effect committed with the write that caused it, deleted once delivered"""
+    __tablename__ = 'outbox_tasks'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(30), nullable=False)  # handler name, e.g. 'alert'
+    task_key = db.Column(db.String(50), nullable=False)  # JSON shard key (the elder id)
+    args = db.Column(db.Text, nullable=False)  # JSON argument list
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    available_at = db.Column(db.DateTime, nullable=False, index=True)  # lease or retry backoff ends
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class SyncChange(db.Model):
+    """Append-only change log behind GET /sync; the id is the client's cursor"""
+    __tablename__ = 'sync_changes'
+    __table_args__ = (
+        db.Index('ix_sync_changes_elder', 'elder_id', 'id'),
+        db.Index('ix_sync_changes_recipient', 'recipient_user_id', 'id'),
+        {'sqlite_autoincrement': True},  # ids must never be reused after pruning
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(30), nullable=False)  # table name, e.g. 'medications'
+    entity_id = db.Column(db.Integer, nullable=False)
+    elder_id = db.Column(db.Integer)  # scope for elder data
+    recipient_user_id = db.Column(db.Integer)  # scope for notifications
+    op = db.Column(db.String(10), nullable=False)  # 'upsert' or 'delete'
+    changed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+class ResourceVersion(db.Model):
+    """Version counter per resource (e.g. an elder's health_records), backing ETags"""
+    __tablename__ = 'resource_versions'
+    
+    scope = db.Column(db.String(10), primary_key=True)  # 'elder' or 'user'
+    scope_id = db.Column(db.Integer, primary_key=True)
+    resource = db.Column(db.String(30), primary_key=True)  # table name
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class NotificationCounter(db.Model):
+    """Unread notification count per recipient, maintained on every write"""
+    __tablename__ = 'notification_counters'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    unread = db.Column(db.Integer, nullable=False, default=0)
+
+def upsert(connection, table, keys, values, update):
+    """Atomically insert the row keys + values, or, if a row with keys exists,
+    set the columns returned by update(excluded) on it instead.
+
+    excluded['column'] is the value that would have been inserted, so update
+    can merge it with the existing row, e.g. {'n': table.c.n + excluded['n']}.
+    keys must be covered by a unique constraint.
+    """
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        statement = insert(table).values(**keys, **values)
+        statement = statement.on_conflict_do_update(index_elements=list(keys), set_=update(statement.excluded))
+        connection.execute(statement)
+        return
+    excluded = {name: db.literal(value, table.c[name].type) for name, value in values.items()}
+    where = [table.c[name] == value for name, value in keys.items()]
+    updated = connection.execute(table.update().where(*where).values(update(excluded)))
+    if not updated.rowcount:
+        connection.execute(table.insert().values(**keys, **values))
+
+def increment(connection, table, keys, column, delta):
+    """Atomically add delta to table.column for the row identified by keys,
+    inserting the row (with column = delta) if it doesn't exist yet."""
+    upsert(connection, table, keys, {column: delta}, lambda excluded: {column: table.c[column] + excluded[column]})
+
+def ensure_indexes(engine):
+    """Create any declared index missing from an existing database.
+
+    db.create_all() skips tables that already exist, so databases created
+    before an index was added to the models never get it. This is safe to
+    run on every startup: existing indexes are left alone.
+    """
+    inspector = db.inspect(engine)
+    created = []
+    for table in db.metadata.sorted_tables:
+        existing = {ix['name'] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(bind=engine)
+                created.append(index.name)
+    return created
+
+def ensure_columns(engine):
+    """Add declared columns missing from existing tables (nullable columns only).
+
+    Like ensure_indexes(), this lets older gentlecare.db files pick up new
+    optional columns without a migration tool.
+    """
+    inspector = db.inspect(engine)
+    added = []
+    for table in db.metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.execute(db.text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            added.append(f"{table.name}.{column.name}")
+    return added
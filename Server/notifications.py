@@ -0,0 +1,280 @@
+"""
+Notification bookkeeping: creation pipeline, unread counters and bulk mark-read.
+
+notify() is the single entry point for creating notifications. Within a
+window, events with the same (recipient, elder, type) are coalesced into
+one digest row: the first event inserts a row and is pushed as soon as the
+transaction commits; later ones update that row (event_count, message) and
+schedule one trailing 'notification_updated' push at the end of the window.
+Critical types (emergency) bypass coalescing and are always inserted and
+pushed immediately.
+
+notification_counters holds one row per recipient. An after_flush hook
+adjusts it in the same transaction as every ORM insert, read-flag change or
+delete of a Notification, so GET /notifications/unread-count is a primary-key
+lookup. mark_read() flips many notifications with a single UPDATE and
+adjusts the counter by the number of rows it changed.
+"""
+from datetime import datetime, timedelta
+import threading
+import time
+
+from sqlalchemy import event, inspect
+
+from models import db, increment, Notification, NotificationCounter
+from sqlite_tuning import is_locked_error
+import sync_log
+import versions
+
+DIGEST_MAX_LINES = 5
+NOTIFY_RETRIES = 3
+NOTIFY_BACKOFF_SECONDS = 0.1
+
+
+class NotificationPipeline:
+    """Coalesces non-critical notifications and pushes them after commit"""
+
+    def __init__(self, window_seconds=120, critical_types=('emergency',), emit=None):
+        self.window_seconds = window_seconds
+        self.critical_types = set(critical_types)
+        self.emit = emit  # emit(event, payload, room); None disables pushes (CLI, scripts)
+        self._trailing = {}  # notification id -> latest payload awaiting its trailing push
+        self._lock = threading.Lock()
+        self.created = 0
+        self.coalesced = 0
+
+    def configure(self, window_seconds=None, critical_types=None, emit=None):
+        if window_seconds is not None:
+            self.window_seconds = window_seconds
+        if critical_types is not None:
+            self.critical_types = set(critical_types)
+        if emit is not None:
+            self.emit = emit
+
+    def notify(self, recipient_user_id, elder_id, notification_type, title, message):
+        """Create or coalesce a notification in the current transaction (no commit)"""
+        now = datetime.utcnow()
+        digest = None
+        if self.window_seconds and notification_type not in self.critical_types:
+            digest = Notification.query.filter(
+                Notification.recipient_user_id == recipient_user_id,
+                Notification.elder_id == elder_id,
+                Notification.notification_type == notification_type,
+                Notification.is_read == False,
+                Notification.created_at >= now - timedelta(seconds=self.window_seconds),
+            ).order_by(Notification.created_at.desc()).first()
+
+        if digest is None:
+            notification = Notification(
+                elder_id=elder_id,
+                recipient_user_id=recipient_user_id,
+                title=title,
+                message=message,
+                notification_type=notification_type,
+                created_at=now,
+                event_count=1,
+                last_event_at=now,
+            )
+            db.session.add(notification)
+            db.session.flush()
+            self._queue(notification, 'notification_created')
+            with self._lock:
+                self.created += 1
+            return notification
+
+        digest.event_count = (digest.event_count or 1) + 1
+        digest.last_event_at = now
+        digest.message = _digest_message(message, digest.message, digest.event_count)
+        db.session.flush()
+        self._queue(digest, 'notification_updated')
+        with self._lock:
+            self.coalesced += 1
+        return digest
+
+    def _queue(self, notification, event_name):
+        payload = {
+            'id': notification.id,
+            'recipient_user_id': notification.recipient_user_id,
+            'elder_id': notification.elder_id,
+            'title': notification.title,
+            'message': notification.message,
+            'type': notification.notification_type,
+            'count': notification.event_count or 1,
+            'created_at': notification.created_at.isoformat(),
+        }
+        db.session.info.setdefault('notification_outbox', []).append((event_name, payload))
+
+    def publish(self, outbox):
+        """Push committed notifications: new rows now, digest updates once per window"""
+        if self.emit is None:
+            return
+        for event_name, payload in outbox:
+            if event_name == 'notification_created':
+                self.emit(event_name, payload, f"user_{payload['recipient_user_id']}")
+                continue
+            with self._lock:
+                scheduled = payload['id'] in self._trailing
+                self._trailing[payload['id']] = payload
+            if not scheduled:
+                created_at = datetime.fromisoformat(payload['created_at'])
+                delay = max((created_at + timedelta(seconds=self.window_seconds) - datetime.utcnow()).total_seconds(), 0)
+                timer = threading.Timer(delay, self._flush_trailing, args=(payload['id'],))
+                timer.daemon = True
+                timer.start()
+
+    def _flush_trailing(self, notification_id):
+        with self._lock:
+            payload = self._trailing.pop(notification_id, None)
+        if payload is not None and self.emit is not None:
+            self.emit('notification_updated', payload, f"user_{payload['recipient_user_id']}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "window_seconds": self.window_seconds,
+                "created": self.created,
+                "coalesced": self.coalesced,
+                "pending_digests": len(self._trailing),
+            }
+
+
+def _digest_message(newest, previous, count):
+    """Newest event first, then the earlier ones, capped at DIGEST_MAX_LINES"""
+    lines = [newest] + [line for line in (previous or '').split('\n') if line and not line.startswith('…and ')]
+    lines = lines[:DIGEST_MAX_LINES]
+    if count > len(lines):
+        lines.append(f"…and {count - len(lines)} more")
+    return '\n'.join(lines)
+
+
+pipeline = NotificationPipeline()
+
+
+def notify(recipient_user_id, elder_id, notification_type, title, message):
+    """Create (or coalesce) a notification through the shared pipeline; see NotificationPipeline"""
+    return pipeline.notify(recipient_user_id, elder_id, notification_type, title, message)
+
+
+def notify_many(tasks):
+    """Outbox handler: create a batch of (recipient, elder, type, title, message) notifications in one commit.
+
+    Each task runs in its own savepoint, so one bad task is logged and skipped
+    instead of rolling back the rest of the batch. A batch that fails on a
+    transient lock is rolled back and retried with backoff. Returns the
+    notification ids in task order (None where a task failed).
+    """
+    for attempt in range(NOTIFY_RETRIES + 1):
+        try:
+            ids = [_notify_isolated(args) for args in tasks]
+            db.session.commit()
+            return ids
+        except Exception as e:
+            db.session.rollback()
+            if attempt == NOTIFY_RETRIES or not _is_transient(e):
+                raise
+            time.sleep(NOTIFY_BACKOFF_SECONDS * (2 ** attempt))
+
+
+def _notify_isolated(args):
+    try:
+        with db.session.begin_nested():
+            return notify(*args).id
+    except Exception as e:
+        if _is_transient(e):
+            raise  # the whole batch is retried
+        print(f"Notification {args[2]!r} for user {args[0]} failed: {e}")
+        return None
+
+
+def _is_transient(error):
+    """Lock and serialization failures that succeed when the transaction is run again"""
+    original = getattr(error, 'orig', error)
+    return is_locked_error(original) or getattr(original, 'pgcode', None) in ('40001', '40P01', '55P03')
+
+
+def _after_commit(session):
+    outbox = session.info.pop('notification_outbox', None)
+    if outbox:
+        try:
+            pipeline.publish(outbox)
+        except Exception as e:
+            print(f"Notification push failed: {e}")
+
+
+def _after_rollback(session):
+    session.info.pop('notification_outbox', None)
+
+
+def _after_flush(session, flush_context):
+    deltas = {}
+
+    def add(user_id, delta):
+        deltas[user_id] = deltas.get(user_id, 0) + delta
+
+    for obj in session.new:
+        if isinstance(obj, Notification) and not obj.is_read:
+            add(obj.recipient_user_id, 1)
+    for obj in session.deleted:
+        if isinstance(obj, Notification) and not obj.is_read:
+            add(obj.recipient_user_id, -1)
+    for obj in session.dirty:
+        if not isinstance(obj, Notification):
+            continue
+        history = inspect(obj).attrs.is_read.history
+        if not history.has_changes() or not history.deleted:
+            continue
+        before, after = bool(history.deleted[0]), bool(obj.is_read)
+        if before != after:
+            add(obj.recipient_user_id, 1 if before else -1)
+
+    connection = session.connection()
+    for user_id, delta in deltas.items():
+        if delta:
+            increment(connection, NotificationCounter.__table__, {'user_id': user_id}, 'unread', delta)
+
+
+def install(session):
+    """Maintain unread counters and push pipeline notifications after commit"""
+    for name, listener in (('after_flush', _after_flush), ('after_commit', _after_commit),
+                           ('after_rollback', _after_rollback)):
+        if not event.contains(session, name, listener):
+            event.listen(session, name, listener)
+
+
+def rebuild_counters():
+    """Recount unread notifications for every user (startup backfill); returns users counted"""
+    NotificationCounter.query.delete()
+    rows = db.session.query(Notification.recipient_user_id, db.func.count(Notification.id)) \
+        .filter(Notification.is_read == False).group_by(Notification.recipient_user_id).all()
+    if rows:
+        db.session.execute(NotificationCounter.__table__.insert(),
+                           [{'user_id': user_id, 'unread': count} for user_id, count in rows])
+    db.session.commit()
+    return len(rows)
+
+
+def unread_count(user_id):
+    return db.session.query(NotificationCounter.unread).filter_by(user_id=user_id).scalar() or 0
+
+
+def mark_read(user_id, ids=None, before=None):
+    """Mark the user's unread notifications read with one UPDATE (no commit).
+
+    ids: only these notifications; before: only those created at or before
+    this datetime; neither: all. Returns the ids that changed.
+    """
+    table = Notification.__table__
+    statement = table.update().where(table.c.recipient_user_id == user_id, table.c.is_read == False)
+    if ids is not None:
+        statement = statement.where(table.c.id.in_(ids))
+    if before is not None:
+        statement = statement.where(table.c.created_at <= before)
+    changed = [row.id for row in db.session.execute(statement.values(is_read=True).returning(table.c.id))]
+
+    if changed:
+        # Core UPDATE skips the flush hooks: keep counter, sync log and ETags in step
+        connection = db.session.connection()
+        increment(connection, NotificationCounter.__table__, {'user_id': user_id}, 'unread', -len(changed))
+        sync_log.record(db.session, 'notifications', changed, recipient_user_id=user_id)
+        versions.bump(db.session, [versions.user(user_id, 'notifications')])
+    return changed
@@ -0,0 +1,266 @@
+"""
+Post-commit side effects (socket emits, notifications) run by a background worker pool.
+
+Write handlers used to commit and then, before responding, build
+notifications, commit again and emit socket events. Now they hand those side
+effects to the outbox instead:
+
+- defer(session, kind, key, *args)  run once session's transaction commits
+                                   (dropped if it rolls back)
+- submit(kind, key, *args)         run as soon as a worker is free (for
+                                   callers that have already committed)
+
+Each kind has a handler registered with register(kind, fn); fn receives a
+list of argument tuples, so a worker drains whatever has queued up for that
+kind in one call (e.g. every pending notification in one transaction).
+Tasks are sharded over the workers by key (the elder id), so one elder's
+events are still delivered in the order they were queued.
+
+With a table (models.OutboxTask), deferred tasks are durable: defer() also
+writes a row in the caller's transaction, leased to this process for
+lease_seconds. After the commit the task takes the in-memory path above and
+its row is deleted once the handler succeeds; a failed batch is rescheduled
+with exponential backoff. A sweeper re-queues rows whose lease or backoff
+has run out, so tasks left behind by a crash, a redeploy or a failing
+handler are retried by whichever process sweeps first, up to max_attempts
+(the row is then kept, with its last error, for inspection). Delivery is
+at least once, and retried tasks can arrive after newer ones; their
+arguments come back from JSON, so tuples arrive as lists. submit() stays
+in memory only.
+"""
+from collections import deque
+from datetime import datetime, timedelta
+import json
+import queue
+import threading
+import time
+
+from sqlalchemy import event, select
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class Outbox:
+    """Sharded task queues drained by daemon worker threads"""
+
+    def __init__(self, workers=2, batch_size=100, app=None, table=None, lease_seconds=60, retry_seconds=5,
+                 max_attempts=5, sweep_seconds=30):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.app = app
+        self.table = table  # outbox_tasks table for durable deferred tasks; None keeps them in memory
+        self.lease_seconds = lease_seconds
+        self.retry_seconds = retry_seconds
+        self.max_attempts = max_attempts
+        self.sweep_seconds = sweep_seconds
+        self._session = None
+        self._handlers = {}
+        self._queues = []
+        self._threads = []
+        self._lock = threading.Lock()
+        self._recent_lags = deque(maxlen=1000)
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.batches = 0
+        self.recovered = 0
+        self.dead = 0
+        self.max_lag = 0.0
+
+    def register(self, kind, handler):
+        """handler(list of args tuples) runs in a worker inside an app context"""
+        self._handlers[kind] = handler
+
+    def start(self):
+        # At least one worker: handlers commit, which can't happen inside an after_commit hook
+        for index in range(max(self.workers, 1)):
+            tasks = queue.Queue()
+            thread = threading.Thread(target=self._run, args=(tasks,), name=f'outbox-{index}', daemon=True)
+            self._queues.append(tasks)
+            self._threads.append(thread)
+            thread.start()
+        if self.table is not None and self.sweep_seconds:
+            threading.Thread(target=self._sweep_forever, name='outbox-sweeper', daemon=True).start()
+        return self
+
+    def submit(self, kind, key, *args):
+        """Queue a task now"""
+        self._put([(kind, key, args, time.monotonic(), None)])
+
+    def defer(self, session, kind, key, *args):
+        """Queue a task when session's transaction commits"""
+        row_id = None
+        if self.table is not None:
+            now = datetime.utcnow()
+            row_id = session.connection().execute(self.table.insert().values(
+                kind=kind,
+                task_key=json.dumps(key),
+                args=json.dumps(args, default=_json_default),
+                attempts=0,
+                available_at=now + timedelta(seconds=self.lease_seconds),
+                created_at=now,
+            )).inserted_primary_key[0]
+        session.info.setdefault('outbox_tasks', []).append((kind, key, args, time.monotonic(), row_id))
+
+    def install(self, session):
+        self._session = session
+        for name, listener in (('after_commit', self._after_commit), ('after_rollback', self._after_rollback)):
+            if not event.contains(session, name, listener):
+                event.listen(session, name, listener)
+
+    def _after_commit(self, session):
+        tasks = session.info.pop('outbox_tasks', None)
+        if tasks:
+            self._put(tasks)
+
+    def _after_rollback(self, session):
+        session.info.pop('outbox_tasks', None)
+
+    def _put(self, tasks):
+        with self._lock:
+            self.enqueued += len(tasks)
+        for task in tasks:
+            self._queues[hash(task[1]) % len(self._queues)].put(task)
+
+    def _run(self, tasks):
+        while True:
+            batch = [tasks.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(tasks.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with self.app.app_context():
+                    self._execute(batch)
+            finally:
+                for _ in batch:
+                    tasks.task_done()
+
+    def _execute(self, batch):
+        # Group consecutive tasks of the same kind so ordering within a shard holds
+        groups = []
+        for kind, key, args, enqueued_at, row_id in batch:
+            if groups and groups[-1][0] == kind:
+                groups[-1][1].append((args, enqueued_at, row_id))
+            else:
+                groups.append((kind, [(args, enqueued_at, row_id)]))
+
+        for kind, items in groups:
+            error = None
+            try:
+                self._handlers[kind]([args for args, _, _ in items])
+            except Exception as e:
+                error = e
+                print(f"Outbox {kind} batch of {len(items)} failed: {e}")
+                if self._session is not None:
+                    self._session.rollback()
+            row_ids = [row_id for _, _, row_id in items if row_id is not None]
+            if row_ids:
+                try:
+                    self._settle(row_ids, error)
+                except Exception as e:
+                    print(f"Outbox could not record {kind} batch: {e}")
+            now = time.monotonic()
+            with self._lock:
+                self.batches += 1
+                if error is not None:
+                    self.failed += len(items)
+                else:
+                    self.processed += len(items)
+                for _, enqueued_at, _ in items:
+                    lag = now - enqueued_at
+                    self._recent_lags.append(lag)
+                    self.max_lag = max(self.max_lag, lag)
+
+    def _engine(self):
+        return self._session.get_bind()
+
+    def _settle(self, row_ids, error):
+        """Delete the rows of a delivered batch, or schedule a retry of a failed one"""
+        table = self.table
+        with self._engine().begin() as connection:
+            if error is None:
+                connection.execute(table.delete().where(table.c.id.in_(row_ids)))
+                return
+            now = datetime.utcnow()
+            for row_id, attempts in connection.execute(
+                select(table.c.id, table.c.attempts).where(table.c.id.in_(row_ids))
+            ).all():
+                attempts += 1
+                if attempts >= self.max_attempts:
+                    with self._lock:
+                        self.dead += 1
+                    print(f"Outbox task {row_id} gave up after {attempts} attempts: {error}")
+                delay = self.retry_seconds * 2 ** (attempts - 1)
+                connection.execute(table.update().where(table.c.id == row_id).values(
+                    attempts=attempts,
+                    available_at=now + timedelta(seconds=delay),
+                    last_error=str(error)[:1000],
+                ))
+
+    def sweep(self):
+        """Lease the rows due for a (re)try to this process and queue them; returns how many"""
+        table = self.table
+        now = datetime.utcnow()
+        due = (
+            (table.c.available_at <= now)
+            & (table.c.attempts < self.max_attempts)
+            & table.c.kind.in_(list(self._handlers))  # leave kinds this process can't run to one that can
+        )
+        with self._engine().begin() as connection:
+            # The outer condition is re-checked under the row lock, so two processes never lease a row twice
+            rows = connection.execute(
+                table.update()
+                .where(table.c.id.in_(select(table.c.id).where(due).order_by(table.c.id).limit(self.batch_size)))
+                .where(due)
+                .values(available_at=now + timedelta(seconds=self.lease_seconds))
+                .returning(table.c.id, table.c.kind, table.c.task_key, table.c.args)
+            ).all()
+        rows.sort(key=lambda row: row.id)
+        tasks = [(row.kind, json.loads(row.task_key), tuple(json.loads(row.args)), time.monotonic(), row.id)
+                 for row in rows]
+        if tasks:
+            with self._lock:
+                self.recovered += len(tasks)
+            self._put(tasks)
+        return len(tasks)
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(self.sweep_seconds)
+            try:
+                with self.app.app_context():
+                    while self.sweep() == self.batch_size:
+                        pass
+            except Exception as e:
+                print(f"Outbox sweep failed: {e}")
+
+    def join(self):
+        """Block until every queued task has been processed (tests, shutdown)"""
+        for tasks in self._queues:
+            tasks.join()
+
+    def stats(self):
+        with self._lock:
+            lags = sorted(self._recent_lags)
+            return {
+                "workers": len(self._threads),
+                "durable": self.table is not None,
+                "depth": sum(tasks.qsize() for tasks in self._queues),
+                "enqueued": self.enqueued,
+                "processed": self.processed,
+                "failed": self.failed,
+                "recovered": self.recovered,
+                "dead": self.dead,
+                "batches": self.batches,
+                "lag_ms": {
+                    "p50": round(lags[len(lags) // 2] * 1000, 2) if lags else None,
+                    "p95": round(lags[int(len(lags) * 0.95)] * 1000, 2) if lags else None,
+                    "max": round(self.max_lag * 1000, 2),
+                },
+            }
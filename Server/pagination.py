@@ -0,0 +1,138 @@
+"""
+Keyset pagination and field projection for list endpoints.
+
+List endpoints accept:
+- ?limit=N        page size (capped at MAX_LIMIT)
+- ?cursor=...     opaque token from the previous page's next_cursor
+- ?fields=a,b,c   only return (and only SELECT) these fields
+
+Pages are keyed on the endpoint's existing sort column plus the primary key
+as a tie-breaker, so each page is an index range scan that costs the same no
+matter how deep the client has paged (no OFFSET). NULL sort values are
+ordered last in both directions.
+"""
+import base64
+from datetime import date, datetime
+import json
+
+from sqlalchemy import or_, tuple_
+from sqlalchemy.orm import load_only
+
+MAX_LIMIT = 500
+LAZY_BATCH_ROWS = 1000
+
+
+class PageRequest:
+    """Parsed ?limit=&cursor=&fields= arguments"""
+
+    def __init__(self, limit=None, cursor=None, fields=None):
+        self.limit = limit
+        self.cursor = cursor  # (sort value, id) or None
+        self.fields = fields  # list of field names or None for all
+
+
+def parse_page_args(args, field_map, default_limit=None):
+    """Read pagination/projection args; raises ValueError on bad input"""
+    limit = args.get('limit')
+    if limit is None or limit == '':
+        limit = default_limit
+    else:
+        limit = int(limit)
+        if limit < 1:
+            raise ValueError("limit must be positive")
+        limit = min(limit, MAX_LIMIT)
+
+    cursor = args.get('cursor') or None
+    if cursor is not None:
+        cursor = decode_cursor(cursor)
+        if limit is None:
+            limit = MAX_LIMIT
+
+    fields = args.get('fields')
+    if fields:
+        fields = [name.strip() for name in fields.split(',') if name.strip()]
+        unknown = [name for name in fields if name not in field_map]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)} (allowed: {', '.join(field_map)})")
+    else:
+        fields = None
+
+    return PageRequest(limit, cursor, fields)
+
+
+def encode_cursor(value, row_id):
+    if isinstance(value, (datetime, date)):
+        value = value.isoformat()
+    raw = json.dumps([value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        value, row_id = json.loads(raw)
+        return value, int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _cursor_value(column, value):
+    """Convert a cursor's JSON value back to the sort column's Python type"""
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def _field_attrs(field_map, fields):
+    attrs = []
+    for name in fields or field_map:
+        spec = field_map[name]
+        attrs.append(spec if isinstance(spec, str) else spec[0])
+    return attrs
+
+
+def paginate(query, model, sort_column, page, descending=False, field_map=None, lazy=False):
+    """Apply projection, keyset filter, ordering and limit.
+
+    Returns (rows, next_cursor); next_cursor is None on the last page. With
+    lazy=True an unlimited request returns rows as a query that loads them in
+    batches while iterated (for streamed responses) instead of a list.
+    """
+    id_column = model.id
+    if field_map is not None and page.fields is not None:
+        attrs = set(_field_attrs(field_map, page.fields)) | {'id', sort_column.key}
+        query = query.options(load_only(*[getattr(model, attr) for attr in attrs]))
+
+    nullable = sort_column.property.columns[0].nullable
+    if page.cursor is not None:
+        value, last_id = page.cursor
+        value = _cursor_value(sort_column, value)
+        if value is None:
+            after_id = id_column < last_id if descending else id_column > last_id
+            query = query.filter(sort_column.is_(None), after_id)
+        else:
+            # Row-value comparison so the (elder_id, sort column) index drives the scan
+            key = tuple_(sort_column, id_column)
+            after = key < tuple_(value, last_id) if descending else key > tuple_(value, last_id)
+            query = query.filter(or_(after, sort_column.is_(None)) if nullable else after)
+
+    if descending:
+        query = query.order_by(sort_column.desc().nullslast() if nullable else sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc().nullslast() if nullable else sort_column.asc(), id_column.asc())
+
+    if page.limit is None:
+        return (query.yield_per(LAZY_BATCH_ROWS) if lazy else query.all()), None
+
+    rows = query.limit(page.limit + 1).all()
+    if len(rows) <= page.limit:
+        return rows, None
+    rows = rows[:page.limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_column.key), last.id)
+
@@ -0,0 +1,336 @@
+"""
+Response serialization: compiled per-model serializers and a faster JSON encoder.
+
+Each list endpoint's fields are declared once here as a field map
+(response name -> attribute name, or (attribute, fn(row)) for derived
+fields) and wrapped in a Serializer. Serializer.compile() resolves a field
+selection once into a tuple of (name, getter) pairs (operator.attrgetter /
+itemgetter where possible), with the date/datetime conversion decided from
+the model's column types instead of an isinstance check on every value;
+serializing a row is then a single dict comprehension over those pairs.
+
+FastJSONProvider replaces Flask's JSON provider for every jsonify() call.
+It encodes with orjson when that is installed (JSON_ENCODER=stdlib forces
+the standard library) and does not sort keys.
+
+stream_json() sends a large array in batches as the body is written, so
+neither the full list of dicts nor the full JSON text is held in memory.
+"""
+from datetime import date, datetime
+from operator import attrgetter, itemgetter
+
+from flask import current_app, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import case, inspect
+
+from models import (User, Medication, MedicationLog, HealthRecord, Meal, Appointment, EmergencyContact, Notification,
+                    Prescription)
+from user_context import elder_summary
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+MAX_COMPILED = 64  # field selections cached per serializer
+STREAM_BATCH_ROWS = 1000
+
+
+def _jsonable(value):
+    """Conversion for attributes whose type isn't known up front"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _isoformat(get):
+    def convert(row):
+        value = get(row)
+        return value.isoformat() if value is not None else None
+    return convert
+
+
+def _derived(fn, argument=None):
+    """fn applied to the whole row, or to the row entry that argument(row) picks"""
+    if argument is None:
+        return fn
+    return lambda row: fn(argument(row))
+
+
+def _python_type(source, attr=None):
+    """Python type of a column expression, or of a model's column attr; None if unknown"""
+    if source is None:
+        return None
+    column = source if attr is None else inspect(source).columns.get(attr)
+    try:
+        return column.type.python_type
+    except (AttributeError, NotImplementedError):
+        return None
+
+
+class Serializer:
+    """Builds response dicts for instances of model.
+
+    model may instead be a dict naming the entries of tuple rows, e.g.
+    {'medication': Medication, 'elder_name': User.full_name} for rows of
+    query(*serializer.columns). Field specs then refer to "medication.name"
+    or "elder_name", and derived fields are (entry, fn(entry)).
+    """
+
+    def __init__(self, model, fields):
+        self.entries = model if isinstance(model, dict) else None
+        self.model = None if self.entries else model
+        self.fields = fields
+        self._compiled = {}
+
+    @property
+    def columns(self):
+        """Entities and column expressions to select for a tuple-row serializer"""
+        return list(self.entries.values())
+
+    def compile(self, names=None):
+        """fn(row) -> dict with the named fields (all fields if names is None)"""
+        key = tuple(names) if names else None
+        fn = self._compiled.get(key)
+        if fn is None:
+            fn = self._build(key or tuple(self.fields))
+            if len(self._compiled) < MAX_COMPILED:
+                self._compiled[key] = fn
+        return fn
+
+    def _resolve(self, path):
+        """(getter(row), model or column, attribute) for a field spec path"""
+        parts = path.split('.')
+        if not all(part.isidentifier() for part in parts) or len(parts) > (2 if self.entries else 1):
+            raise ValueError(f"Invalid attribute path {path!r}")
+        if self.entries is None:
+            return attrgetter(path), self.model, path
+        if parts[0] not in self.entries:
+            raise ValueError(f"Unknown row entry {parts[0]!r}")
+        entry = itemgetter(list(self.entries).index(parts[0]))
+        if len(parts) == 1:
+            return entry, self.entries[path], None
+        attr = attrgetter(parts[1])
+        return (lambda row: attr(entry(row))), self.entries[parts[0]], parts[1]
+
+    def _getter(self, spec):
+        if not isinstance(spec, str):
+            argument = None if self.entries is None else self._resolve(spec[0])[0]
+            return _derived(spec[1], argument)
+        get, source, attr = self._resolve(spec)
+        python_type = _python_type(source, attr)
+        if python_type in (datetime, date):
+            return _isoformat(get)
+        if python_type is None:
+            return lambda row: _jsonable(get(row))
+        return get
+
+    def _build(self, names):
+        getters = tuple((name, self._getter(self.fields[name])) for name in names)
+
+        def serialize(row):
+            return {name: get(row) for name, get in getters}
+        return serialize
+
+    def one(self, row, names=None):
+        return self.compile(names)(row)
+
+    def many(self, rows, names=None):
+        return list(map(self.compile(names), rows))
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider using orjson when available; output matches the default provider's"""
+
+    sort_keys = False
+
+    def __init__(self, app, backend='auto'):
+        super().__init__(app)
+        if backend == 'orjson' and orjson is None:
+            print("Warning: JSON_ENCODER=orjson but orjson is not installed; using the standard library")
+        self.backend = 'orjson' if orjson is not None and backend in ('auto', 'orjson') else 'stdlib'
+
+    def _orjson_dumps(self, obj):
+        # Datetimes go through default() so they keep Flask's HTTP date format
+        return orjson.dumps(obj, default=self.default,
+                            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+
+    def dump_bytes(self, obj):
+        """Compact UTF-8 JSON"""
+        if self.backend == 'orjson':
+            try:
+                return self._orjson_dumps(obj)
+            except orjson.JSONEncodeError:
+                pass  # e.g. integers beyond 64 bits: the standard library handles them
+        return super().dumps(obj, separators=(',', ':')).encode()
+
+    def dumps(self, obj, **kwargs):
+        if self.backend == 'orjson' and not kwargs:
+            return self.dump_bytes(obj).decode()
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if self.backend == 'orjson' and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if self.backend != 'orjson' or self._app.debug:
+            return super().response(*args, **kwargs)  # pretty-printed in debug mode
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dump_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+
+def stream_json(head, key, rows, serializer, names=None):
+    """JSON object response {**head, key: [rows...]} whose array is encoded as it is sent.
+
+    rows may be a lazy iterable (e.g. query.yield_per()); it is started here,
+    inside the view, so a failing query still reaches the view's error
+    handling. Errors after that can only cut the response short.
+    """
+    dump = current_app.json.dump_bytes
+    serialize = serializer.compile(names)
+    rows = iter(rows)
+    opening = dump(head)[:-1] + b',' if head else b'{'
+
+    def generate():
+        yield opening + dump(key) + b':['
+        separator = b''
+        batch = []
+        for row in rows:
+            batch.append(serialize(row))
+            if len(batch) == STREAM_BATCH_ROWS:
+                yield separator + dump(batch)[1:-1]
+                separator = b','
+                batch = []
+        if batch:
+            yield separator + dump(batch)[1:-1]
+        yield b']}'
+
+    return current_app.response_class(stream_with_context(generate()), mimetype='application/json')
+
+
+# ===========================
+# PER-MODEL SERIALIZERS
+# ===========================
+
+HEALTH_RECORD = Serializer(HealthRecord, {
+    "id": "id",
+    "type": "record_type",
+    "value": "value",
+    "unit": "unit",
+    "notes": "notes",
+    "recorded_at": "recorded_at",
+})
+
+MEAL = Serializer(Meal, {
+    "id": "id",
+    "meal_type": "meal_type",
+    "meal_name": "meal_name",
+    "calories": "calories",
+    "protein": "protein",
+    "carbs": "carbs",
+    "fats": "fats",
+    "consumed": "consumed",
+    "consumed_at": "consumed_at",
+    "scheduled_time": "scheduled_time",
+    "notes": "notes",
+})
+
+APPOINTMENT = Serializer(Appointment, {
+    "id": "id",
+    "elder_id": "elder_id",
+    "elder_name": ("elder_id", lambda a: elder_summary(a.elder_id).full_name),
+    "title": "title",
+    "doctor_name": "doctor_name",
+    "location": "location",
+    "appointment_date": "appointment_date",
+    "duration_minutes": "duration_minutes",
+    "status": "status",
+    "notes": "notes",
+})
+
+NOTIFICATION = Serializer(Notification, {
+    "id": "id",
+    "title": "title",
+    "message": "message",
+    "type": "notification_type",
+    "is_read": "is_read",
+    "created_at": "created_at",
+    "count": ("event_count", lambda n: n.event_count or 1),
+    "last_event_at": ("last_event_at", lambda n: (n.last_event_at or n.created_at).isoformat()),
+})
+
+EMERGENCY_CONTACT = Serializer(EmergencyContact, {
+    "id": "id",
+    "name": "name",
+    "relationship": "relationship",
+    "phone": "phone",
+    "email": "email",
+    "is_primary": "is_primary",
+})
+
+PRESCRIPTION = Serializer(Prescription, {
+    "id": "id",
+    "elder_id": "elder_id",
+    "doctor_name": "doctor_name",
+    "date": "date",
+    "diagnosis": "diagnosis",
+    "medicines": "medicines",
+    "notes": "notes",
+    "image_path": "image_path",
+    "created_at": "created_at",
+})
+
+MEDICATION = Serializer(Medication, {
+    "id": "id",
+    "elder_id": "elder_id",
+    "name": "name",
+    "dosage": "dosage",
+    "frequency": "frequency",
+    "time": "time",
+    "instructions": "instructions",
+    "is_active": "is_active",
+    "start_date": "start_date",
+    "end_date": "end_date",
+})
+
+MEDICATION_LOG = Serializer(MedicationLog, {
+    "id": "id",
+    "medication_id": "medication_id",
+    "taken_at": "taken_at",
+    "status": "status",
+    "notes": "notes",
+})
+
+# GET /medications rows: plain columns (no ORM objects) of each medication, its
+# latest MedicationLog (outer joined, so NULL when never logged) and the elder's name
+MEDICATION_LIST = Serializer({
+    'id': Medication.id,
+    'elder_id': Medication.elder_id,
+    'elder_name': User.full_name,
+    'name': Medication.name,
+    'dosage': Medication.dosage,
+    'frequency': Medication.frequency,
+    'time': Medication.time,
+    'instructions': Medication.instructions,
+    'is_active': Medication.is_active,
+    'status': case((MedicationLog.id.is_(None), 'pending'), else_=MedicationLog.status),
+    'start_date': Medication.start_date,
+    'end_date': Medication.end_date,
+    'last_taken': MedicationLog.taken_at,
+}, {name: name for name in (
+    "id", "elder_id", "elder_name", "name", "dosage", "frequency", "time", "instructions", "is_active", "status",
+    "start_date", "end_date", "last_taken",
+)})
+
+# GET /sync upserts; per-elder lists add elder_id since a sync spans all of a caretaker's elders
+SYNC = {
+    'medications': MEDICATION,
+    'medication_logs': MEDICATION_LOG,
+    'health_records': Serializer(HealthRecord, dict(HEALTH_RECORD.fields, elder_id="elder_id")),
+    'meals': Serializer(Meal, dict(MEAL.fields, elder_id="elder_id")),
+    'appointments': APPOINTMENT,
+    'prescriptions': PRESCRIPTION,
+    'notifications': NOTIFICATION,
+}
@@ -0,0 +1,130 @@
+"""
+SQLite settings for a multi-threaded server.
+
+Every new connection gets:
+- journal_mode=WAL        readers see the last commit instead of waiting for writers
+- synchronous=NORMAL      fsync at checkpoints rather than on every commit (safe with WAL)
+- busy_timeout            a writer waits for the lock instead of failing at once
+- cache_size, mmap_size   larger page cache and memory-mapped reads
+- temp_store=MEMORY
+
+Transactions are begun explicitly: BEGIN IMMEDIATE for views marked with
+@write_transaction and for work outside a request (outbox workers, CLI),
+BEGIN for every other request and for connections with
+execution_options(sqlite_deferred=True). A deferred transaction that reads
+first and then writes must upgrade its lock, and SQLite fails that upgrade
+immediately (no busy wait) if another writer committed in between; taking
+the write lock up front turns the conflict into an ordinary busy_timeout
+wait. Read-only views (including POSTs such as login) stay deferred so they
+don't queue behind writers.
+
+Handlers catch their own exceptions, so a write that still hits "database is
+locked" is noticed through an engine error hook and the whole view is run
+again with backoff, as long as nothing was committed during the failed
+attempt.
+"""
+import functools
+import random
+import sqlite3
+import time
+
+from flask import g, has_app_context, has_request_context
+from sqlalchemy import event
+
+
+class SQLiteTuning:
+    def __init__(self, busy_timeout_ms=5000, cache_size_kib=16384, mmap_bytes=256 * 1024 * 1024,
+                 retries=3, backoff_seconds=0.05):
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kib = cache_size_kib
+        self.mmap_bytes = mmap_bytes
+        self.retries = retries
+        self.backoff_seconds = backoff_seconds
+        self.retried = 0
+        self.gave_up = 0
+
+    def pragmas(self):
+        return [
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",
+            f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}",
+            f"PRAGMA cache_size=-{int(self.cache_size_kib)}",
+            f"PRAGMA mmap_size={int(self.mmap_bytes)}",
+            "PRAGMA temp_store=MEMORY",
+        ]
+
+    def install(self, engine, session=None):
+        """Hook the engine (and session, for retries); returns False (and does nothing) for other databases"""
+        if engine.dialect.name != 'sqlite':
+            return False
+        event.listen(engine, 'connect', self._on_connect)
+        event.listen(engine, 'begin', self._on_begin)
+        event.listen(engine, 'handle_error', self._on_error)
+        if session is not None:
+            event.listen(session, 'after_commit', self._on_commit)
+        engine.dispose()  # connections opened before this point lack the pragmas
+        return True
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        # Let the 'begin' hook issue BEGIN instead of pysqlite's implicit one
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in self.pragmas():
+            cursor.execute(pragma)
+        cursor.close()
+
+    def _on_begin(self, connection):
+        reading = connection.get_execution_options().get('sqlite_deferred') or \
+            (has_request_context() and not g.get('sqlite_writes'))
+        connection.exec_driver_sql("BEGIN" if reading else "BEGIN IMMEDIATE")
+
+    def _on_error(self, context):
+        if is_locked_error(context.original_exception) and has_app_context():
+            g.sqlite_locked = True
+
+    def _on_commit(self, session):
+        if has_app_context():
+            g.sqlite_committed = True
+
+    def retry_locked(self, view, session):
+        """Wrap a view: re-run it with backoff if it failed on a locked database before committing"""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            for attempt in range(self.retries + 1):
+                g.pop('sqlite_locked', None)
+                g.pop('sqlite_committed', None)
+                response = view(*args, **kwargs)
+                if not g.pop('sqlite_locked', False) or g.get('sqlite_committed'):
+                    return response
+                session.rollback()
+                if attempt == self.retries:
+                    self.gave_up += 1
+                    return response
+                self.retried += 1
+                time.sleep(self.backoff_seconds * (2 ** attempt) * (0.5 + random.random()))
+            return response
+        return wrapper
+
+    def wrap_views(self, app, session):
+        """Apply retry_locked to every registered view (call after the routes are defined)"""
+        for endpoint, view in list(app.view_functions.items()):
+            if endpoint != 'static':
+                app.view_functions[endpoint] = self.retry_locked(view, session)
+
+    def stats(self):
+        return {"retried": self.retried, "gave_up": self.gave_up}
+
+
+def write_transaction(view):
+    """Mark a view that writes: its transactions begin with BEGIN IMMEDIATE"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.sqlite_writes = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def is_locked_error(error):
+    return isinstance(error, sqlite3.OperationalError) and (
+        'database is locked' in str(error) or 'database table is locked' in str(error)
+    )
@@ -0,0 +1,210 @@
+"""
+Change log for delta sync.
+
+An after_flush hook on the app session appends one sync_changes row per
+inserted, updated or deleted tracked object, in the same transaction as the
+write itself. GET /sync?since=<cursor> then reads the log from the cursor
+onwards and returns the current rows for upserts and bare ids for deletes.
+Writes that bypass the ORM (multi-row Core INSERTs) call record() directly.
+
+Elder data is scoped by elder_id; notifications are scoped by recipient only,
+since a caretaker's alert about an elder must not sync to the elder.
+
+Other caches can subscribe() to be told which elders' data changed once the
+transaction commits.
+
+The log is trimmed to the retention window by a Pruner thread, at startup and
+then every interval; clients with a cursor from before the trimmed range are
+told to reload.
+"""
+from datetime import datetime, timedelta
+import threading
+import time
+
+from sqlalchemy import event, or_
+
+from models import db, SyncChange, Medication, MedicationLog, HealthRecord, Meal, Appointment, Prescription, Notification
+
+# entity name (as sent to clients) -> model
+TRACKED = {
+    'medications': Medication,
+    'medication_logs': MedicationLog,
+    'health_records': HealthRecord,
+    'meals': Meal,
+    'appointments': Appointment,
+    'prescriptions': Prescription,
+    'notifications': Notification,
+}
+_ENTITY_BY_MODEL = {model: entity for entity, model in TRACKED.items()}
+_subscribers = []
+
+
+def scope_of(session, obj):
+    """(elder_id, recipient_user_id) for a tracked object"""
+    if isinstance(obj, Notification):
+        return None, obj.recipient_user_id
+    if isinstance(obj, MedicationLog):
+        medication = session.identity_map.get(session.identity_key(Medication, obj.medication_id)) \
+            if obj.medication_id else None
+        if medication is not None:
+            return medication.elder_id, None
+        elder_id = session.connection().execute(
+            db.select(Medication.elder_id).where(Medication.id == obj.medication_id)
+        ).scalar()
+        return elder_id, None
+    return obj.elder_id, None
+
+
+def _after_flush(session, flush_context):
+    now = datetime.utcnow()
+    rows = []
+    for op, objects in (('upsert', session.new), ('upsert', session.dirty), ('delete', session.deleted)):
+        for obj in objects:
+            entity = _ENTITY_BY_MODEL.get(type(obj))
+            if entity is None:
+                continue
+            if objects is session.dirty and not session.is_modified(obj, include_collections=False):
+                continue
+            elder_id, recipient_user_id = scope_of(session, obj)
+            rows.append(dict(
+                entity=entity, entity_id=obj.id, elder_id=elder_id,
+                recipient_user_id=recipient_user_id, op=op, changed_at=now,
+            ))
+    if rows:
+        session.connection().execute(SyncChange.__table__.insert(), rows)
+        _mark_changed(session, rows)
+
+
+def _mark_changed(session, rows):
+    session.info.setdefault('sync_changed_elders', set()).update(
+        row['elder_id'] for row in rows if row['elder_id'] is not None
+    )
+
+
+def _after_commit(session):
+    changed = session.info.pop('sync_changed_elders', None)
+    if not changed:
+        return
+    for callback in _subscribers:
+        try:
+            callback(changed)
+        except Exception as e:
+            print(f"Sync subscriber failed: {e}")
+
+
+def _after_rollback(session):
+    session.info.pop('sync_changed_elders', None)
+
+
+def install(session):
+    """Start logging changes made through this session (db.session)"""
+    for name, listener in (('after_flush', _after_flush), ('after_commit', _after_commit),
+                           ('after_rollback', _after_rollback)):
+        if not event.contains(session, name, listener):
+            event.listen(session, name, listener)
+
+
+def subscribe(callback):
+    """Call callback(elder_ids) after each commit that changed those elders' data"""
+    _subscribers.append(callback)
+
+
+def record(session, entity, entity_ids, elder_id=None, recipient_user_id=None, op='upsert'):
+    """Log changes made without the ORM (e.g. bulk INSERT ... RETURNING id)"""
+    now = datetime.utcnow()
+    rows = [dict(entity=entity, entity_id=entity_id, elder_id=elder_id,
+                 recipient_user_id=recipient_user_id, op=op, changed_at=now)
+            for entity_id in entity_ids]
+    if rows:
+        session.execute(SyncChange.__table__.insert(), rows)
+        _mark_changed(session, rows)
+
+
+def current_cursor():
+    return db.session.query(db.func.max(SyncChange.id)).scalar() or 0
+
+
+def oldest_cursor():
+    return db.session.query(db.func.min(SyncChange.id)).scalar()
+
+
+def changes_since(since, elder_ids, user_id, limit):
+    """Log entries after `since` visible to this user, oldest first (limit + 1 to detect more)"""
+    scope = SyncChange.recipient_user_id == user_id
+    if elder_ids:
+        scope = or_(SyncChange.elder_id.in_(list(elder_ids)), scope)
+    return SyncChange.query.filter(SyncChange.id > since, scope) \
+        .order_by(SyncChange.id).limit(limit + 1).all()
+
+
+def collapse(changes):
+    """entity -> {entity_id: last op}; later entries win"""
+    result = {}
+    for change in changes:
+        result.setdefault(change.entity, {})[change.entity_id] = change.op
+    return result
+
+
+def load_rows(entity, ids, elder_ids, user_id):
+    """Current rows for upserted ids, re-checked against the user's scope"""
+    model = TRACKED[entity]
+    query = model.query.filter(model.id.in_(list(ids)))
+    if model is Notification:
+        query = query.filter(Notification.recipient_user_id == user_id)
+    elif model is MedicationLog:
+        query = query.join(Medication, MedicationLog.medication_id == Medication.id) \
+            .filter(Medication.elder_id.in_(list(elder_ids)))
+    else:
+        query = query.filter(model.elder_id.in_(list(elder_ids)))
+    return query.all()
+
+
+def prune(retention_days):
+    """Delete log entries older than the retention window; returns rows removed"""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    removed = SyncChange.query.filter(SyncChange.changed_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return removed
+
+
+class Pruner:
+    """Runs prune() at start() and then every interval_seconds on a daemon thread"""
+
+    def __init__(self, app, retention_days, interval_seconds=3600):
+        self.app = app
+        self.retention_days = retention_days
+        self.interval_seconds = interval_seconds
+        self.pruned_at = None
+        self.removed = 0
+
+    def prune(self):
+        with self.app.app_context():
+            removed = prune(self.retention_days)
+        self.pruned_at = datetime.utcnow()
+        self.removed += removed
+        if removed:
+            print(f"✓ Pruned {removed} sync log entries")
+        return removed
+
+    def start(self):
+        try:
+            self.prune()
+        except Exception as e:
+            print(f"Warning: Could not prune sync log: {e}")
+        if self.interval_seconds:
+            threading.Thread(target=self._run, name='sync-log-pruner', daemon=True).start()
+        return self
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval_seconds)
+            try:
+                self.prune()
+            except Exception as e:
+                print(f"Sync log prune failed: {e}")
+
+    def stats(self):
+        return {
+            "removed": self.removed,
+            "pruned_at": self.pruned_at.isoformat() if self.pruned_at else None,
+        }
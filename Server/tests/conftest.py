@@ -0,0 +1,113 @@
+"""
+Shared fixtures.
+
+app_new configures itself from the environment at import time, so the
+throwaway database is set up here, before any test imports it. The app is
+imported once per session; tests sign up fresh accounts instead of resetting
+the database.
+
+Run from Server/:
+    python -m pytest tests
+"""
+import itertools
+import os
+import sys
+import tempfile
+import threading
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+TEST_DIR = tempfile.mkdtemp(prefix='gentlecare-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+os.environ['AI_CLIENT_WARMUP'] = 'false'
+os.environ['JWT_SECRET_KEY'] = 'test-jwt-secret-key-of-at-least-32-bytes'
+os.environ.pop('REPLICA_DATABASE_URL', None)
+os.environ.pop('SOCKETIO_MESSAGE_QUEUE', None)
+os.environ.pop('REDIS_URL', None)
+
+_accounts = itertools.count(1)
+
+
+@pytest.fixture(scope='session')
+def server():
+    import app_new
+    return app_new
+
+
+@pytest.fixture(scope='session')
+def app(server):
+    return server.app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app, client):
+    """make_user('elder' | 'caretaker', caretaker=None) -> account dict with headers"""
+    from models import ElderProfile
+
+    def make(user_type='elder', caretaker=None):
+        number = next(_accounts)
+        email = f"{user_type}{number}@test.local"
+        response = client.post('/auth/signup', json={
+            'email': email, 'password': 'secret', 'full_name': f"{user_type.title()} {number}", 'user_type': user_type,
+        })
+        assert response.status_code == 201, response.get_json()
+        data = response.get_json()
+        account = {
+            'id': data['user']['id'],
+            'email': email,
+            'full_name': data['user']['full_name'],
+            'headers': {'Authorization': f"Bearer {data['access_token']}"},
+        }
+        if user_type == 'elder':
+            with app.app_context():
+                account['elder_id'] = ElderProfile.query.filter_by(user_id=account['id']).one().id
+            if caretaker is not None:
+                response = client.post('/auth/link-caretaker', json={'caretaker_email': caretaker['email']},
+                                       headers=account['headers'])
+                assert response.status_code == 200, response.get_json()
+        return account
+
+    return make
+
+
+@pytest.fixture
+def drain(server):
+    """Wait for the outbox to finish every queued side effect"""
+    return server.side_effects.join
+
+
+@pytest.fixture
+def sent(server, monkeypatch):
+    """Socket.IO emits as (event, payload, rooms)"""
+    emitted = []
+    monkeypatch.setattr(server.socketio, 'emit',
+                        lambda name, payload, **kwargs: emitted.append((name, payload, sorted(kwargs.get('to') or []))))
+    return emitted
+
+
+@pytest.fixture
+def queries(app):
+    """SQL statements the test's thread (and so its test client requests) runs on the primary engine"""
+    from sqlalchemy import event
+    from models import db
+
+    statements = []
+    thread = threading.get_ident()
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == thread:  # not the outbox workers'
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', record)
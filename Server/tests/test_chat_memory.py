@@ -0,0 +1,113 @@
+from types import SimpleNamespace
+
+import pytest
+
+import chat_memory
+from chat_memory import ConversationStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(chat_memory, 'time', SimpleNamespace(monotonic=clock))  # not the app's other threads
+    return clock
+
+
+def _size(lines):
+    return sum(len(line.encode('utf-8')) for line in lines)
+
+
+def test_each_conversation_keeps_its_last_lines(clock):
+    store = ConversationStore(max_lines=3)
+    for index in range(5):
+        store.append('alice', f"User: message {index}")
+    store.append('bob', "User: hello")
+
+    assert store.history('alice') == [f"User: message {index}" for index in (2, 3, 4)]
+    assert store.history('bob') == ["User: hello"]
+    assert store.stats()['bytes'] == _size(store.history('alice') + store.history('bob'))
+
+
+def test_long_lines_are_truncated(clock):
+    store = ConversationStore(max_line_chars=10)
+    store.append('alice', "x" * 50)
+    assert store.history('alice') == ["x" * 10]
+
+
+def test_idle_conversation_expires(clock):
+    store = ConversationStore(idle_ttl=60)
+    store.append('alice', "User: hi")
+    clock.now += 59
+    assert store.history('alice') == ["User: hi"]  # reading counts as activity
+
+    clock.now += 61
+    assert store.history('alice') == []
+    assert store.stats() == {"sessions": 0, "bytes": 0, "max_bytes": store.max_bytes}
+
+
+def test_expired_conversation_starts_over_on_append(clock):
+    store = ConversationStore(idle_ttl=60)
+    store.append('alice', "User: old")
+    clock.now += 61
+    store.append('alice', "User: new")
+
+    assert store.history('alice') == ["User: new"]
+    assert store.stats()['bytes'] == _size(["User: new"])
+
+
+def test_other_appends_evict_idle_conversations(clock):
+    store = ConversationStore(idle_ttl=60)
+    store.append('alice', "User: hi")
+    clock.now += 30
+    store.append('bob', "User: hi")
+    clock.now += 31
+    store.append('carol', "User: hi")
+
+    assert store.stats()['sessions'] == 2  # alice went idle; bob has 1 s left
+    assert store.history('alice') == []
+    assert store.history('bob') == ["User: hi"]
+
+
+def test_session_cap_evicts_the_least_recently_used(clock):
+    store = ConversationStore(max_sessions=2)
+    store.append('alice', "User: hi")
+    store.append('bob', "User: hi")
+    store.history('alice')
+    store.append('carol', "User: hi")
+
+    assert store.stats()['sessions'] == 2
+    assert store.history('bob') == []
+    assert store.history('alice') == store.history('carol') == ["User: hi"]
+
+
+def test_byte_cap_evicts_other_conversations_then_trims_the_current_one(clock):
+    line = "y" * 100
+    store = ConversationStore(max_lines=10, max_bytes=350)
+    for _ in range(3):
+        store.append('alice', line)
+    store.append('bob', line)
+
+    assert store.history('alice') == []
+    assert store.history('bob') == [line]
+
+    for _ in range(5):
+        store.append('bob', line)
+    assert store.history('bob') == [line] * 3
+    assert store.stats()['bytes'] == 300
+
+
+def test_clear(clock):
+    store = ConversationStore()
+    store.append('alice', "User: hi")
+    store.clear('alice')
+    store.clear('nobody')
+    assert store.history('alice') == []
+    assert store.stats()['bytes'] == 0
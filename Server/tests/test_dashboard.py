@@ -0,0 +1,103 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+MEDICATION = {'name': 'Metformin', 'dosage': '500mg', 'frequency': 'Daily', 'time': '8:00 AM'}
+
+
+def _dashboard(client, account):
+    response = client.get('/dashboard', headers=account['headers'])
+    assert response.status_code == 200, response.get_json()
+    return {elder['elder_id']: elder for elder in response.get_json()['elders']}
+
+
+def _add_medication(client, elder, taken=False):
+    medication_id = client.post('/medications', json=MEDICATION, headers=elder['headers']).get_json()['medication_id']
+    if taken:
+        response = client.post(f'/medications/{medication_id}/log', json={'status': 'taken'}, headers=elder['headers'])
+        assert response.status_code == 201
+    return medication_id
+
+
+def _add_appointment(client, elder, title, days):
+    response = client.post('/appointments', json={
+        'title': title, 'doctor_name': 'Dr. Rao', 'location': 'Clinic',
+        'appointment_date': (datetime.utcnow() + timedelta(days=days)).replace(microsecond=0).isoformat(),
+    }, headers=elder['headers'])
+    assert response.status_code == 201, response.get_json()
+
+
+def _unread_about(app, account, elder_id):
+    from models import Notification
+
+    with app.app_context():
+        return Notification.query.filter_by(recipient_user_id=account['id'], elder_id=elder_id, is_read=False).count()
+
+
+@pytest.fixture
+def care_teams(client, make_user, drain):
+    """Two caretakers: the first with a busy and a quiet elder, the second with one elder"""
+    first, second = make_user('caretaker'), make_user('caretaker')
+    busy, quiet = make_user('elder', caretaker=first), make_user('elder', caretaker=first)
+    other = make_user('elder', caretaker=second)
+
+    _add_medication(client, busy, taken=True)
+    _add_medication(client, busy)
+    _add_appointment(client, busy, 'Eye exam', days=3)
+    _add_appointment(client, busy, 'Check-up', days=1)
+    for value in ('70', '75'):
+        client.post('/health-records', json={'type': 'heart_rate', 'value': value, 'unit': 'bpm'},
+                    headers=busy['headers'])
+    client.post('/location', json={'latitude': 12.97, 'longitude': 77.59, 'accuracy': 5}, headers=busy['headers'])
+
+    _add_medication(client, other, taken=True)
+    _add_appointment(client, other, 'Dentist', days=2)
+    drain()
+    return first, second, busy, quiet, other
+
+
+def test_each_caretaker_sees_only_their_elders(client, care_teams):
+    first, second, busy, quiet, other = care_teams
+
+    assert list(_dashboard(client, first)) == [busy['elder_id'], quiet['elder_id']]
+    assert list(_dashboard(client, second)) == [other['elder_id']]
+    assert list(_dashboard(client, busy)) == [busy['elder_id']]
+    assert list(_dashboard(client, other)) == [other['elder_id']]
+
+
+def test_summary_aggregates_each_elders_data(app, client, care_teams):
+    first, second, busy, quiet, other = care_teams
+
+    elders = _dashboard(client, first)
+    summary = elders[busy['elder_id']]
+    assert summary['elder_name'] == busy['full_name']
+    assert summary['medications'] == {'active': 2, 'taken_today': 1, 'pending_today': 1}
+    assert summary['next_appointment']['title'] == 'Check-up'
+    assert summary['latest_vitals']['heart_rate']['value'] == '75'
+    assert (summary['last_location']['latitude'], summary['last_location']['longitude']) == (12.97, 77.59)
+    assert summary['unread_notifications'] == _unread_about(app, first, busy['elder_id']) > 0
+
+    empty = elders[quiet['elder_id']]
+    assert empty['medications'] == {'active': 0, 'taken_today': 0, 'pending_today': 0}
+    assert (empty['next_appointment'], empty['latest_vitals'], empty['last_location']) == (None, {}, None)
+    assert empty['unread_notifications'] == 0
+
+    summary = _dashboard(client, second)[other['elder_id']]
+    assert summary['medications'] == {'active': 1, 'taken_today': 1, 'pending_today': 0}
+    assert summary['next_appointment']['title'] == 'Dentist'
+    assert summary['unread_notifications'] == _unread_about(app, second, other['elder_id'])
+
+
+def test_summary_follows_new_writes(client, care_teams, drain):
+    first, second, busy, quiet, other = care_teams
+    _dashboard(client, first)  # cache both elders
+
+    _add_medication(client, quiet, taken=True)
+    client.post('/health-records', json={'type': 'heart_rate', 'value': '81', 'unit': 'bpm'},
+                headers=busy['headers'])
+    drain()
+
+    elders = _dashboard(client, first)
+    assert elders[quiet['elder_id']]['medications'] == {'active': 1, 'taken_today': 1, 'pending_today': 0}
+    assert elders[busy['elder_id']]['latest_vitals']['heart_rate']['value'] == '81'
+    assert elders[busy['elder_id']]['medications']['taken_today'] == 1
@@ -0,0 +1,98 @@
+import os
+
+from flask import Flask, jsonify
+from flask_sqlalchemy import SQLAlchemy
+import pytest
+
+import database
+from database import LocalReplica, RoutingSession
+
+
+def test_pool_follows_threads_and_background_workers(monkeypatch):
+    for name in ('DB_POOL_SIZE', 'DB_MAX_OVERFLOW', 'DB_MAX_CONNECTIONS'):
+        monkeypatch.delenv(name, raising=False)
+    assert database.pool_settings(threads=8, workers=4, background_threads=2) == (10, 4)
+
+
+def test_pool_is_capped_by_max_connections(monkeypatch):
+    monkeypatch.setenv('DB_MAX_CONNECTIONS', '20')
+    pool_size, max_overflow = database.pool_settings(threads=8, workers=4, background_threads=2)
+    assert (pool_size, max_overflow) == (5, 0)
+    assert (pool_size + max_overflow) * 4 <= 20
+
+
+def test_engine_options():
+    assert database.engine_options('sqlite://', 8, 1) == {}
+    assert 'pool_pre_ping' not in database.engine_options('sqlite:////tmp/db.sqlite', 8, 1)
+    options = database.engine_options('postgresql://u:p@db/app', 8, 1)
+    assert options['pool_pre_ping'] is True
+    assert 'statement_timeout' in options['connect_args']['options']
+    assert database.normalize_url('postgres://u@db/app') == 'postgresql://u@db/app'
+
+
+@pytest.fixture
+def replicated(tmp_path):
+    """A small app whose GETs read from a LocalReplica copy of its SQLite primary"""
+    primary_path = os.path.join(tmp_path, 'primary.db')
+    replica_path = os.path.join(tmp_path, 'replica.db')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{primary_path}'
+    app.config['SQLALCHEMY_BINDS'] = {database.REPLICA_BIND: f'sqlite:///{replica_path}'}
+    db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+
+    class Item(db.Model):
+        id = db.Column(db.Integer, primary_key=True)
+        name = db.Column(db.String(50))
+
+    @app.route('/items', methods=['GET', 'POST'])
+    def items():
+        return jsonify(sorted(item.name for item in Item.query.all()))
+
+    @app.route('/items/add-and-list', methods=['GET'])
+    def add_and_list():
+        db.session.add(Item(name='written in request'))
+        db.session.flush()
+        names = sorted(item.name for item in Item.query.all())
+        db.session.rollback()
+        return jsonify(names)
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(Item(name='synced'))
+        db.session.commit()
+    replica = LocalReplica(primary_path, replica_path)
+    replica.sync()
+    with app.app_context():
+        db.session.add(Item(name='not yet replicated'))
+        db.session.commit()
+
+    assert database.install_read_routing(app, db)
+    yield app, replica
+    with app.app_context():
+        db.engine.dispose()
+        db.engines[database.REPLICA_BIND].dispose()
+
+
+def test_gets_read_from_the_replica(replicated):
+    app, replica = replicated
+    client = app.test_client()
+
+    assert client.get('/items').get_json() == ['synced']
+    assert client.post('/items').get_json() == ['not yet replicated', 'synced']
+
+    replica.sync()
+    assert client.get('/items').get_json() == ['not yet replicated', 'synced']
+    assert replica.syncs == 2
+
+
+def test_get_reads_its_own_writes_from_the_primary(replicated):
+    app, _ = replicated
+    names = app.test_client().get('/items/add-and-list').get_json()
+    assert names == ['not yet replicated', 'synced', 'written in request']
+
+
+def test_read_routing_needs_a_replica_bind(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmp_path, 'only.db')}"
+    db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+    assert database.install_read_routing(app, db) is False
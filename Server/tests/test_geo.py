@@ -0,0 +1,201 @@
+from datetime import datetime, timedelta
+import math
+
+import pytest
+
+from geo import downsample_fixes, encode_polyline, haversine_m, parse_fix_time, simplify_track
+
+METERS_PER_DEGREE = math.pi * 6371000.0 / 180.0
+
+
+def decode_polyline(encoded, precision=5):
+    """Reference decoder for the Google polyline format"""
+    points, index, lat, lon = [], 0, 0, 0
+    while index < len(encoded):
+        deltas = []
+        for _ in range(2):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1f) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            deltas.append(~(result >> 1) if result & 1 else result >> 1)
+        lat += deltas[0]
+        lon += deltas[1]
+        points.append((lat / 10 ** precision, lon / 10 ** precision))
+    return points
+
+
+def test_encode_polyline_matches_the_reference_example():
+    points = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert encode_polyline(points) == '_p~iF~ps|U_ulLnnqC_mqNvxq`@'
+
+
+def test_encode_polyline_round_trips():
+    points = [(12.97161, 77.59456), (12.97161, 77.59456), (-33.86785, 151.20732), (0.0, -0.00001)]
+    assert encode_polyline([]) == ''
+    assert decode_polyline(encode_polyline(points)) == points
+    assert decode_polyline(encode_polyline(points, precision=6), precision=6) == points
+
+
+def test_simplify_drops_points_on_a_straight_line():
+    line = [(12.97 + i * 0.0001, 77.59) for i in range(50)]
+    assert simplify_track(line, tolerance_m=1) == [0, 49]
+
+
+def test_simplify_keeps_corners_and_respects_tolerance():
+    # East along the equator for ~1.1 km, then north; a 3 m wobble in the middle
+    track = [(0.0, i * 0.001) for i in range(11)] + [(i * 0.001, 0.01) for i in range(1, 11)]
+    track[5] = (3 / METERS_PER_DEGREE, 0.005)
+
+    assert simplify_track(track, tolerance_m=10) == [0, 10, 20]
+    assert simplify_track(track, tolerance_m=2) == [0, 4, 5, 6, 10, 20]
+    assert simplify_track(track, tolerance_m=0) == list(range(len(track)))
+
+
+def test_simplify_short_and_long_tracks():
+    assert simplify_track([], 10) == []
+    assert simplify_track([(1.0, 1.0)], 10) == [0]
+    # Every point of a zigzag is kept, one split at a time: deeper than the recursion limit
+    zigzag = [(0.0001 * (i % 2), i * 0.0001) for i in range(2000)]
+    assert len(simplify_track(zigzag, 5)) == 2000
+
+
+def test_downsample_drops_fixes_within_accuracy():
+    start = datetime(2025, 11, 5, 8, 0)
+    fixes = [
+        {'latitude': 12.97 + meters / METERS_PER_DEGREE, 'longitude': 77.59, 'accuracy': accuracy,
+         'recorded_at': start + timedelta(seconds=30 * index)}
+        for index, (meters, accuracy) in enumerate([(0, 5), (4, 5), (30, 5), (32, 50), (90, 5), (91, 5)])
+    ]
+
+    kept = downsample_fixes(fixes, min_distance_m=10)
+
+    assert [fix['recorded_at'] for fix in kept] == [fixes[i]['recorded_at'] for i in (0, 2, 4, 5)]
+    # Against the stored position, repeats are dropped but the latest fix still says how recent it is
+    repeats = [dict(fixes[-1], recorded_at=start + timedelta(hours=1, seconds=s)) for s in (0, 30, 60)]
+    assert downsample_fixes(repeats, previous=fixes[-1]) == repeats[-1:]
+
+
+def test_parse_fix_time():
+    assert parse_fix_time('2025-11-05T08:30:00Z') == datetime(2025, 11, 5, 8, 30)
+    assert parse_fix_time('2025-11-05T14:00:00+05:30') == datetime(2025, 11, 5, 8, 30)
+    assert parse_fix_time(1762331400000) == datetime(2025, 11, 5, 8, 30)
+    with pytest.raises(ValueError):
+        parse_fix_time('yesterday')
+
+
+def test_haversine():
+    assert haversine_m(12.97, 77.59, 12.97, 77.59) == 0
+    assert haversine_m(0, 0, 1, 0) == pytest.approx(METERS_PER_DEGREE)
+
+
+def test_history_endpoint_encodes_the_simplified_track(client, make_user):
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=2)
+    # A straight walk north then east, one fix every 50 m
+    path = [(12.97 + i * 50 / METERS_PER_DEGREE, 77.59) for i in range(10)]
+    path += [(path[-1][0], 77.59 + i * 50 / METERS_PER_DEGREE) for i in range(1, 10)]
+    response = client.post('/location/batch', json={'fixes': [
+        {'latitude': lat, 'longitude': lon, 'accuracy': 5, 'timestamp': (start + timedelta(minutes=i)).isoformat()}
+        for i, (lat, lon) in enumerate(path)
+    ]}, headers=elder['headers'])
+    assert response.get_json()['stored'] == len(path)
+
+    response = client.get(f"/location/{elder['elder_id']}/history",
+                          query_string={'format': 'polyline', 'tolerance': 5}, headers=caretaker['headers'])
+    body = response.get_json()
+
+    assert body['raw_points'] == len(path)
+    assert body['point_count'] == 3
+    decoded = decode_polyline(body['polyline'])
+    expected = [path[0], path[9], path[-1]]
+    assert decoded == [(round(lat, 5), round(lon, 5)) for lat, lon in expected]
+    assert body['time_deltas'] == [0, 9 * 60, 9 * 60]
+
+
+def test_history_is_only_visible_to_the_elder_and_their_caretaker(client, make_user):
+    caretaker, stranger = make_user('caretaker'), make_user('caretaker')
+    elder, other_elder = make_user('elder', caretaker=caretaker), make_user('elder')
+    client.post('/location', json={'latitude': 12.97, 'longitude': 77.59}, headers=elder['headers'])
+    history = f"/location/{elder['elder_id']}/history"
+
+    for account in (stranger, other_elder):
+        response = client.get(history, headers=account['headers'])
+        assert response.status_code == 403
+        assert 'points' not in response.get_json()
+    for account in (elder, caretaker):
+        assert client.get(history, headers=account['headers']).get_json()['raw_points'] == 1
+
+
+def _batch(client, account, fixes):
+    response = client.post('/location/batch', json={'fixes': [
+        {'latitude': lat, 'longitude': 77.59, 'accuracy': 5, 'timestamp': at.isoformat()} for lat, at in fixes
+    ]}, headers=account['headers'])
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def _latest(client, account, elder):
+    body = client.get(f"/location/{elder['elder_id']}", headers=account['headers']).get_json()
+    return body['latitude'], body['recorded_at']
+
+
+def _track(client, account, elder):
+    body = client.get(f"/location/{elder['elder_id']}/history", query_string={'tolerance': 0},
+                      headers=account['headers']).get_json()
+    return body['raw_points']
+
+
+def test_batch_sorts_out_of_order_fixes(client, make_user):
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    # ~110 m apart, sent newest first
+    fixes = [(12.97 + i * 0.001, start + timedelta(minutes=i)) for i in range(3)]
+
+    assert _batch(client, elder, fixes[::-1])['stored'] == 3
+
+    assert _latest(client, caretaker, elder) == (fixes[-1][0], fixes[-1][1].isoformat())
+    assert _track(client, caretaker, elder) == 3
+
+
+def test_late_batch_is_stored_without_moving_the_latest_position(server, client, make_user, drain, sent):
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    _batch(client, elder, [(12.97, start + timedelta(minutes=30))])
+    drain()
+    del sent[:]
+
+    # Collected earlier, uploaded later (e.g. a phone that was offline)
+    late = _batch(client, elder, [(12.98, start + timedelta(minutes=5)), (12.99, start + timedelta(minutes=10))])
+    drain()
+
+    assert late['stored'] == 2
+    assert _track(client, caretaker, elder) == 3
+    latest = (12.97, (start + timedelta(minutes=30)).isoformat())
+    assert _latest(client, caretaker, elder) == latest
+    server.location_cache.invalidate(elder['elder_id'])
+    assert _latest(client, caretaker, elder) == latest  # and from the database
+    assert [name for name, _, _ in sent if name == 'location_updated'] == []
+
+
+def test_duplicate_timestamps_are_stored_once(client, make_user):
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+    start = datetime.utcnow().replace(microsecond=0) - timedelta(hours=1)
+    fixes = [(12.97, start), (12.98, start + timedelta(minutes=1)), (12.985, start + timedelta(minutes=1))]
+
+    assert _batch(client, elder, fixes)['stored'] == 2
+    # The same upload retried, plus one new fix
+    retried = _batch(client, elder, fixes + [(12.99, start + timedelta(minutes=2))])
+    assert (retried['received'], retried['stored']) == (4, 1)
+    assert _batch(client, elder, fixes)['stored'] == 0
+
+    assert _track(client, caretaker, elder) == 3
+    assert _latest(client, caretaker, elder) == (12.99, (start + timedelta(minutes=2)).isoformat())
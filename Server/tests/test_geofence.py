@@ -0,0 +1,167 @@
+import pytest
+
+from geofence import GeofenceEngine, ZoneGrid, METERS_PER_DEGREE_LAT
+
+HOME = {'id': 1, 'name': 'Home', 'latitude': 12.97, 'longitude': 77.59, 'radius_m': 200.0}
+
+
+def north(meters, zone=HOME):
+    """(latitude, longitude) of a point `meters` north of the zone's center"""
+    return zone['latitude'] + meters / METERS_PER_DEGREE_LAT, zone['longitude']
+
+
+def transitions(engine, meters, accuracy=None, elder_id=1):
+    return [(zone['id'], kind) for zone, kind in engine.evaluate(elder_id, *north(meters), accuracy)]
+
+
+@pytest.fixture
+def engine():
+    zones = {1: [HOME]}
+    return GeofenceEngine(lambda elder_id: zones.get(elder_id, []), hysteresis_m=25)
+
+
+def test_first_fix_only_establishes_state(engine):
+    assert transitions(engine, 0) == []
+    assert transitions(engine, 400) == [(1, 'exit')]
+
+
+def test_first_fix_outside_then_entry(engine):
+    assert transitions(engine, 400) == []
+    assert transitions(engine, 50) == [(1, 'enter')]
+
+
+def test_jitter_around_the_boundary_does_not_alert(engine):
+    transitions(engine, 150)
+    for meters in (190, 215, 205, 220, 185, 210, 176):
+        assert transitions(engine, meters) == []  # within radius +/- 25 m
+
+
+def test_exit_and_reentry_need_the_full_margin(engine):
+    transitions(engine, 0)
+    assert transitions(engine, 224) == []
+    assert transitions(engine, 226) == [(1, 'exit')]
+    assert transitions(engine, 240) == []  # already outside
+    assert transitions(engine, 180) == []
+    assert transitions(engine, 174) == [(1, 'enter')]
+
+
+def test_poor_accuracy_widens_the_margin(engine):
+    transitions(engine, 0)
+    assert transitions(engine, 260, accuracy=80) == []
+    assert transitions(engine, 290, accuracy=80) == [(1, 'exit')]
+
+
+def test_margin_is_capped_for_small_zones():
+    tiny = dict(HOME, id=2, radius_m=20.0)
+    engine = GeofenceEngine(lambda elder_id: [tiny], hysteresis_m=25)
+
+    transitions_seen = [engine.evaluate(1, *north(meters, tiny)) for meters in (100, 5, 31, 0)]
+
+    # Margin is min(25, 20 / 2) = 10 m: enter below 10 m, leave beyond 30 m
+    assert [[kind for _, kind in found] for found in transitions_seen] == [[], ['enter'], ['exit'], ['enter']]
+    assert engine.evaluate(1, *north(0, tiny), accuracy=500) == []  # already inside, however coarse the fix
+
+
+def test_elders_are_tracked_separately(engine):
+    transitions(engine, 0, elder_id=1)
+    assert transitions(engine, 500, elder_id=2) == []  # elder 2 has no zones
+    assert transitions(engine, 500, elder_id=1) == [(1, 'exit')]
+
+
+def test_invalidate_picks_up_zone_changes():
+    zones = [HOME]
+    engine = GeofenceEngine(lambda elder_id: list(zones), hysteresis_m=25)
+    engine.evaluate(1, *north(400))
+
+    park = dict(HOME, id=2, name='Park', latitude=HOME['latitude'] + 0.01)
+    zones.append(park)
+    assert engine.evaluate(1, *north(0, park)) == []  # zones are cached until invalidated
+    engine.invalidate(1)
+    assert [(zone['id'], kind) for zone, kind in engine.evaluate(1, *north(0, park))] == [(2, 'enter')]
+
+
+def test_grid_only_returns_nearby_zones():
+    far = dict(HOME, id=2, latitude=HOME['latitude'] + 1.0)
+    grid = ZoneGrid([HOME, far], cell_degrees=0.01, padding_m=25)
+    assert [zone['id'] for zone in grid.candidates(*north(0))] == [1]
+    assert [zone['id'] for zone in grid.candidates(*north(0, far))] == [2]
+    assert grid.candidates(*north(5000)) == []
+
+
+def test_first_fix_of_a_batch_only_establishes_state(engine):
+    fixes = [{'latitude': lat, 'longitude': lon, 'accuracy': None} for lat, lon in (north(0), north(400), north(0))]
+    assert [kind for _, _, kind in engine.evaluate_fixes(1, fixes)] == ['exit', 'enter']
+    assert [fix for fix, _, _ in engine.evaluate_fixes(1, fixes[1:2])] == [fixes[1]]
+
+
+def test_state_survives_a_restart_and_is_shared_by_workers(server, client, make_user, drain, sent, monkeypatch):
+    from geofence import DatabaseZoneState
+
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+    client.post('/geofences', json={'name': 'Home', 'latitude': 12.97, 'longitude': 77.59, 'radius_m': 100},
+                headers=elder['headers'])
+
+    def fresh_worker():
+        return GeofenceEngine(server.load_safe_zones, hysteresis_m=25, state=DatabaseZoneState())
+
+    def move_to(latitude):
+        monkeypatch.setattr(server, 'geofence_engine', fresh_worker())  # nothing carried over in memory
+        response = client.post('/location', json={'latitude': latitude, 'longitude': 77.59, 'accuracy': 5},
+                               headers=elder['headers'])
+        assert response.status_code == 200
+        drain()
+        return [payload['transition'] for name, payload, _ in sent if name == 'geofence_alert']
+
+    assert move_to(12.97) == []  # first fix establishes state
+    assert move_to(12.98) == ['exit']
+    assert move_to(12.981) == ['exit']  # still outside: no second alert
+    assert move_to(12.97) == ['exit', 'enter']
+
+
+def test_deleting_a_zone_drops_its_state(app, client, make_user):
+    from models import GeofenceState
+
+    elder = make_user('elder')
+    zone_id = client.post('/geofences', json={'name': 'Home', 'latitude': 12.97, 'longitude': 77.59},
+                          headers=elder['headers']).get_json()['geofence_id']
+    client.post('/location', json={'latitude': 12.97, 'longitude': 77.59}, headers=elder['headers'])
+    with app.app_context():
+        assert GeofenceState.query.filter_by(elder_id=elder['elder_id']).count() == 1
+
+    client.delete(f'/geofences/{zone_id}', headers=elder['headers'])
+    with app.app_context():
+        assert GeofenceState.query.filter_by(elder_id=elder['elder_id']).count() == 0
+
+
+def test_zones_are_reloaded_when_their_version_moves():
+    zones, version = [HOME], ['1']
+    engine = GeofenceEngine(lambda elder_id: list(zones), hysteresis_m=25, zones_version=lambda elder_id: version[0])
+    engine.evaluate(1, *north(400))
+
+    park = dict(HOME, id=2, name='Park', latitude=HOME['latitude'] + 0.01)
+    zones.append(park)  # added by another worker process: nothing invalidated here
+    version[0] = '2'
+    assert [(zone['id'], kind) for zone, kind in engine.evaluate(1, *north(0, park))] == [(2, 'enter')]
+
+
+def test_zones_are_only_visible_to_the_elder_and_their_caretaker(client, make_user):
+    caretaker, stranger = make_user('caretaker'), make_user('caretaker')
+    elder, other_elder = make_user('elder', caretaker=caretaker), make_user('elder')
+    zone = {'name': 'Home', 'latitude': 12.97, 'longitude': 77.59, 'elder_id': elder['elder_id']}
+    zone_id = client.post('/geofences', json=zone, headers=caretaker['headers']).get_json()['geofence_id']
+    listing = {'elder_id': elder['elder_id']}
+
+    for intruder in (stranger, other_elder):
+        assert client.put(f'/geofences/{zone_id}', json={'radius_m': 5000}, headers=intruder['headers']).status_code == 403
+        assert client.delete(f'/geofences/{zone_id}', headers=intruder['headers']).status_code == 403
+    assert client.get('/geofences', query_string=listing, headers=stranger['headers']).status_code == 403
+    assert client.post('/geofences', json=zone, headers=stranger['headers']).status_code == 403
+    # An elder always gets their own zones, whatever elder_id they ask for
+    assert client.get('/geofences', query_string=listing, headers=other_elder['headers']).get_json() == {'geofences': []}
+
+    for account in (elder, caretaker):
+        zones = client.get('/geofences', query_string=listing, headers=account['headers']).get_json()['geofences']
+        assert [(z['id'], z['radius_m']) for z in zones] == [(zone_id, 200.0)]
+    assert client.put(f'/geofences/{zone_id}', json={'radius_m': 300}, headers=elder['headers']).status_code == 200
+    assert client.delete(f'/geofences/{zone_id}', headers=caretaker['headers']).status_code == 200
@@ -0,0 +1,58 @@
+MEDICATION = {'name': 'Metformin', 'dosage': '500mg', 'frequency': 'Daily', 'time': '8:00 AM'}
+
+
+def _add(client, account, count):
+    return [client.post('/medications', json=dict(MEDICATION, name=f'Medication {i}'),
+                        headers=account['headers']).get_json()['medication_id'] for i in range(count)]
+
+
+def test_list_shows_each_medications_latest_log(client, make_user):
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+    first, second, _ = _add(client, elder, 3)
+    client.post(f'/medications/{first}/log', json={'status': 'missed'}, headers=elder['headers'])
+    client.post(f'/medications/{first}/log', json={'status': 'taken'}, headers=elder['headers'])
+    client.post(f'/medications/{second}/log', json={'status': 'skipped'}, headers=elder['headers'])
+
+    for account in (elder, caretaker):
+        medications = client.get('/medications', headers=account['headers']).get_json()['medications']
+        assert [m['status'] for m in medications] == ['taken', 'skipped', 'pending']
+        assert {m['elder_name'] for m in medications} == {elder['full_name']}
+        assert medications[2]['last_taken'] is None
+
+
+def test_query_count_does_not_grow_with_medications_or_logs(client, make_user, queries):
+    elder = make_user('elder')
+    _add(client, elder, 1)
+    client.get('/medications', headers=elder['headers']).get_data()  # warms the user context cache
+    queries.clear()
+    client.get('/medications', headers=elder['headers']).get_data()
+    baseline = len(queries)
+
+    for medication_id in _add(client, elder, 5):
+        for _ in range(3):
+            client.post(f'/medications/{medication_id}/log', json={'status': 'taken'}, headers=elder['headers'])
+    queries.clear()
+    response = client.get('/medications', headers=elder['headers'])
+
+    assert len(response.get_json()['medications']) == 6
+    assert len(queries) == baseline
+    listing = [statement for statement in queries if 'medication_logs' in statement]
+    assert len(listing) == 1 and 'GROUP BY' not in listing[0]
+
+
+def test_latest_log_lookup_is_an_index_seek(app, client, make_user, queries):
+    from models import db
+
+    elder = make_user('elder')
+    _add(client, elder, 1)
+    queries.clear()
+    client.get('/medications', headers=elder['headers']).get_data()  # the list is streamed
+    listing = next(statement for statement in queries if 'medication_logs' in statement)
+
+    with app.app_context():
+        parameters = (1,) * listing.count('?')  # the plan doesn't depend on the values
+        plan = ' | '.join(row[3] for row in db.session.connection().exec_driver_sql(
+            f'EXPLAIN QUERY PLAN {listing}', parameters))
+    assert 'MATERIALIZE' not in plan
+    assert 'SCAN medication_logs' not in plan
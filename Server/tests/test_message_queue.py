@@ -0,0 +1,119 @@
+import os
+import queue
+import shutil
+import socket
+import tempfile
+import threading
+import time
+
+import pytest
+
+import message_queue
+from message_queue import LocalBroker, LocalSocketManager, connect_or_start_broker, _recv_frame, _send_frame
+
+
+@pytest.fixture
+def socket_path():
+    # Unix socket paths are limited to ~100 bytes, so not under pytest's tmp_path
+    directory = tempfile.mkdtemp(prefix='mq-', dir='/tmp')
+    yield os.path.join(directory, 'broker.sock')
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+def _connect(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(path)
+    sock.settimeout(5)
+    return sock
+
+
+def _wait_for_connections(broker, count):
+    """The broker registers connections on its accept thread; frames sent before that aren't relayed to them"""
+    deadline = time.monotonic() + 5
+    while len(broker._connections) < count:
+        assert time.monotonic() < deadline, "broker did not accept the connections"
+        time.sleep(0.01)
+
+
+def _registered(sock):
+    """Block until the broker relays to sock: it echoes every frame back to its sender too"""
+    _send_frame(sock, b'registered?')
+    while _recv_frame(sock) != b'registered?':
+        pass
+
+
+def test_broker_relays_every_frame_to_every_connection(socket_path):
+    broker = LocalBroker(socket_path).start()
+    try:
+        publisher, subscriber = _connect(socket_path), _connect(socket_path)
+        _wait_for_connections(broker, 2)
+        _send_frame(publisher, b'hello')
+        _send_frame(publisher, b'x' * 100000)
+
+        for sock in (publisher, subscriber):
+            assert _recv_frame(sock) == b'hello'
+            assert _recv_frame(sock) == b'x' * 100000
+    finally:
+        broker.close()
+
+
+def test_broker_drops_closed_connections(socket_path):
+    broker = LocalBroker(socket_path).start()
+    try:
+        gone, publisher = _connect(socket_path), _connect(socket_path)
+        _wait_for_connections(broker, 2)
+        gone.close()
+        _send_frame(publisher, b'still delivered')
+        assert _recv_frame(publisher) == b'still delivered'
+    finally:
+        broker.close()
+
+
+def test_first_process_starts_the_broker(socket_path):
+    first = connect_or_start_broker(socket_path)
+    second = connect_or_start_broker(socket_path)  # connects to the broker the first call started
+    first.settimeout(5)
+    second.settimeout(5)
+    try:
+        _registered(second)
+        _send_frame(first, b'ping')
+        assert _recv_frame(second) == b'ping'
+    finally:
+        first.close()
+        second.close()
+
+
+def test_managers_relay_published_messages(socket_path):
+    broker = LocalBroker(socket_path).start()
+    url = f'local://{socket_path}'
+    sender, receiver = LocalSocketManager(url), LocalSocketManager(url)
+    other_channel = LocalSocketManager(url, channel='other-app')
+    received = queue.Queue()
+
+    def listen(manager, label):
+        for data in manager._listen():
+            received.put((label, data))
+
+    for manager, label in ((receiver, 'receiver'), (other_channel, 'other')):
+        manager._connection()  # subscribed before anything is published
+        threading.Thread(target=listen, args=(manager, label), daemon=True).start()
+
+    sender._connection()
+    _wait_for_connections(broker, 3)
+    sender._publish({'method': 'emit', 'event': 'medication_logged', 'room': 'user_7', 'data': {'id': 1}})
+
+    label, data = received.get(timeout=5)
+    assert label == 'receiver'
+    assert data['event'] == 'medication_logged'
+    assert data['room'] == 'user_7'
+    with pytest.raises(queue.Empty):
+        received.get(timeout=0.2)
+    broker.close()
+
+
+def test_socketio_options_pick_the_backend():
+    assert message_queue.socketio_options(None) == {}
+    assert message_queue.socketio_options('redis://localhost:6379/0') == {'message_queue': 'redis://localhost:6379/0'}
+    options = message_queue.socketio_options('local:///tmp/unused.sock')
+    assert isinstance(options['client_manager'], LocalSocketManager)
+    assert options['client_manager'].path == '/tmp/unused.sock'
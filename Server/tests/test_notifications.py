@@ -0,0 +1,237 @@
+from datetime import datetime, timedelta
+import threading
+import time
+
+import pytest
+
+import notifications
+
+
+def _notify(app, account, elder_id, count, notification_type='emergency'):
+    """count notifications for account; emergencies are never coalesced"""
+    from models import db
+
+    with app.app_context():
+        ids = [notifications.notify(account['id'], elder_id, notification_type, f'Alert {index}', 'Check on them').id
+               for index in range(count)]
+        db.session.commit()
+    return ids
+
+
+def _unread(client, account):
+    count = client.get('/notifications/unread-count', headers=account['headers']).get_json()['unread_count']
+    listed = client.get('/notifications', headers=account['headers']).get_json()['unread_count']
+    assert listed == count
+    return count
+
+
+def _mark_read(client, account, **body):
+    response = client.post('/notifications/read', json=body, headers=account['headers'])
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def _counted(app, account):
+    """Unread rows counted from the table, to check the maintained counter against"""
+    from models import Notification
+
+    with app.app_context():
+        return Notification.query.filter_by(recipient_user_id=account['id'], is_read=False).count()
+
+
+def test_unread_count_follows_new_notifications(app, client, make_user):
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+    assert _unread(client, caretaker) == 0
+
+    _notify(app, caretaker, elder['elder_id'], 4)
+
+    assert _unread(client, caretaker) == 4 == _counted(app, caretaker)
+    assert _unread(client, elder) == 0
+
+
+def test_mark_some_by_id(app, client, make_user):
+    caretaker, other = make_user('caretaker'), make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+    ids = _notify(app, caretaker, elder['elder_id'], 5)
+    [others] = _notify(app, other, elder['elder_id'], 1)
+
+    body = _mark_read(client, caretaker, ids=ids[:2] + [others])
+    assert (body['updated'], body['unread_count']) == (2, 3)
+    # Already read: nothing changes, the counter doesn't drift
+    body = _mark_read(client, caretaker, ids=ids[:2])
+    assert (body['updated'], body['unread_count']) == (0, 3)
+    assert _mark_read(client, caretaker, ids=[])['updated'] == 0
+
+    assert _unread(client, caretaker) == 3 == _counted(app, caretaker)
+    assert _unread(client, other) == 1
+    listed = client.get('/notifications', headers=caretaker['headers']).get_json()['notifications']
+    assert sorted(n['id'] for n in listed if n['is_read']) == sorted(ids[:2])
+
+
+def test_mark_before_a_timestamp(app, client, make_user):
+    from models import db, Notification
+
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+    ids = _notify(app, caretaker, elder['elder_id'], 4)
+    now = datetime.utcnow().replace(microsecond=0)
+    with app.app_context():
+        for age, notification_id in zip((40, 30, 20, 10), ids):
+            db.session.get(Notification, notification_id).created_at = now - timedelta(minutes=age)
+        db.session.commit()
+
+    body = _mark_read(client, caretaker, before=(now - timedelta(minutes=20)).isoformat())
+
+    assert (body['updated'], body['unread_count']) == (3, 1)
+    assert _unread(client, caretaker) == 1 == _counted(app, caretaker)
+
+
+def test_mark_all_and_single(app, client, make_user):
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+    first, *_ = _notify(app, caretaker, elder['elder_id'], 3)
+
+    response = client.post(f'/notifications/{first}/read', headers=caretaker['headers'])
+    assert response.status_code == 200
+    assert _unread(client, caretaker) == 2
+
+    body = _mark_read(client, caretaker, all=True)
+    assert (body['updated'], body['unread_count']) == (2, 0)
+    assert _unread(client, caretaker) == 0 == _counted(app, caretaker)
+
+    _notify(app, caretaker, elder['elder_id'], 1)
+    assert _unread(client, caretaker) == 1
+
+
+def test_mark_read_rejects_bad_bodies(client, make_user):
+    caretaker = make_user('caretaker')
+    for body in ({}, {'ids': 'all'}, {'ids': ['x']}, {'before': 'yesterday'}):
+        response = client.post('/notifications/read', json=body, headers=caretaker['headers'])
+        assert response.status_code == 400, body
+
+
+class Pushes:
+    """Pipeline emit() that records (event, payload, room)"""
+
+    def __init__(self):
+        self.events = []
+        self.lock = threading.Lock()
+
+    def __call__(self, event_name, payload, room):
+        with self.lock:
+            self.events.append((event_name, payload, room))
+
+    def wait_for(self, count, timeout=5):
+        deadline = time.monotonic() + timeout
+        while len(self.events) < count and time.monotonic() < deadline:
+            time.sleep(0.02)
+        return self.events
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """A fresh shared pipeline (2 s window) whose pushes are recorded"""
+    pushes = Pushes()
+    fresh = notifications.NotificationPipeline(window_seconds=2, critical_types=['emergency'], emit=pushes)
+    monkeypatch.setattr(notifications, 'pipeline', fresh)
+    fresh.pushes = pushes
+    return fresh
+
+
+def _rows(app, account):
+    from models import Notification
+
+    with app.app_context():
+        return [(n.id, n.event_count, n.message) for n in
+                Notification.query.filter_by(recipient_user_id=account['id']).order_by(Notification.id)]
+
+
+def _events(app, account, elder_id, messages, notification_type='health'):
+    """One notify() and commit per message, like separate requests"""
+    from models import db
+
+    with app.app_context():
+        for message in messages:
+            notifications.notify(account['id'], elder_id, notification_type, 'Abnormal Vital Reading', message)
+            db.session.commit()
+
+
+def test_events_within_the_window_share_one_row(app, make_user, pipeline):
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+
+    _events(app, caretaker, elder['elder_id'], [f'Reading {index}' for index in range(3)])
+
+    [(notification_id, count, message)] = _rows(app, caretaker)
+    assert count == 3
+    assert message.split('\n') == ['Reading 2', 'Reading 1', 'Reading 0']
+    assert pipeline.stats()['created'] == 1 and pipeline.stats()['coalesced'] == 2
+
+
+def test_digest_message_is_capped(app, make_user, pipeline):
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+    total = notifications.DIGEST_MAX_LINES + 4
+
+    _events(app, caretaker, elder['elder_id'], [f'Reading {index}' for index in range(total)])
+
+    [(_, count, message)] = _rows(app, caretaker)
+    lines = message.split('\n')
+    assert count == total
+    assert lines[:-1] == [f'Reading {index}' for index in range(total - 1, 3, -1)]
+    assert len(lines[:-1]) == notifications.DIGEST_MAX_LINES
+    assert lines[-1] == '…and 4 more'
+
+
+def test_events_after_the_window_or_read_digest_start_a_new_row(app, make_user, pipeline):
+    from models import db, Notification
+
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+    _events(app, caretaker, elder['elder_id'], ['Early'])
+    with app.app_context():
+        first = Notification.query.filter_by(recipient_user_id=caretaker['id']).one()
+        first.created_at -= timedelta(seconds=pipeline.window_seconds + 1)
+        db.session.commit()
+
+    _events(app, caretaker, elder['elder_id'], ['Later'])
+    with app.app_context():
+        notifications.mark_read(caretaker['id'])
+        db.session.commit()
+    _events(app, caretaker, elder['elder_id'], ['After reading'])
+
+    assert [(count, message) for _, count, message in _rows(app, caretaker)] == [
+        (1, 'Early'), (1, 'Later'), (1, 'After reading'),
+    ]
+
+
+def test_critical_types_are_never_coalesced(app, make_user, pipeline):
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+
+    _events(app, caretaker, elder['elder_id'], ['Fall detected', 'Fall detected'], notification_type='emergency')
+
+    assert [count for _, count, _ in _rows(app, caretaker)] == [1, 1]
+    assert [name for name, _, _ in pipeline.pushes.wait_for(2)] == ['notification_created'] * 2
+
+
+def test_digest_updates_push_once_at_the_end_of_the_window(app, make_user, pipeline):
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+
+    _events(app, caretaker, elder['elder_id'], [f'Reading {index}' for index in range(4)])
+    [(notification_id, _, _)] = _rows(app, caretaker)
+
+    # Only the first event is pushed right away
+    assert [name for name, _, _ in pipeline.pushes.events] == ['notification_created']
+    assert pipeline.stats()['pending_digests'] == 1
+
+    events = pipeline.pushes.wait_for(2)
+    time.sleep(0.2)  # nothing else follows
+    assert [(name, payload['id'], payload['count']) for name, payload, _ in events] == [
+        ('notification_created', notification_id, 1),
+        ('notification_updated', notification_id, 4),
+    ]
+    assert {room for _, _, room in events} == {f"user_{caretaker['id']}"}
+    assert pipeline.stats()['pending_digests'] == 0
@@ -0,0 +1,254 @@
+import threading
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+import pytest
+
+from outbox import Outbox
+
+
+class Recorder:
+    """Outbox handler that records every batch it is given"""
+
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.fail_on = fail_on
+        self._lock = threading.Lock()
+
+    def __call__(self, tasks):
+        with self._lock:
+            self.batches.append(list(tasks))
+        if self.fail_on is not None and any(self.fail_on in task for task in tasks):
+            raise RuntimeError("handler failed")
+
+    @property
+    def tasks(self):
+        return [task for batch in self.batches for task in batch]
+
+
+@pytest.fixture
+def outbox(app):
+    return Outbox(workers=3, batch_size=50, app=app)
+
+
+def test_submitted_tasks_are_drained(outbox):
+    handler = Recorder()
+    outbox.register('emit', handler)
+    outbox.start()
+
+    for index in range(200):
+        outbox.submit('emit', index % 7, index)
+    outbox.join()
+
+    assert sorted(task[0] for task in handler.tasks) == list(range(200))
+    stats = outbox.stats()
+    assert stats['processed'] == 200
+    assert stats['depth'] == 0
+    assert stats['batches'] == len(handler.batches)
+
+
+def test_one_keys_tasks_keep_their_order(outbox):
+    handler = Recorder()
+    outbox.register('emit', handler)
+    outbox.start()
+
+    for index in range(300):
+        outbox.submit('emit', index % 3, index % 3, index)
+    outbox.join()
+
+    for key in range(3):
+        assert [index for task_key, index in handler.tasks if task_key == key] == list(range(key, 300, 3))
+
+
+def test_kinds_interleave_in_queue_order(outbox):
+    log = []
+    outbox.register('a', lambda tasks: log.extend(('a',) + task for task in tasks))
+    outbox.register('b', lambda tasks: log.extend(('b',) + task for task in tasks))
+    outbox.workers = 1
+    outbox.start()
+
+    for index, kind in enumerate('aabab'):
+        outbox.submit(kind, 'elder', index)
+    outbox.join()
+
+    assert log == [('a', 0), ('a', 1), ('b', 2), ('a', 3), ('b', 4)]
+
+
+def test_failed_batches_are_counted_and_do_not_stop_the_worker(outbox):
+    handler = Recorder(fail_on='bad')
+    outbox.register('notify', handler)
+    outbox.workers = 1
+    outbox.start()
+
+    outbox.submit('notify', 1, 'bad')
+    outbox.join()
+    outbox.submit('notify', 1, 'good')
+    outbox.join()
+
+    assert outbox.stats()['failed'] == 1
+    assert outbox.stats()['processed'] == 1
+    assert handler.tasks[-1] == ('good',)
+
+
+def test_deferred_tasks_wait_for_commit_and_drop_on_rollback(outbox):
+    handler = Recorder()
+    outbox.register('emit', handler)
+    outbox.start()
+    session = Session(create_engine('sqlite://'))
+    outbox.install(session)
+
+    session.execute(text('SELECT 1'))
+    outbox.defer(session, 'emit', 1, 'rolled back')
+    session.rollback()
+    session.execute(text('SELECT 1'))
+    outbox.defer(session, 'emit', 1, 'committed')
+    outbox.join()
+    assert handler.tasks == []
+
+    session.commit()
+    outbox.join()
+    assert handler.tasks == [('committed',)]
+
+
+def test_notify_many_skips_failing_tasks(app, make_user):
+    import notifications
+    from models import Notification
+
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+    task = (caretaker['id'], elder['elder_id'], 'emergency', 'Fall detected', 'Check on them')
+    unbindable = (caretaker['id'], elder['elder_id'], 'emergency', 'Bad', object())
+
+    with app.app_context():
+        ids = notifications.notify_many([task, unbindable, task])
+
+        assert ids[0] is not None and ids[2] is not None
+        assert ids[1] is None
+        assert Notification.query.filter(Notification.id.in_([ids[0], ids[2]])).count() == 2
+
+
+def test_medication_log_reaches_the_care_team(client, make_user, drain, sent):
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+    medication = {'name': 'Aspirin', 'dosage': '75mg', 'frequency': 'Daily', 'time': '9:00 AM'}
+    medication_id = client.post('/medications', json=medication, headers=elder['headers']).get_json()['medication_id']
+
+    response = client.post(f'/medications/{medication_id}/log', json={'status': 'taken'}, headers=elder['headers'])
+    assert response.status_code == 201
+    drain()
+
+    rooms = sorted([f"user_{elder['id']}", f"user_{caretaker['id']}"])
+    assert ('medication_logged', rooms) in [(name, to) for name, _, to in sent]
+    titles = [n['title'] for n in client.get('/notifications', headers=caretaker['headers']).get_json()['notifications']]
+    assert 'Medication Taken' in titles
+
+
+def test_geofence_exit_alert_carries_its_notification(client, make_user, drain, sent):
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+    client.post('/geofences', json={'name': 'Home', 'latitude': 12.97, 'longitude': 77.59, 'radius_m': 100},
+                headers=elder['headers'])
+
+    for latitude in (12.97, 12.98):  # inside, then ~1.1 km north
+        response = client.post('/location', json={'latitude': latitude, 'longitude': 77.59, 'accuracy': 5},
+                               headers=elder['headers'])
+        assert response.status_code == 200
+    drain()
+
+    alerts = [payload for name, payload, _ in sent if name == 'geofence_alert']
+    assert [alert['transition'] for alert in alerts] == ['exit']
+    notifications = client.get('/notifications', headers=caretaker['headers']).get_json()['notifications']
+    assert [(n['id'], n['title']) for n in notifications] == [(alerts[0]['notification_id'], 'Left Safe Zone')]
+    assert [to for name, _, to in sent if name == 'location_updated'] == [[f"user_{caretaker['id']}"]] * 2
+
+
+@pytest.fixture
+def durable(app):
+    """(outbox factory, session) for outboxes backed by the real outbox_tasks table"""
+    from models import OutboxTask, db
+
+    with app.app_context():
+        session = Session(db.engine)
+
+    def make(**options):
+        options = {'workers': 1, 'app': app, 'table': OutboxTask.__table__, 'retry_seconds': 0,
+                   'sweep_seconds': 0, **options}
+        return Outbox(**options)
+
+    yield make, session
+    session.close()
+
+
+def outbox_rows(session, kind):
+    """(attempts, last_error) of kind's rows; ends the read so the workers can write"""
+    from models import OutboxTask
+    try:
+        query = session.query(OutboxTask.attempts, OutboxTask.last_error).filter_by(kind=kind)
+        return [tuple(row) for row in query.order_by(OutboxTask.id)]
+    finally:
+        session.rollback()
+
+
+def test_durable_task_survives_a_failing_handler_and_is_retried(durable):
+    make, session = durable
+    handler = Recorder(fail_on='flaky')
+    outbox = make()
+    outbox.register('test_retry', handler)
+    outbox.start()
+    outbox.install(session)
+
+    session.execute(text('SELECT 1'))
+    outbox.defer(session, 'test_retry', 1, 'flaky')
+    session.commit()
+    outbox.join()
+
+    assert outbox_rows(session, 'test_retry') == [(1, 'handler failed')]
+
+    handler.fail_on = None
+    assert outbox.sweep() == 1
+    outbox.join()
+
+    assert handler.tasks == [('flaky',), ('flaky',)]
+    assert outbox_rows(session, 'test_retry') == []
+    stats = outbox.stats()
+    assert (stats['failed'], stats['processed'], stats['recovered']) == (1, 1, 1)
+
+
+def test_committed_tasks_are_recovered_after_a_restart(durable):
+    make, session = durable
+    crashed = make(lease_seconds=0)  # committed its task, died before a worker ran it
+
+    session.execute(text('SELECT 1'))
+    crashed.defer(session, 'test_restart', 7, 'fall', {'at': 'kitchen'})
+    session.commit()
+    assert len(outbox_rows(session, 'test_restart')) == 1
+
+    handler = Recorder()
+    restarted = make()
+    restarted.register('test_restart', handler)
+    restarted.start()
+    restarted.install(session)
+    assert restarted.sweep() == 1
+    restarted.join()
+
+    assert handler.tasks == [('fall', {'at': 'kitchen'})]
+    assert outbox_rows(session, 'test_restart') == []
+
+
+def test_tasks_stop_retrying_after_max_attempts(durable):
+    make, session = durable
+    outbox = make(max_attempts=2)
+    outbox.register('test_dead', Recorder(fail_on='bad'))
+    outbox.start()
+    outbox.install(session)
+
+    session.execute(text('SELECT 1'))
+    outbox.defer(session, 'test_dead', 1, 'bad')
+    session.commit()
+    outbox.join()
+    assert outbox.sweep() == 1
+    outbox.join()
+
+    assert outbox.sweep() == 0
+    assert outbox_rows(session, 'test_dead') == [(2, 'handler failed')]
+    assert outbox.stats()['dead'] == 1
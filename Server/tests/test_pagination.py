@@ -0,0 +1,92 @@
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from pagination import MAX_LIMIT, decode_cursor, encode_cursor, parse_page_args
+import serializers
+
+
+def test_cursor_round_trip():
+    moment = datetime(2025, 11, 5, 8, 30, 15, 250000)
+    assert decode_cursor(encode_cursor(moment, 42)) == (moment.isoformat(), 42)
+    assert decode_cursor(encode_cursor(None, 7)) == (None, 7)
+    assert '=' not in encode_cursor('Aspirin', 3)
+
+
+@pytest.mark.parametrize('token', ['not-a-cursor', encode_cursor('x', 1)[:-3], ''])
+def test_invalid_cursor(token):
+    with pytest.raises(ValueError):
+        decode_cursor(token)
+
+
+def test_page_args():
+    fields = serializers.HEALTH_RECORD.fields
+    page = parse_page_args(MultiDict({'limit': '10000', 'fields': 'id, value'}), fields)
+    assert page.limit == MAX_LIMIT
+    assert page.fields == ['id', 'value']
+    assert page.cursor is None
+
+    page = parse_page_args(MultiDict({'cursor': encode_cursor('2025-01-01T00:00:00', 5)}), fields)
+    assert page.limit == MAX_LIMIT  # a cursor always pages
+    assert page.cursor == ('2025-01-01T00:00:00', 5)
+
+    for args in ({'limit': '0'}, {'fields': 'id,password_hash'}):
+        with pytest.raises(ValueError):
+            parse_page_args(MultiDict(args), fields)
+
+
+def _walk(client, headers, limit, **params):
+    """Every page of GET /health-records; returns (records, number of pages)"""
+    records, cursor, pages = [], None, 0
+    while True:
+        query = dict(params, limit=limit, **({'cursor': cursor} if cursor else {}))
+        response = client.get('/health-records', query_string=query, headers=headers)
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        records.extend(body['records'])
+        pages += 1
+        cursor = body['next_cursor']
+        if cursor is None:
+            return records, pages
+
+
+def test_keyset_pages_cover_every_record_once(client, make_user):
+    elder = make_user('elder')
+    now = datetime.utcnow().replace(microsecond=0)
+    # Several readings share a timestamp, so the id tie-breaker decides their order
+    stamps = [now - timedelta(minutes=minutes) for minutes in (1, 1, 1, 2, 3, 3, 4, 5, 5, 5, 6)]
+    response = client.post('/health-records/bulk', json={'records': [
+        {'type': 'heart_rate', 'value': str(60 + index), 'recorded_at': stamp.isoformat()}
+        for index, stamp in enumerate(stamps)
+    ]}, headers=elder['headers'])
+    assert response.status_code == 201
+
+    records, pages = _walk(client, elder['headers'], limit=3)
+
+    assert pages == 4
+    assert len(records) == len(stamps)
+    assert len({record['id'] for record in records}) == len(stamps)
+    keys = [(record['recorded_at'], record['id']) for record in records]
+    assert keys == sorted(keys, reverse=True)
+
+    unpaged = client.get('/health-records', headers=elder['headers']).get_json()['records']
+    assert [record['id'] for record in unpaged] == [record['id'] for record in records]
+
+
+def test_pages_project_requested_fields(client, make_user):
+    elder = make_user('elder')
+    for value in ('120/80', '118/79'):
+        client.post('/health-records', json={'type': 'blood_pressure', 'value': value, 'unit': 'mmHg'},
+                    headers=elder['headers'])
+
+    records, _ = _walk(client, elder['headers'], limit=1, fields='id,value')
+
+    assert [set(record) for record in records] == [{'id', 'value'}] * 2
+    assert [record['value'] for record in records] == ['118/79', '120/80']
+
+
+def test_bad_cursor_is_rejected(client, make_user):
+    elder = make_user('elder')
+    response = client.get('/health-records', query_string={'cursor': 'garbage'}, headers=elder['headers'])
+    assert response.status_code == 400
@@ -0,0 +1,120 @@
+from datetime import datetime, timedelta
+
+import sync_log
+
+
+MEDICATION = {'name': 'Metformin', 'dosage': '500mg', 'frequency': 'Daily', 'time': '8:00 AM'}
+
+
+def _sync(client, account, since=None):
+    query = {'since': since} if since is not None else {}
+    response = client.get('/sync', query_string=query, headers=account['headers'])
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()
+
+
+def _add_reading(client, account, value):
+    response = client.post('/health-records', json={'type': 'heart_rate', 'value': str(value), 'unit': 'bpm'},
+                           headers=account['headers'])
+    return response.get_json()['record_id']
+
+
+def test_first_sync_returns_a_cursor_to_start_from(client, make_user):
+    elder = make_user('elder')
+    body = _sync(client, elder)
+    assert body['reset'] is True
+    assert body['changes'] == {}
+    assert int(body['cursor']) >= 0
+
+
+def test_changes_collapse_to_the_latest_state(client, make_user):
+    elder = make_user('elder')
+    cursor = _sync(client, elder)['cursor']
+
+    medication_id = client.post('/medications', json=MEDICATION, headers=elder['headers']).get_json()['medication_id']
+    client.put(f'/medications/{medication_id}', json={'dosage': '850mg'}, headers=elder['headers'])
+    kept = _add_reading(client, elder, 70)
+    removed = _add_reading(client, elder, 71)
+    client.delete(f'/health-records/{removed}', headers=elder['headers'])
+
+    body = _sync(client, elder, cursor)
+
+    assert body['reset'] is False
+    assert body['has_more'] is False
+    medications = body['changes']['medications']
+    assert [(m['id'], m['dosage']) for m in medications['upserted']] == [(medication_id, '850mg')]
+    records = body['changes']['health_records']
+    assert [record['id'] for record in records['upserted']] == [kept]
+    assert records['deleted'] == [removed]
+    assert int(body['cursor']) > int(cursor)
+
+    # Nothing new: same cursor back, no changes
+    again = _sync(client, elder, body['cursor'])
+    assert again['cursor'] == body['cursor']
+    assert again['changes'] == {}
+
+
+def test_pages_follow_change_log_order(server, client, make_user, monkeypatch):
+    elder = make_user('elder')
+    cursor = _sync(client, elder)['cursor']
+    record_ids = [_add_reading(client, elder, 60 + index) for index in range(5)]
+    monkeypatch.setattr(server, 'SYNC_MAX_CHANGES', 2)
+
+    seen, cursors, pages = [], [int(cursor)], []
+    while True:
+        body = _sync(client, elder, cursor)
+        pages.append(body['has_more'])
+        seen.extend(record['id'] for record in body['changes'].get('health_records', {}).get('upserted', []))
+        cursor = body['cursor']
+        cursors.append(int(cursor))
+        if not body['has_more']:
+            break
+
+    assert seen == record_ids
+    assert pages == [True, True, False]
+    assert cursors == sorted(set(cursors))
+
+
+def test_sync_is_scoped_to_the_users_elders(client, make_user):
+    caretaker = make_user('caretaker')
+    elder, stranger = make_user('elder', caretaker=caretaker), make_user('elder')
+    cursor = _sync(client, caretaker)['cursor']
+
+    mine = _add_reading(client, elder, 72)
+    _add_reading(client, stranger, 73)
+
+    body = _sync(client, caretaker, cursor)
+    assert [record['id'] for record in body['changes']['health_records']['upserted']] == [mine]
+    assert body['changes']['health_records']['upserted'][0]['elder_id'] == elder['elder_id']
+
+
+def test_invalid_cursor(client, make_user):
+    elder = make_user('elder')
+    response = client.get('/sync', query_string={'since': 'yesterday'}, headers=elder['headers'])
+    assert response.status_code == 400
+
+
+def test_cursor_older_than_the_pruned_log_gets_a_reset(server, app, client, make_user):
+    from models import db, SyncChange
+
+    elder = make_user('elder')
+    stale = _sync(client, elder)['cursor']
+    _add_reading(client, elder, 74)
+    recent = _sync(client, elder)['cursor']
+    with app.app_context():
+        # Everything logged so far falls outside the retention window
+        db.session.query(SyncChange).filter(SyncChange.id <= int(recent)) \
+            .update({'changed_at': datetime.utcnow() - timedelta(days=server.SYNC_RETENTION_DAYS + 1)})
+        db.session.commit()
+    kept = _add_reading(client, elder, 75)
+
+    pruner = sync_log.Pruner(app, server.SYNC_RETENTION_DAYS, interval_seconds=0)
+    assert pruner.start().stats()['removed'] >= 2
+
+    body = _sync(client, elder, stale)
+    assert body['reset'] is True
+    assert body['changes'] == {}
+    # A cursor at the edge of what's left still gets deltas
+    body = _sync(client, elder, recent)
+    assert body['reset'] is False
+    assert [record['id'] for record in body['changes']['health_records']['upserted']] == [kept]
@@ -0,0 +1,85 @@
+from tts_cache import TTSCache
+
+
+class FakeSynthesizer:
+    """Stands in for Google Text-to-Speech: deterministic audio, counts calls"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text, voice, encoding):
+        self.calls.append((text, voice, encoding))
+        return f"{voice}|{encoding}|{text}".encode()
+
+
+def test_repeated_phrase_is_synthesized_once(tmp_path):
+    cache = TTSCache(cache_dir=str(tmp_path))
+    synthesize = FakeSynthesizer()
+
+    first = cache.get_or_synthesize("Time to take your Metformin", 'en-US/FEMALE', 'LINEAR16', synthesize)
+    second = cache.get_or_synthesize("Time to take your Metformin", 'en-US/FEMALE', 'LINEAR16', synthesize)
+
+    assert first == second
+    assert len(synthesize.calls) == 1
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_key_covers_voice_and_encoding(tmp_path):
+    cache = TTSCache(cache_dir=str(tmp_path))
+    synthesize = FakeSynthesizer()
+
+    cache.get_or_synthesize("Hello", 'en-US/FEMALE', 'LINEAR16', synthesize)
+    cache.get_or_synthesize("Hello", 'en-US/MALE', 'LINEAR16', synthesize)
+    cache.get_or_synthesize("Hello", 'en-US/FEMALE', 'MP3', synthesize)
+
+    assert len(synthesize.calls) == 3
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    synthesize = FakeSynthesizer()
+    TTSCache(cache_dir=str(tmp_path)).get_or_synthesize("Drink some water", 'v', 'e', synthesize)
+
+    restarted = TTSCache(cache_dir=str(tmp_path))
+    audio = restarted.get_or_synthesize("Drink some water", 'v', 'e', synthesize)
+
+    assert audio == b"v|e|Drink some water"
+    assert len(synthesize.calls) == 1
+    assert restarted.stats()['disk_hits'] == 1
+    assert restarted.stats()['disk_bytes'] == len(audio)
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path):
+    cache = TTSCache(max_memory_bytes=25)
+    cache.put('a', b'x' * 10)
+    cache.put('b', b'y' * 10)
+    cache.get('a')  # 'b' is now the least recently used
+    cache.put('c', b'z' * 10)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == b'x' * 10
+    assert cache.get('c') == b'z' * 10
+    assert cache.stats()['memory_bytes'] == 20
+
+
+def test_disk_tier_is_pruned_to_its_limit(tmp_path):
+    cache = TTSCache(cache_dir=str(tmp_path), max_memory_bytes=0, max_disk_bytes=100)
+    for index in range(5):
+        cache.put(f'clip{index}', bytes(40))
+
+    assert cache.stats()['disk_bytes'] <= 90
+    assert len(list(tmp_path.glob('*.audio'))) == 2
+
+
+def test_speak_serves_repeats_from_cache(server, client, monkeypatch, tmp_path):
+    synthesize = FakeSynthesizer()
+    monkeypatch.setenv('GOOGLE_APPLICATION_CREDENTIALS', str(tmp_path / 'credentials.json'))
+    monkeypatch.setattr(server, 'synthesize_speech_audio', synthesize)
+    monkeypatch.setattr(server, 'tts_cache', TTSCache(cache_dir=str(tmp_path / 'tts')))
+
+    responses = [client.post('/speak', json={'text': "Your appointment is at 3 PM"}) for _ in range(3)]
+
+    assert [response.status_code for response in responses] == [200, 200, 200]
+    assert len({response.data for response in responses}) == 1
+    assert responses[0].mimetype == 'audio/wav'
+    assert len(synthesize.calls) == 1
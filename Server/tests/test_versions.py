@@ -0,0 +1,108 @@
+from datetime import datetime
+
+MEDICATION = {'name': 'Metformin', 'dosage': '500mg', 'frequency': 'Daily', 'time': '8:00 AM'}
+
+
+def test_unchanged_list_is_answered_with_304(client, make_user):
+    elder = make_user('elder')
+    client.post('/medications', json=MEDICATION, headers=elder['headers'])
+
+    first = client.get('/medications', headers=elder['headers'])
+    etag = first.headers['ETag']
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    repeat = client.get('/medications', headers=dict(elder['headers'], **{'If-None-Match': etag}))
+    assert repeat.status_code == 304
+    assert repeat.data == b''
+    assert repeat.headers['ETag'] == etag
+
+
+def test_writes_change_the_etag(client, make_user):
+    elder = make_user('elder')
+    response = client.post('/medications', json=MEDICATION, headers=elder['headers'])
+    medication_id = response.get_json()['medication_id']
+    etag = client.get('/medications', headers=elder['headers']).headers['ETag']
+
+    client.post(f'/medications/{medication_id}/log', json={'status': 'taken'}, headers=elder['headers'])
+
+    response = client.get('/medications', headers=dict(elder['headers'], **{'If-None-Match': etag}))
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.get_json()['medications'][0]['status'] == 'taken'
+
+
+def test_etag_is_per_user_and_per_query(client, make_user):
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+
+    elder_etag = client.get('/health-records', headers=elder['headers']).headers['ETag']
+    caretaker_etag = client.get('/health-records', query_string={'elder_id': elder['elder_id']},
+                                headers=caretaker['headers']).headers['ETag']
+    filtered_etag = client.get('/health-records', query_string={'type': 'heart_rate'},
+                               headers=elder['headers']).headers['ETag']
+
+    assert len({elder_etag, caretaker_etag, filtered_etag}) == 3
+    response = client.get('/health-records', query_string={'elder_id': elder['elder_id']},
+                          headers=dict(caretaker['headers'], **{'If-None-Match': elder_etag}))
+    assert response.status_code == 200
+
+
+def test_other_elders_writes_keep_the_etag(client, make_user):
+    elder, other = make_user('elder'), make_user('elder')
+    etag = client.get('/medications', headers=elder['headers']).headers['ETag']
+
+    client.post('/medications', json=MEDICATION, headers=other['headers'])
+
+    response = client.get('/medications', headers=dict(elder['headers'], **{'If-None-Match': etag}))
+    assert response.status_code == 304
+
+
+def test_cached_location_is_reloaded_when_another_process_wrote(server, app, client, make_user):
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+    client.post('/location', json={'latitude': 12.97, 'longitude': 77.59, 'accuracy': 5}, headers=elder['headers'])
+    first = client.get(f"/location/{elder['elder_id']}", headers=caretaker['headers'])
+    assert first.get_json()['latitude'] == 12.97
+
+    # Another worker process stores a fix: versions move, this process's cache doesn't
+    from models import db, LocationLog
+    with app.app_context():
+        db.session.add(LocationLog(elder_id=elder['elder_id'], latitude=13.01, longitude=77.6, accuracy=5,
+                                   recorded_at=datetime.utcnow()))
+        db.session.commit()
+
+    second = client.get(f"/location/{elder['elder_id']}",
+                        headers=dict(caretaker['headers'], **{'If-None-Match': first.headers['ETag']}))
+    assert second.status_code == 200
+    assert second.get_json()['latitude'] == 13.01
+
+
+
+def test_reads_after_a_write_are_served_from_the_cache(server, client, make_user, queries):
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+    misses = server.location_cache.stats()['misses']
+
+    client.post('/location', json={'latitude': 12.97, 'longitude': 77.59, 'accuracy': 5}, headers=elder['headers'])
+    queries.clear()
+    first = client.get(f"/location/{elder['elder_id']}", headers=caretaker['headers'])
+
+    client.post('/location/batch', json={'fixes': [{'latitude': 12.99, 'longitude': 77.59}]}, headers=elder['headers'])
+    queries.clear()
+    second = client.get(f"/location/{elder['elder_id']}", headers=caretaker['headers'])
+
+    assert (first.get_json()['latitude'], second.get_json()['latitude']) == (12.97, 12.99)
+    assert [statement for statement in queries if 'location_logs' in statement] == []
+    assert server.location_cache.stats()['misses'] == misses
+
+
+def test_latest_location_is_only_visible_to_the_care_team(client, make_user):
+    caretaker, stranger = make_user('caretaker'), make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+    client.post('/location', json={'latitude': 12.97, 'longitude': 77.59}, headers=elder['headers'])
+
+    response = client.get(f"/location/{elder['elder_id']}", headers=stranger['headers'])
+    assert response.status_code == 403
+    assert 'ETag' not in response.headers
+    assert client.get(f"/location/{elder['elder_id']}", headers=caretaker['headers']).status_code == 200
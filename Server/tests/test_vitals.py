@@ -0,0 +1,192 @@
+from datetime import datetime, timedelta
+import threading
+
+import pytest
+
+import vitals
+import vitals_analytics
+
+YESTERDAY = (datetime.utcnow() - timedelta(days=1)).replace(hour=8, minute=0, second=0, microsecond=0)
+
+
+@pytest.mark.parametrize('raw, parsed', [
+    ('120/80', (120.0, 80.0)),
+    ('72 bpm', (72.0, None)),
+    ('98.6', (98.6, None)),
+    ('7.5 / 3', (7.5, 3.0)),
+    ('n/a', (None, None)),
+    (None, (None, None)),
+])
+def test_parse_vital_value(raw, parsed):
+    assert vitals.parse_vital_value(raw) == parsed
+
+
+def test_bucket_start():
+    moment = datetime(2025, 11, 5, 8, 47, 12, 5)
+    assert vitals.bucket_start(moment, 'hour') == datetime(2025, 11, 5, 8)
+    assert vitals.bucket_start(moment, 'day') == datetime(2025, 11, 5)
+
+
+def _upload(client, account, readings, record_type='blood_pressure'):
+    response = client.post('/health-records/bulk', json={'records': [
+        {'type': record_type, 'value': value, 'recorded_at': (YESTERDAY + offset).isoformat()}
+        for value, offset in readings
+    ]}, headers=account['headers'])
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['record_ids']
+
+
+def _rollups(client, account, resolution, record_type='blood_pressure'):
+    response = client.get('/health-records', query_string={'resolution': resolution, 'type': record_type, 'days': 3},
+                          headers=account['headers'])
+    assert response.status_code == 200, response.get_json()
+    return {rollup['bucket_start']: rollup for rollup in response.get_json()['rollups']}
+
+
+def test_rollup_math(client, make_user):
+    elder = make_user('elder')
+    _upload(client, elder, [
+        ('120/80', timedelta(minutes=10)),
+        ('130/90', timedelta(minutes=40)),
+        ('125', timedelta(minutes=50)),  # no diastolic component
+        ('110/70', timedelta(hours=1, minutes=5)),
+    ])
+
+    hours = _rollups(client, elder, 'hour')
+    eight = hours[YESTERDAY.isoformat()]
+    assert (eight['count'], eight['mean'], eight['min'], eight['max']) == (3, 125.0, 120.0, 130.0)
+    # The diastolic mean divides by the readings that had one
+    assert (eight['mean_secondary'], eight['min_secondary'], eight['max_secondary']) == (85.0, 80.0, 90.0)
+    nine = hours[(YESTERDAY + timedelta(hours=1)).isoformat()]
+    assert (nine['count'], nine['mean'], nine['mean_secondary']) == (1, 110.0, 70.0)
+
+    day = _rollups(client, elder, 'day')[YESTERDAY.replace(hour=0).isoformat()]
+    assert (day['count'], day['mean'], day['min'], day['max']) == (4, 121.25, 110.0, 130.0)
+    assert day['mean_secondary'] == 80.0
+
+
+def test_later_uploads_merge_into_existing_buckets(client, make_user):
+    elder = make_user('elder')
+    _upload(client, elder, [('120/80', timedelta(minutes=10))])
+    _upload(client, elder, [('150/100', timedelta(minutes=20)), ('100/60', timedelta(minutes=30))])
+
+    eight = _rollups(client, elder, 'hour')[YESTERDAY.isoformat()]
+    assert (eight['count'], eight['min'], eight['max']) == (3, 100.0, 150.0)
+    assert (eight['min_secondary'], eight['max_secondary']) == (60.0, 100.0)
+    assert eight['mean'] == pytest.approx(370 / 3)
+
+
+def test_deleting_readings_recomputes_buckets(client, make_user):
+    elder = make_user('elder')
+    low, high, alone = _upload(client, elder, [
+        ('100/60', timedelta(minutes=10)),
+        ('140/95', timedelta(minutes=20)),
+        ('120/80', timedelta(hours=2)),
+    ])
+
+    client.delete(f'/health-records/{high}', headers=elder['headers'])
+    client.delete(f'/health-records/{alone}', headers=elder['headers'])
+
+    hours = _rollups(client, elder, 'hour')
+    assert list(hours) == [YESTERDAY.isoformat()]  # the emptied bucket is gone
+    eight = hours[YESTERDAY.isoformat()]
+    assert (eight['count'], eight['min'], eight['max'], eight['mean_secondary']) == (1, 100.0, 100.0, 60.0)
+    day = _rollups(client, elder, 'day')[YESTERDAY.replace(hour=0).isoformat()]
+    assert (day['count'], day['max']) == (1, 100.0)
+
+
+def test_incremental_rollups_match_a_rebuild(app, client, make_user):
+    elder = make_user('elder')
+    record_ids = _upload(client, elder, [(f'{110 + i}/{70 + i % 4}', timedelta(minutes=7 * i)) for i in range(30)])
+    client.delete(f'/health-records/{record_ids[3]}', headers=elder['headers'])
+    before = _rollups(client, elder, 'hour'), _rollups(client, elder, 'day')
+
+    with app.app_context():
+        vitals.rebuild_rollups()
+
+    assert (_rollups(client, elder, 'hour'), _rollups(client, elder, 'day')) == before
+
+
+def test_rollups_convert_mixed_units(app, client, make_user):
+    elder = make_user('elder')
+    response = client.post('/health-records/bulk', json={'records': [
+        {'type': 'temperature', 'value': value, 'unit': unit, 'recorded_at': (YESTERDAY + offset).isoformat()}
+        for value, unit, offset in [('98.6', '°F', timedelta(minutes=5)), ('37', '°C', timedelta(minutes=15)),
+                                    ('39', 'C', timedelta(minutes=25))]
+    ]}, headers=elder['headers'])
+    fever = response.get_json()['record_ids'][2]
+    client.post('/health-records', json={'type': 'temperature', 'value': '38', 'unit': 'celsius'},
+                headers=elder['headers'])
+
+    hours = _rollups(client, elder, 'hour', 'temperature')
+    eight = hours.pop(YESTERDAY.isoformat())
+    assert eight['unit'] == '°F'
+    assert (eight['count'], eight['min'], eight['max']) == (3, 98.6, pytest.approx(102.2))
+    assert eight['mean'] == pytest.approx((98.6 + 98.6 + 102.2) / 3)
+    [now] = hours.values()  # the single POST, recorded now
+    assert (now['min'], now['max']) == (pytest.approx(100.4), pytest.approx(100.4))
+
+    # Recomputing after a delete and a full rebuild convert the same way
+    client.delete(f'/health-records/{fever}', headers=elder['headers'])
+    eight = _rollups(client, elder, 'hour', 'temperature')[YESTERDAY.isoformat()]
+    assert (eight['count'], eight['min'], eight['max']) == (2, pytest.approx(98.6), pytest.approx(98.6))
+    before = _rollups(client, elder, 'day', 'temperature')
+    with app.app_context():
+        vitals.rebuild_rollups()
+    after = _rollups(client, elder, 'day', 'temperature')
+    assert after.keys() == before.keys()
+    for bucket, rollup in after.items():
+        assert rollup == {name: pytest.approx(value) if isinstance(value, float) else value
+                          for name, value in before[bucket].items()}
+
+
+def test_concurrent_writers_do_not_lose_updates(app, make_user):
+    elder = make_user('elder')
+    errors = []
+
+    def post_readings(offset):
+        client = app.test_client()
+        for index in range(8):
+            response = client.post('/health-records', json={'type': 'heart_rate', 'value': str(60 + offset + index)},
+                                   headers=elder['headers'])
+            if response.status_code != 201:
+                errors.append(response.get_json())
+
+    threads = [threading.Thread(target=post_readings, args=(offset * 8,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    response = app.test_client().get('/health-records', query_string={'resolution': 'day', 'type': 'heart_rate'},
+                                     headers=elder['headers'])
+    rollups = response.get_json()['rollups']  # one bucket, or two right at midnight
+    assert sum(rollup['count'] for rollup in rollups) == 32
+    assert min(rollup['min'] for rollup in rollups) == 60.0
+    assert max(rollup['max'] for rollup in rollups) == 91.0
+
+
+def test_bulk_upload_scores_against_the_latest_window_only(client, make_user, drain, sent, monkeypatch):
+    caretaker = make_user('caretaker')
+    elder = make_user('elder', caretaker=caretaker)
+    history = [(str(70 + i % 3), timedelta(days=-20, minutes=10 * i)) for i in range(200)]
+    _upload(client, elder, history, record_type='heart_rate')
+
+    evaluated = []
+    evaluate = vitals_analytics.evaluate
+    monkeypatch.setattr(vitals_analytics, 'evaluate', lambda rows, since=None: evaluated.append(len(rows)) or
+                        evaluate(rows, since))
+    readings = [('71', timedelta(minutes=i)) for i in range(4)] + [('108', timedelta(minutes=5))]
+    response = client.post('/health-records/bulk', json={'records': [
+        {'type': 'heart_rate', 'value': value, 'recorded_at': (YESTERDAY + offset).isoformat()}
+        for value, offset in readings
+    ]}, headers=elder['headers'])
+    drain()
+
+    assert response.get_json()['anomalies'] == 1
+    assert evaluated == [vitals_analytics.WINDOW + len(readings)]
+    alerts = [payload for name, payload, _ in sent if name == 'health_alert']
+    assert [(alert['value'], alert['reason']) for alert in alerts] == [(108.0, 'spike')]
+    notifications = client.get('/notifications', headers=caretaker['headers']).get_json()['notifications']
+    assert [n['id'] for n in notifications if n['title'] == 'Abnormal Vital Reading'] == [alerts[0]['notification_id']]
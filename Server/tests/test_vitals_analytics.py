@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+import vitals_analytics
+from vitals_analytics import BaselineTracker, RollingBaseline, rolling_zscores, scan, to_canonical
+
+START = (datetime.utcnow() - timedelta(days=2)).replace(microsecond=0)
+
+
+def _upload(client, account, readings, record_type):
+    response = client.post('/health-records/bulk', json={'records': [
+        {'type': record_type, 'value': value, 'unit': unit, 'recorded_at': (START + timedelta(hours=i)).isoformat()}
+        for i, (value, unit) in enumerate(readings)
+    ]}, headers=account['headers'])
+    assert response.status_code == 201, response.get_json()
+    return response.get_json()['record_ids']
+
+
+def _both_paths(app, elder_id):
+    """(bulk scan anomalies, incremental tracker anomalies) over the elder's stored readings"""
+    from models import HealthRecord
+
+    with app.app_context():
+        bulk = scan(elder_ids=[elder_id])
+        tracker = BaselineTracker()
+        records = HealthRecord.query.filter_by(elder_id=elder_id) \
+            .order_by(HealthRecord.recorded_at, HealthRecord.id).all()
+        incremental = [anomaly for record in records for anomaly in tracker.observe(record)]
+    return bulk, incremental
+
+
+def _key(anomaly):
+    return anomaly['record_id'], anomaly['component'], anomaly['reason']
+
+
+def test_rolling_zscores_match_the_running_baseline():
+    values = np.random.default_rng(7).normal(120, 8, 200)
+    z, mean = rolling_zscores(values)
+
+    baseline = RollingBaseline()
+    for index, value in enumerate(values):
+        expected_z, expected_mean = baseline.score(value)
+        if expected_z is None:
+            assert np.isnan(z[index]) and np.isnan(mean[index])
+        else:
+            assert (z[index], mean[index]) == (pytest.approx(expected_z), pytest.approx(expected_mean))
+        baseline.push(value)
+
+
+def test_bulk_scan_and_tracker_agree_on_a_spike(app, client, make_user):
+    elder = make_user('elder')
+    steady = [(str(70 + i % 5), 'bpm') for i in range(40)]
+    record_ids = _upload(client, elder, [('45', 'bpm')] + steady + [('100', 'bpm'), ('73', 'bpm')], 'heart_rate')
+    low, spike, normal = record_ids[0], record_ids[-2], record_ids[-1]
+
+    bulk, incremental = _both_paths(app, elder['elder_id'])
+
+    assert [_key(a) for a in bulk] == [(low, 'primary', 'below_range'), (spike, 'primary', 'spike')]
+    assert [_key(a) for a in incremental] == [_key(a) for a in bulk]
+    assert bulk[0]['zscore'] is None  # out of range before there is a baseline
+    assert [a['zscore'] for a in incremental] == pytest.approx([a['zscore'] for a in bulk], abs=0.01)
+    assert bulk[1]['zscore'] > vitals_analytics.Z_THRESHOLD
+    # The reading right after the spike is back within its (now wider) baseline
+    assert normal not in {a['record_id'] for a in bulk + incremental}
+
+
+def test_bulk_scan_and_tracker_agree_on_blood_pressure_components(app, client, make_user):
+    elder = make_user('elder')
+    readings = [(f'{118 + i % 4}/{78 + i % 3}', 'mmHg') for i in range(20)] + [('121/98', 'mmHg')]
+    diastolic_jump = _upload(client, elder, readings, 'blood_pressure')[-1]
+
+    bulk, incremental = _both_paths(app, elder['elder_id'])
+
+    assert [_key(a) for a in bulk] == [(diastolic_jump, 'secondary', 'spike')]
+    assert [_key(a) for a in incremental] == [_key(a) for a in bulk]
+
+
+def test_mixed_units_are_scored_in_the_canonical_unit(app, client, make_user):
+    elder = make_user('elder')
+    # The same ~98.6 °F, alternately entered in °C and °F: no anomaly unless units are mixed up
+    readings = [('37.0', '°C') if i % 2 else (f'{98.4 + (i % 3) * 0.1:.1f}', '°F') for i in range(12)]
+    fever = _upload(client, elder, readings + [('39.5', 'C')], 'temperature')[-1]
+
+    bulk, incremental = _both_paths(app, elder['elder_id'])
+
+    assert [_key(a) for a in bulk] == [(fever, 'primary', 'above_range')]
+    assert [_key(a) for a in incremental] == [_key(a) for a in bulk]
+    assert bulk[0]['value'] == pytest.approx(103.1)
+    assert bulk[0]['unit'] == '°F'
+
+
+@pytest.mark.parametrize('record_type, unit, value, expected', [
+    ('temperature', '°C', 37.0, 98.6),
+    ('temperature', 'deg C', 40.0, 104.0),
+    ('temperature', 'F', 98.6, 98.6),
+    ('blood_glucose', 'mmol/L', 5.5, 99.0),
+    ('blood_glucose', 'mg/dL', 99.0, 99.0),
+    ('heart_rate', 'bpm', 72.0, 72.0),
+    ('temperature', None, 98.6, 98.6),
+])
+def test_to_canonical(record_type, unit, value, expected):
+    assert to_canonical(record_type, unit, value) == pytest.approx(expected)
+    assert to_canonical(record_type, unit, None) is None
@@ -0,0 +1,149 @@
+"""
+Content-addressed cache for text-to-speech audio.
+
+Audio is keyed by a hash of (text, voice, encoding). Recent clips live in a
+size-bounded in-memory LRU; every clip is also written to a disk tier so it
+survives restarts. The synthesizer is passed in as a plain callable, so tests
+can use a local fake instead of Google Cloud.
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+
+
+class TTSCache:
+    """Two-tier (memory + disk) cache for synthesized speech"""
+
+    def __init__(self, cache_dir=None, max_memory_bytes=32 * 1024 * 1024,
+                 max_disk_bytes=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._disk_bytes = 0
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and entry.name.endswith('.audio'):
+                    self._disk_bytes += entry.stat().st_size
+
+    @staticmethod
+    def make_key(text, voice, encoding):
+        raw = json.dumps([text, voice, encoding], ensure_ascii=False)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return audio
+
+        audio = self._read_disk(key)
+        with self._lock:
+            if audio is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, audio)
+        return audio
+
+    def put(self, key, audio):
+        with self._lock:
+            self._remember(key, audio)
+        self._write_disk(key, audio)
+
+    def get_or_synthesize(self, text, voice, encoding, synthesize):
+        """Return cached audio, calling synthesize(text, voice, encoding) on a miss"""
+        key = self.make_key(text, voice, encoding)
+        audio = self.get(key)
+        if audio is None:
+            audio = synthesize(text, voice, encoding)
+            self.put(key, audio)
+        return audio
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def _remember(self, key, audio):
+        if len(audio) > self.max_memory_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.audio")
+
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as audio_file:
+                audio = audio_file.read()
+            os.utime(path, None)  # mtime doubles as last-used time for pruning
+            return audio
+        except OSError:
+            return None
+
+    def _write_disk(self, key, audio):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        if os.path.exists(path):
+            return
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as audio_file:
+                audio_file.write(audio)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"TTS cache write failed: {e}")
+            return
+        with self._lock:
+            self._disk_bytes += len(audio)
+            over_limit = self._disk_bytes > self.max_disk_bytes
+        if over_limit:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        # Drop the least recently used clips until back under 90% of the limit
+        entries = [e for e in os.scandir(self.cache_dir) if e.is_file() and e.name.endswith('.audio')]
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        total = sum(e.stat().st_size for e in entries)
+        target = self.max_disk_bytes * 0.9
+        for entry in entries:
+            if total <= target:
+                break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+                total -= size
+            except OSError:
+                continue
+        with self._lock:
+            self._disk_bytes = total
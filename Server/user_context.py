@@ -0,0 +1,221 @@
+"""
+Request-scoped resolution of the authenticated user and their elder profiles.
+
+Handlers used to start with User.query.get() and ElderProfile.query.filter_by()
+and then repeat those lookups in helpers. current_user() resolves the JWT
+identity once per request (memoized on flask.g) into a plain snapshot:
+the user's fields plus their elder profile id (elders) or the ids of the
+elders they look after (caretakers). elder_summary() does the same for an
+elder profile. Both are also kept in a short-TTL cross-request cache that
+the write paths invalidate (signup, link_caretaker).
+
+care_team_rooms() maps an elder to the Socket.IO rooms of the elder and
+their caretaker for realtime fan-out. Links change rarely, so that map is
+kept much longer; any ElderProfile update or delete drops the entry in this
+process, and the TTL bounds staleness in other worker processes.
+"""
+from flask import g
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event
+import threading
+import time
+
+from models import db, User, ElderProfile
+
+
+class TTLCache:
+    """Small thread-safe key -> value cache with per-entry expiry"""
+
+    def __init__(self, ttl_seconds=30, max_entries=10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if not self.ttl_seconds:
+            return None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if time.monotonic() > expires_at:
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        if not self.ttl_seconds:
+            return
+        with self._lock:
+            if len(self._data) >= self.max_entries:
+                self._data.clear()
+            self._data[key] = (value, time.monotonic() + self.ttl_seconds)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class CurrentUser:
+    """Detached snapshot of the authenticated user"""
+    __slots__ = ('id', 'email', 'full_name', 'phone', 'user_type', 'elder_profile_id', 'elder_ids')
+
+    def __init__(self, id, email, full_name, phone, user_type, elder_profile_id=None, elder_ids=()):
+        self.id = id
+        self.email = email
+        self.full_name = full_name
+        self.phone = phone
+        self.user_type = user_type
+        self.elder_profile_id = elder_profile_id
+        self.elder_ids = tuple(elder_ids)
+
+
+class ElderSummary:
+    """Detached snapshot of an elder profile and its owner's name"""
+    __slots__ = ('id', 'user_id', 'caretaker_id', 'full_name')
+
+    def __init__(self, id, user_id, caretaker_id, full_name):
+        self.id = id
+        self.user_id = user_id
+        self.caretaker_id = caretaker_id
+        self.full_name = full_name
+
+
+user_cache = TTLCache()
+elder_cache = TTLCache()
+rooms_cache = TTLCache(ttl_seconds=300)
+
+
+def configure(ttl_seconds, rooms_ttl_seconds=None):
+    """Set the cross-request cache TTLs (0 disables a cache; per-request memo stays on)"""
+    user_cache.ttl_seconds = ttl_seconds
+    elder_cache.ttl_seconds = ttl_seconds
+    if rooms_ttl_seconds is not None:
+        rooms_cache.ttl_seconds = rooms_ttl_seconds
+
+
+def load_user(user_id):
+    """Build a CurrentUser from the database (one or two queries)"""
+    user = User.query.get(user_id)
+    if not user:
+        return None
+
+    elder_profile_id = None
+    elder_ids = ()
+    if user.user_type == 'elder':
+        elder_profile_id = db.session.query(ElderProfile.id).filter_by(user_id=user.id).scalar()
+    else:
+        elder_ids = [row.id for row in db.session.query(ElderProfile.id)
+                     .filter_by(caretaker_id=user.id).order_by(ElderProfile.id)]
+
+    return CurrentUser(
+        id=user.id,
+        email=user.email,
+        full_name=user.full_name,
+        phone=user.phone,
+        user_type=user.user_type,
+        elder_profile_id=elder_profile_id,
+        elder_ids=elder_ids,
+    )
+
+
+def get_user(user_id):
+    """CurrentUser for any user id, memoized per request and cached briefly across requests"""
+    memo = g.setdefault('_user_context_users', {})
+    if user_id in memo:
+        return memo[user_id]
+
+    snapshot = user_cache.get(user_id)
+    if snapshot is None:
+        snapshot = load_user(user_id)
+        if snapshot is not None:
+            user_cache.set(user_id, snapshot)
+    memo[user_id] = snapshot
+    return snapshot
+
+
+def current_user():
+    """CurrentUser for the JWT identity of this request (None if the user is gone)"""
+    return get_user(int(get_jwt_identity()))
+
+
+def elder_summary(elder_id):
+    """ElderSummary for an elder profile id, memoized like get_user()"""
+    if not elder_id:
+        return None
+    elder_id = int(elder_id)
+    memo = g.setdefault('_user_context_elders', {})
+    if elder_id in memo:
+        return memo[elder_id]
+
+    summary = elder_cache.get(elder_id)
+    if summary is None:
+        row = db.session.query(ElderProfile.id, ElderProfile.user_id, ElderProfile.caretaker_id, User.full_name) \
+            .join(User, ElderProfile.user_id == User.id) \
+            .filter(ElderProfile.id == elder_id).first()
+        if row is not None:
+            summary = ElderSummary(*row)
+            elder_cache.set(elder_id, summary)
+    memo[elder_id] = summary
+    return summary
+
+
+def elder_summaries(elder_ids):
+    """elder_id -> ElderSummary for many elders, loading all misses in one query"""
+    memo = g.setdefault('_user_context_elders', {})
+    result = {}
+    missing = []
+    for elder_id in elder_ids:
+        summary = memo.get(elder_id) or elder_cache.get(elder_id)
+        if summary is None:
+            missing.append(elder_id)
+        else:
+            result[elder_id] = memo[elder_id] = summary
+    if missing:
+        rows = db.session.query(ElderProfile.id, ElderProfile.user_id, ElderProfile.caretaker_id, User.full_name) \
+            .join(User, ElderProfile.user_id == User.id) \
+            .filter(ElderProfile.id.in_(missing))
+        for row in rows:
+            summary = ElderSummary(*row)
+            elder_cache.set(summary.id, summary)
+            result[summary.id] = memo[summary.id] = summary
+    return result
+
+
+def care_team_rooms(elder_id):
+    """Socket.IO rooms of an elder and their caretaker; no query once cached"""
+    if not elder_id:
+        return ()
+    elder_id = int(elder_id)
+    rooms = rooms_cache.get(elder_id)
+    if rooms is None:
+        summary = elder_summary(elder_id)
+        if summary is None:
+            return ()
+        rooms = tuple(f'user_{user_id}' for user_id in (summary.user_id, summary.caretaker_id) if user_id)
+        rooms_cache.set(elder_id, rooms)
+    return rooms
+
+
+def invalidate_user(user_id):
+    user_cache.invalidate(user_id)
+    g.pop('_user_context_users', None)
+
+
+def invalidate_elder(elder_id):
+    elder_cache.invalidate(elder_id)
+    rooms_cache.invalidate(elder_id)
+    g.pop('_user_context_elders', None)
+
+
+@event.listens_for(ElderProfile, 'after_update')
+@event.listens_for(ElderProfile, 'after_delete')
+def _profile_changed(mapper, connection, target):
+    elder_cache.invalidate(target.id)
+    rooms_cache.invalidate(target.id)
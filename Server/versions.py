@@ -0,0 +1,135 @@
+"""
+Per-resource version counters for conditional GETs (ETag / If-None-Match).
+
+Every flush that inserts, updates or deletes a versioned model bumps the
+counter of the resource it belongs to, in the same transaction: an elder's
+health_records, a user's notifications, and so on. Polled GET handlers call
+conditional() with the resources their response is built from; the ETag is
+derived from those counters (one primary-key lookup on resource_versions),
+so an unchanged resource is answered with 304 before the handler touches
+its tables. Writes that bypass the ORM call bump() directly.
+"""
+from datetime import datetime
+import hashlib
+
+from flask import current_app, g, request
+from sqlalchemy import event, tuple_
+
+from models import (db, increment, ResourceVersion, Medication, MedicationLog, HealthRecord, Meal, Appointment,
+                    Prescription, Notification, EmergencyContact, LocationLog, SafeZone)
+from sync_log import scope_of
+
+VERSIONED = {
+    Medication: 'medications',
+    MedicationLog: 'medication_logs',
+    HealthRecord: 'health_records',
+    Meal: 'meals',
+    Appointment: 'appointments',
+    Prescription: 'prescriptions',
+    Notification: 'notifications',
+    EmergencyContact: 'emergency_contacts',
+    LocationLog: 'location_logs',
+    SafeZone: 'safe_zones',
+}
+
+
+def elder(elder_id, resource):
+    return ('elder', int(elder_id), resource)
+
+
+def user(user_id, resource):
+    return ('user', int(user_id), resource)
+
+
+def bump(session, keys):
+    """Increment the version of each (scope, scope_id, resource) key"""
+    connection = session.connection()
+    for scope, scope_id, resource in sorted(set(keys)):
+        increment(connection, ResourceVersion.__table__,
+                  {'scope': scope, 'scope_id': scope_id, 'resource': resource}, 'version', 1)
+
+
+def _after_flush(session, flush_context):
+    keys = []
+    for objects in (session.new, session.dirty, session.deleted):
+        for obj in objects:
+            resource = VERSIONED.get(type(obj))
+            if resource is None:
+                continue
+            if objects is session.dirty and not session.is_modified(obj, include_collections=False):
+                continue
+            elder_id, recipient_user_id = scope_of(session, obj)
+            if recipient_user_id is not None:
+                keys.append(user(recipient_user_id, resource))
+            if elder_id is not None:
+                keys.append(elder(elder_id, resource))
+    bump(session, keys)
+
+
+def install(app, session):
+    """Bump versions on every flush of this session and add ETags to 200 responses"""
+    if not event.contains(session, 'after_flush', _after_flush):
+        event.listen(session, 'after_flush', _after_flush)
+
+    @app.after_request
+    def _set_etag(response):
+        etag = g.get('etag')
+        if etag and response.status_code == 200:
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+def current(keys):
+    """key -> version for the given keys (missing keys are version 0), one query"""
+    keys = list(keys)
+    versions = dict.fromkeys(keys, 0)
+    if keys:
+        rows = db.session.query(
+            ResourceVersion.scope, ResourceVersion.scope_id, ResourceVersion.resource, ResourceVersion.version
+        ).filter(tuple_(ResourceVersion.scope, ResourceVersion.scope_id, ResourceVersion.resource).in_(keys))
+        for scope, scope_id, resource, version in rows:
+            versions[(scope, scope_id, resource)] = version
+    return versions
+
+
+def conditional(keys, *extra):
+    """Compute this request's ETag; return a 304 response if the client already has it.
+
+    The tag covers the resource versions, the full request path (query
+    params), any extra values (e.g. the user id) and today's date, so
+    date-windowed lists still refresh daily.
+    """
+    versions = current(keys)
+    g.resource_versions = versions
+    digest = hashlib.sha1()
+    for key in sorted(versions):
+        digest.update(f"{key}={versions[key]};".encode())
+    digest.update(request.full_path.encode())
+    for value in extra:
+        digest.update(f"|{value}".encode())
+    digest.update(datetime.utcnow().date().isoformat().encode())
+    etag = digest.hexdigest()[:20]
+
+    g.etag = etag
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return None
+
+
+def stamp(keys):
+    """Version string for keys, as read by this request's conditional() check.
+
+    Process-local caches store it with each entry and reload the entry when
+    it differs: another worker process may have written (and bumped the
+    version) without invalidating this process's cache, and the body must
+    never be older than the ETag it is served under.
+    """
+    known = g.get('resource_versions') or {}
+    missing = [key for key in keys if key not in known]
+    if missing:
+        known = {**known, **current(missing)}
+    return ':'.join(str(known[key]) for key in keys)
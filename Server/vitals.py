@@ -0,0 +1,280 @@
+"""
+Numeric vitals: value parsing and hourly/daily rollup maintenance.
+
+HealthRecord.value stays the raw string the user entered; the parsed numeric
+components go in value_primary/value_secondary, and every insert or delete
+keeps the matching HealthRollup rows (count/sum/min/max per hour and per
+day) up to date so trend queries read aggregates instead of raw readings.
+Rollups are only changed with single-statement upserts, never read and
+written back, so concurrent writers can't lose each other's updates.
+
+Types recorded in more than one unit (CANONICAL_UNITS) are converted with
+to_canonical() before they reach a rollup, so a bucket mixing °C and °F
+readings still has a meaningful sum, min and max.
+"""
+from datetime import datetime, timedelta
+import re
+
+from models import db, upsert, HealthRecord, HealthRollup
+
+RESOLUTIONS = ('hour', 'day')
+
+_NUMBER = re.compile(r'[-+]?\d+(?:\.\d+)?')
+
+# Unit that rollups, NORMAL_RANGES and baselines use, for types recorded in more than one unit
+CANONICAL_UNITS = {
+    'temperature': '°F',
+    'blood_glucose': 'mg/dL',
+}
+
+# (record type, normalized unit) -> conversion into the canonical unit
+UNIT_CONVERSIONS = {
+    ('temperature', 'c'): lambda value: value * 9 / 5 + 32,
+    ('temperature', 'celsius'): lambda value: value * 9 / 5 + 32,
+    ('blood_glucose', 'mmol/l'): lambda value: value * 18.0,
+}
+
+
+def parse_vital_value(value):
+    """Parse a raw vital into (primary, secondary) floats.
+
+    "120/80" -> (120.0, 80.0), "72 bpm" -> (72.0, None), "n/a" -> (None, None)
+    """
+    if value is None:
+        return None, None
+    numbers = _NUMBER.findall(str(value))
+    if not numbers:
+        return None, None
+    primary = float(numbers[0])
+    secondary = float(numbers[1]) if '/' in str(value) and len(numbers) > 1 else None
+    return primary, secondary
+
+
+def to_canonical(record_type, unit, value):
+    """value in record_type's canonical unit; unchanged if unit is already canonical, unknown or missing"""
+    if value is None:
+        return None
+    convert = UNIT_CONVERSIONS.get((record_type, (unit or '').lower().replace('°', '').replace('deg', '').strip()))
+    return convert(value) if convert else value
+
+
+def _canonical_column(column):
+    """SQL version of to_canonical() for a HealthRecord value column"""
+    unit = db.func.trim(db.func.replace(db.func.replace(db.func.lower(db.func.coalesce(HealthRecord.unit, '')),
+                                                        '°', ''), 'deg', ''))
+    return db.case(*[
+        ((HealthRecord.record_type == record_type) & (unit == unit_name), convert(column))
+        for (record_type, unit_name), convert in UNIT_CONVERSIONS.items()
+    ], else_=column)
+
+
+def bucket_start(timestamp, resolution):
+    if resolution == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def apply_record(record):
+    """Fold a new record into its hour/day rollups (same transaction, no commit)"""
+    apply_readings([dict(
+        elder_id=record.elder_id,
+        record_type=record.record_type,
+        recorded_at=record.recorded_at or datetime.utcnow(),
+        value_primary=record.value_primary,
+        value_secondary=record.value_secondary,
+        unit=record.unit,
+    )])
+
+
+def apply_readings(readings):
+    """Fold many new readings into their rollups (same transaction, no commit).
+
+    readings: dicts with elder_id, record_type, recorded_at, value_primary,
+    value_secondary and optionally unit. Values are converted to the type's
+    canonical unit, then each bucket is summarized in Python and merged with
+    one upsert, so concurrent ingests never lose updates or race on creating
+    a new bucket.
+    """
+    readings = [
+        dict(r, value_primary=to_canonical(r['record_type'], r.get('unit'), r['value_primary']),
+             value_secondary=to_canonical(r['record_type'], r.get('unit'), r['value_secondary']))
+        for r in readings if r['value_primary'] is not None and r['record_type']
+    ]
+    if not readings:
+        return
+    connection = db.session.connection()
+    for resolution in RESOLUTIONS:
+        groups = {}
+        for reading in readings:
+            key = (reading['elder_id'], reading['record_type'], bucket_start(reading['recorded_at'], resolution))
+            groups.setdefault(key, []).append(reading)
+
+        for (elder_id, record_type, start), group in groups.items():
+            _merge_bucket(connection, {
+                'elder_id': elder_id, 'record_type': record_type, 'resolution': resolution, 'bucket_start': start,
+            }, _summarize(group))
+
+
+def _summarize(readings):
+    """Rollup column values for a group of readings"""
+    primaries = [r['value_primary'] for r in readings]
+    secondaries = [r['value_secondary'] for r in readings if r['value_secondary'] is not None]
+    return dict(
+        count=len(primaries),
+        sum_primary=sum(primaries),
+        min_primary=min(primaries),
+        max_primary=max(primaries),
+        count_secondary=len(secondaries),
+        sum_secondary=sum(secondaries),
+        min_secondary=min(secondaries, default=None),
+        max_secondary=max(secondaries, default=None),
+    )
+
+
+def _lower(column, value):
+    # NULL on either side keeps the other one (SQLite's min() would return NULL)
+    return db.case((db.or_(column.is_(None), value < column), value), else_=column)
+
+
+def _higher(column, value):
+    return db.case((db.or_(column.is_(None), value > column), value), else_=column)
+
+
+def _merge_bucket(connection, keys, values):
+    """Insert a bucket or add values to the existing one, atomically"""
+    table = HealthRollup.__table__
+    c = table.c
+    upsert(connection, table, keys, values, lambda excluded: {
+        'count': c['count'] + excluded['count'],
+        'sum_primary': c.sum_primary + excluded['sum_primary'],
+        'min_primary': _lower(c.min_primary, excluded['min_primary']),
+        'max_primary': _higher(c.max_primary, excluded['max_primary']),
+        'count_secondary': db.func.coalesce(c.count_secondary, 0) + excluded['count_secondary'],
+        'sum_secondary': c.sum_secondary + excluded['sum_secondary'],
+        'min_secondary': _lower(c.min_secondary, excluded['min_secondary']),
+        'max_secondary': _higher(c.max_secondary, excluded['max_secondary']),
+    })
+
+
+def recompute_buckets(elder_id, record_type, recorded_at):
+    """Rebuild the hour/day rollups containing recorded_at from raw rows.
+
+    Used after deletes, where min/max can't be updated incrementally.
+    """
+    connection = db.session.connection()
+    table = HealthRollup.__table__
+    for resolution in RESOLUTIONS:
+        start = bucket_start(recorded_at, resolution)
+        end = start + (timedelta(hours=1) if resolution == 'hour' else timedelta(days=1))
+        query = db.session.query(*_aggregates()).filter(
+            HealthRecord.elder_id == elder_id,
+            HealthRecord.record_type == record_type,
+            HealthRecord.value_primary.isnot(None),
+            HealthRecord.recorded_at >= start,
+            HealthRecord.recorded_at < end,
+        )
+        values = _bucket_values(*query.one())
+        keys = {'elder_id': elder_id, 'record_type': record_type, 'resolution': resolution, 'bucket_start': start}
+        if not values['count']:
+            connection.execute(table.delete().where(*[table.c[name] == value for name, value in keys.items()]))
+            continue
+        upsert(connection, table, keys, values, lambda excluded: {name: excluded[name] for name in values})
+
+
+def _aggregates():
+    primary = _canonical_column(HealthRecord.value_primary)
+    secondary = _canonical_column(HealthRecord.value_secondary)
+    return (
+        db.func.count(HealthRecord.value_primary),
+        db.func.sum(primary),
+        db.func.min(primary),
+        db.func.max(primary),
+        db.func.count(HealthRecord.value_secondary),
+        db.func.sum(secondary),
+        db.func.min(secondary),
+        db.func.max(secondary),
+    )
+
+
+def _bucket_values(count, sum_p, min_p, max_p, count_s, sum_s, min_s, max_s):
+    return dict(
+        count=count,
+        sum_primary=sum_p or 0,
+        min_primary=min_p,
+        max_primary=max_p,
+        count_secondary=count_s,
+        sum_secondary=sum_s or 0,
+        min_secondary=min_s,
+        max_secondary=max_s,
+    )
+
+
+def backfill(batch_size=1000):
+    """Parse numeric values for old rows and rebuild all rollups from scratch.
+
+    Run once after upgrading a database that predates numeric vitals.
+    Returns the number of records parsed.
+    """
+    parsed = 0
+    last_id = 0
+    while True:
+        records = HealthRecord.query.filter(
+            HealthRecord.id > last_id, HealthRecord.value_primary.is_(None)
+        ).order_by(HealthRecord.id).limit(batch_size).all()
+        if not records:
+            break
+        for record in records:
+            record.value_primary, record.value_secondary = parse_vital_value(record.value)
+            parsed += record.value_primary is not None
+        last_id = records[-1].id
+        db.session.commit()
+
+    rebuild_rollups()
+    return parsed
+
+
+def rebuild_rollups():
+    """Recompute every rollup from raw records; returns the number of buckets"""
+    HealthRollup.query.delete()
+    buckets = 0
+    for resolution in RESOLUTIONS:
+        for row in _aggregate(resolution):
+            db.session.add(HealthRollup(resolution=resolution, **row))
+            buckets += 1
+    db.session.commit()
+    return buckets
+
+
+def _aggregate(resolution):
+    """Group all numeric records into buckets in SQL"""
+    fmt = '%Y-%m-%d %H:00:00' if resolution == 'hour' else '%Y-%m-%d 00:00:00'
+    if db.engine.dialect.name == 'sqlite':
+        bucket = db.func.strftime(fmt, HealthRecord.recorded_at)
+    else:
+        bucket = db.func.date_trunc(resolution, HealthRecord.recorded_at)
+    rows = db.session.query(
+        HealthRecord.elder_id, HealthRecord.record_type, bucket.label('bucket'), *_aggregates()
+    ).filter(
+        HealthRecord.value_primary.isnot(None), HealthRecord.record_type.isnot(None)
+    ).group_by(HealthRecord.elder_id, HealthRecord.record_type, 'bucket')
+
+    for elder_id, record_type, bucket_value, *aggregates in rows:
+        if isinstance(bucket_value, str):
+            bucket_value = datetime.fromisoformat(bucket_value)
+        yield dict(elder_id=elder_id, record_type=record_type, bucket_start=bucket_value, **_bucket_values(*aggregates))
+
+
+def serialize_rollup(rollup):
+    return {
+        "type": rollup.record_type,
+        "resolution": rollup.resolution,
+        "unit": CANONICAL_UNITS.get(rollup.record_type),
+        "bucket_start": rollup.bucket_start.isoformat(),
+        "count": rollup.count,
+        "mean": rollup.sum_primary / rollup.count if rollup.count else None,
+        "min": rollup.min_primary,
+        "max": rollup.max_primary,
+        "mean_secondary": rollup.sum_secondary / rollup.count_secondary if rollup.count_secondary else None,
+        "min_secondary": rollup.min_secondary,
+        "max_secondary": rollup.max_secondary,
+    }
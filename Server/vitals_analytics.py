@@ -0,0 +1,371 @@
+"""
+Vitals anomaly detection.
+
+Each numeric component of a reading (systolic and diastolic are separate
+components) is compared against a rolling baseline of the previous WINDOW
+readings of the same type: a z-score beyond Z_THRESHOLD, or a value outside
+the clinical range in NORMAL_RANGES, is an anomaly. Readings are converted
+to the type's canonical unit (CANONICAL_UNITS) before either check, so a
+series that mixes e.g. °C and °F entries is scored consistently.
+
+Two paths compute the same result:
+- bulk: scan() loads series with one query and evaluates them with NumPy
+  (cumulative sums give every rolling mean/std at once); scan_upload() does
+  the same for one upload, seeding each baseline from only the WINDOW
+  readings before it;
+- incremental: BaselineTracker.observe() keeps a running window per
+  (elder, record type), so each new reading costs O(1).
+
+Run a bulk scan across all elders from the command line:
+    python vitals_analytics.py --since-hours 24 [--notify]
+"""
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta
+import math
+import threading
+
+import numpy as np
+
+from models import db, HealthRecord, ElderProfile, User
+from notifications import notify
+from vitals import CANONICAL_UNITS, to_canonical  # NORMAL_RANGES and baselines use the canonical units
+
+WINDOW = 30
+MIN_PERIODS = 5
+Z_THRESHOLD = 3.0
+# Relative std floor so a perfectly flat baseline doesn't turn tiny changes into huge z-scores
+STD_FLOOR_RATIO = 0.02
+
+# (low, high) per record type and component, in the canonical unit; None means no bound
+NORMAL_RANGES = {
+    ('blood_pressure', 'primary'): (90, 180),
+    ('blood_pressure', 'secondary'): (60, 110),
+    ('heart_rate', 'primary'): (50, 110),
+    ('blood_glucose', 'primary'): (70, 250),
+    ('temperature', 'primary'): (95.0, 100.4),
+    ('oxygen_saturation', 'primary'): (92, None),
+    ('respiratory_rate', 'primary'): (10, 24),
+}
+
+COMPONENTS = ('primary', 'secondary')
+
+
+def _range_reason(record_type, component, value):
+    low, high = NORMAL_RANGES.get((record_type, component), (None, None))
+    if low is not None and value < low:
+        return 'below_range'
+    if high is not None and value > high:
+        return 'above_range'
+    return None
+
+
+def rolling_zscores(values, window=WINDOW, min_periods=MIN_PERIODS):
+    """z-score of each value against the window of values before it.
+
+    Returns (zscores, baseline_means); entries without enough history are NaN.
+    """
+    x = np.asarray(values, dtype=float)
+    n = x.size
+    if n == 0:
+        return np.empty(0), np.empty(0)
+
+    c1 = np.concatenate(([0.0], np.cumsum(x)))
+    c2 = np.concatenate(([0.0], np.cumsum(x * x)))
+    idx = np.arange(n)
+    start = np.maximum(idx - window, 0)
+    count = (idx - start).astype(float)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = (c1[idx] - c1[start]) / count
+        var = (c2[idx] - c2[start]) / count - mean * mean
+        std = np.maximum(np.sqrt(np.maximum(var, 0.0)), STD_FLOOR_RATIO * np.abs(mean) + 1e-9)
+        z = (x - mean) / std
+
+    z[count < min_periods] = np.nan
+    mean[count < min_periods] = np.nan
+    return z, mean
+
+
+def _anomaly(record_id, elder_id, record_type, component, value, recorded_at, z, mean):
+    reason = _range_reason(record_type, component, value)
+    if reason is None and not (z is not None and math.isfinite(z) and abs(z) >= Z_THRESHOLD):
+        return None
+    return {
+        "record_id": record_id,
+        "elder_id": elder_id,
+        "record_type": record_type,
+        "component": component,
+        "value": value,
+        "unit": CANONICAL_UNITS.get(record_type),
+        "recorded_at": recorded_at,
+        "zscore": round(float(z), 2) if z is not None and math.isfinite(z) else None,
+        "baseline_mean": round(float(mean), 2) if mean is not None and math.isfinite(mean) else None,
+        "reason": reason or ('spike' if z > 0 else 'drop'),
+    }
+
+
+def _series_query():
+    return db.session.query(
+        HealthRecord.id, HealthRecord.elder_id, HealthRecord.record_type, HealthRecord.recorded_at,
+        HealthRecord.value_primary, HealthRecord.value_secondary, HealthRecord.unit
+    ).filter(HealthRecord.value_primary.isnot(None), HealthRecord.record_type.isnot(None))
+
+
+def load_series(elder_ids=None, since=None, record_type=None):
+    """One query for all numeric readings, ordered by elder, type and time"""
+    query = _series_query()
+    if elder_ids is not None:
+        query = query.filter(HealthRecord.elder_id.in_(list(elder_ids)))
+    if record_type:
+        query = query.filter(HealthRecord.record_type == record_type)
+    if since is not None:
+        # Include enough history before `since` to build baselines
+        query = query.filter(HealthRecord.recorded_at >= since - timedelta(days=90))
+    return query.order_by(HealthRecord.elder_id, HealthRecord.record_type, HealthRecord.recorded_at, HealthRecord.id).all()
+
+
+def load_upload_series(elder_id, record_types, since, until, window=WINDOW):
+    """An elder's readings of record_types between since and until, each type
+    preceded by the `window` readings before since (its baseline seed).
+
+    Two index range scans per type on (elder_id, record_type, recorded_at),
+    so the cost follows the size of the upload, not of the elder's history.
+    """
+    rows = []
+    for record_type in sorted(record_types):
+        query = _series_query().filter(HealthRecord.elder_id == elder_id, HealthRecord.record_type == record_type)
+        seed = query.filter(HealthRecord.recorded_at < since) \
+            .order_by(HealthRecord.recorded_at.desc(), HealthRecord.id.desc()).limit(window).all()
+        rows.extend(reversed(seed))
+        rows.extend(query.filter(HealthRecord.recorded_at >= since, HealthRecord.recorded_at <= until)
+                    .order_by(HealthRecord.recorded_at, HealthRecord.id).all())
+    return rows
+
+
+def scan(elder_ids=None, since=None, record_type=None):
+    """Vectorized anomaly scan; returns anomalies for readings at or after `since`"""
+    return evaluate(load_series(elder_ids, since, record_type), since)
+
+
+def scan_upload(elder_id, readings):
+    """Anomalies among an elder's newly stored readings (dicts with record_type and recorded_at)"""
+    since = min(r['recorded_at'] for r in readings)
+    until = max(r['recorded_at'] for r in readings)
+    rows = load_upload_series(elder_id, {r['record_type'] for r in readings}, since, until)
+    return evaluate(rows, since)
+
+
+def evaluate(rows, since=None):
+    """Anomalies in rows (load_series() tuples, sorted by elder, type and time) at or after `since`"""
+    if not rows:
+        return []
+
+    ids = np.array([r[0] for r in rows])
+    elders = np.array([r[1] for r in rows])
+    types = np.array([r[2] for r in rows], dtype=object)
+    times = [r[3] for r in rows]
+    values = {
+        'primary': np.array([to_canonical(r[2], r[6], r[4]) for r in rows], dtype=float),
+        'secondary': np.array([np.nan if r[5] is None else to_canonical(r[2], r[6], r[5]) for r in rows], dtype=float),
+    }
+
+    # Rows are sorted by (elder, type), so each series is a contiguous slice
+    boundaries = np.flatnonzero((elders[1:] != elders[:-1]) | (types[1:] != types[:-1])) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(rows)]))
+
+    anomalies = []
+    for lo, hi in zip(starts, ends):
+        elder_id = int(elders[lo])
+        series_type = types[lo]
+        for component in COMPONENTS:
+            series = values[component][lo:hi]
+            present = np.flatnonzero(~np.isnan(series))
+            if present.size == 0:
+                continue
+            z, mean = rolling_zscores(series[present])
+
+            low, high = NORMAL_RANGES.get((series_type, component), (None, None))
+            flagged = np.abs(np.nan_to_num(z)) >= Z_THRESHOLD
+            if low is not None:
+                flagged |= series[present] < low
+            if high is not None:
+                flagged |= series[present] > high
+
+            for k in np.flatnonzero(flagged):
+                row = lo + present[k]
+                if since is not None and times[row] < since:
+                    continue
+                anomaly = _anomaly(int(ids[row]), elder_id, series_type, component,
+                                   float(series[present[k]]), times[row], float(z[k]), float(mean[k]))
+                if anomaly:
+                    anomalies.append(anomaly)
+    return anomalies
+
+
+class RollingBaseline:
+    """O(1) rolling mean/std over the last `window` values"""
+    __slots__ = ('values', 's1', 's2')
+
+    def __init__(self, window=WINDOW):
+        self.values = deque(maxlen=window)
+        self.s1 = 0.0
+        self.s2 = 0.0
+
+    def score(self, value):
+        """(z, mean) of value against the current window, without adding it"""
+        count = len(self.values)
+        if count < MIN_PERIODS:
+            return None, None
+        mean = self.s1 / count
+        var = max(self.s2 / count - mean * mean, 0.0)
+        std = max(math.sqrt(var), STD_FLOOR_RATIO * abs(mean) + 1e-9)
+        return (value - mean) / std, mean
+
+    def push(self, value):
+        if len(self.values) == self.values.maxlen:
+            old = self.values[0]
+            self.s1 -= old
+            self.s2 -= old * old
+        self.values.append(value)
+        self.s1 += value
+        self.s2 += value * value
+
+
+class BaselineTracker:
+    """Per-(elder, record type) rolling baselines for ingest-time detection"""
+
+    def __init__(self, window=WINDOW, max_series=5000):
+        self.window = window
+        self.max_series = max_series
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _warm(self, record):
+        """Seed a baseline from the readings before this one (one query, first time only)"""
+        rows = db.session.query(HealthRecord.value_primary, HealthRecord.value_secondary, HealthRecord.unit).filter(
+            HealthRecord.elder_id == record.elder_id,
+            HealthRecord.record_type == record.record_type,
+            HealthRecord.value_primary.isnot(None),
+            HealthRecord.id != record.id,
+            HealthRecord.recorded_at <= record.recorded_at,
+        ).order_by(HealthRecord.recorded_at.desc(), HealthRecord.id.desc()).limit(self.window).all()
+
+        baselines = {component: RollingBaseline(self.window) for component in COMPONENTS}
+        for primary, secondary, unit in reversed(rows):
+            baselines['primary'].push(to_canonical(record.record_type, unit, primary))
+            if secondary is not None:
+                baselines['secondary'].push(to_canonical(record.record_type, unit, secondary))
+        return baselines
+
+    def observe(self, record):
+        """Score a newly stored record and fold it into the baseline; returns anomalies"""
+        if record.value_primary is None or not record.record_type:
+            return []
+        key = (record.elder_id, record.record_type)
+
+        with self._lock:
+            baselines = self._series.get(key)
+            if baselines is not None:
+                self._series.move_to_end(key)
+        if baselines is None:
+            baselines = self._warm(record)
+
+        anomalies = []
+        with self._lock:
+            baselines = self._series.setdefault(key, baselines)
+            self._series.move_to_end(key)
+            while len(self._series) > self.max_series:
+                self._series.popitem(last=False)
+
+            for component, value in (('primary', record.value_primary), ('secondary', record.value_secondary)):
+                value = to_canonical(record.record_type, record.unit, value)
+                if value is None:
+                    continue
+                z, mean = baselines[component].score(value)
+                anomaly = _anomaly(record.id, record.elder_id, record.record_type, component,
+                                   value, record.recorded_at, z, mean)
+                if anomaly:
+                    anomalies.append(anomaly)
+                baselines[component].push(value)
+        return anomalies
+
+    def forget(self, elder_id, record_type):
+        """Drop a cached baseline (e.g. after a reading is deleted)"""
+        with self._lock:
+            self._series.pop((elder_id, record_type), None)
+
+
+def describe(anomaly, elder_name):
+    label = anomaly['record_type'].replace('_', ' ')
+    if anomaly['record_type'] == 'blood_pressure':
+        label = 'systolic blood pressure' if anomaly['component'] == 'primary' else 'diastolic blood pressure'
+    wording = {
+        'above_range': 'is above the normal range',
+        'below_range': 'is below the normal range',
+        'spike': 'is unusually high compared to recent readings',
+        'drop': 'is unusually low compared to recent readings',
+    }[anomaly['reason']]
+    value = anomaly['value']
+    value_text = f"{value:g}" if not anomaly.get('unit') else f"{value:.4g} {anomaly['unit']}"
+    return f"{elder_name}'s {label} of {value_text} {wording}"
+
+
+def notification_args(anomalies):
+    """(anomaly, notify() arguments) for each anomaly whose elder has a caretaker"""
+    if not anomalies:
+        return []
+    elder_ids = {a['elder_id'] for a in anomalies}
+    elders = {
+        row.id: row for row in db.session.query(ElderProfile.id, ElderProfile.caretaker_id, User.full_name)
+        .join(User, ElderProfile.user_id == User.id)
+        .filter(ElderProfile.id.in_(elder_ids))
+    }
+
+    notices = []
+    for anomaly in anomalies:
+        elder = elders.get(anomaly['elder_id'])
+        if elder is None or not elder.caretaker_id:
+            continue
+        notices.append((anomaly, (
+            elder.caretaker_id, anomaly['elder_id'], "health",
+            "Abnormal Vital Reading", describe(anomaly, elder.full_name),
+        )))
+    return notices
+
+
+def create_notifications(anomalies):
+    """Notify each elder's caretaker of every anomaly (no commit).
+
+    Goes through the notification pipeline, so a burst of anomalies for one
+    elder collapses into a single digest; returns one Notification per
+    notified anomaly (digests repeat).
+    """
+    return [notify(*args) for _, args in notification_args(anomalies)]
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Scan all elders' vitals for anomalies")
+    parser.add_argument('--since-hours', type=float, default=24, help="only report readings from the last N hours")
+    parser.add_argument('--notify', action='store_true', help="create caretaker notifications")
+    args = parser.parse_args()
+
+    from app_new import app
+
+    with app.app_context():
+        since = datetime.utcnow() - timedelta(hours=args.since_hours)
+        anomalies = scan(since=since)
+        for anomaly in anomalies:
+            print(f"elder {anomaly['elder_id']}: {anomaly['record_type']}/{anomaly['component']} "
+                  f"= {anomaly['value']:g} ({anomaly['reason']}, z={anomaly['zscore']})")
+        if args.notify:
+            created = create_notifications(anomalies)
+            db.session.commit()
+            print(f"Created or updated {len({n.id for n in created})} notifications")
+        print(f"{len(anomalies)} anomalies since {since.isoformat()}")
+
+
+if __name__ == '__main__':
+    main()